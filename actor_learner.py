@@ -0,0 +1,200 @@
+import inspect
+import multiprocessing
+import numpy as np
+from pypaq.lipytools.pylogger import get_pylogger
+import queue
+from typing import Dict, List, Optional
+
+from r4c.envy import RLEnvy
+from r4c.actor import TrainableActor
+
+from async_eval import envy_kwargs, load_policy_snapshot, policy_snapshot
+
+
+# rollout worker loop, plays with lagged actor policy copy and sends trajectory batches to the learner
+def _rollout_worker(
+        envy_type: type,
+        envy_point: Dict,
+        actor_type: type,
+        actor_point: Dict,
+        name: str,
+        seed: int,
+        steps: int,
+        trajectories: multiprocessing.Queue,
+        snapshots: multiprocessing.Queue,
+        stop,
+        behaviour_probs: bool,
+):
+    logger = get_pylogger(name=name, add_stamp=False, level=50)
+    envy = envy_type(seed=seed, logger=logger, **envy_point)
+    actor = actor_type(
+        name=           name,
+        add_stamp=      False,
+        envy=           envy,
+        seed=           seed,
+        logger=         logger,
+        hpmser_mode=    True,
+        **actor_point)
+    envy.reset()
+    version = None
+    while not stop.is_set():
+
+        # loads the newest policy snapshot, waits for the first one (policy of worker actor is not the learner one)
+        while True:
+            try:
+                version, snapshot = snapshots.get(block=version is None, timeout=0.1)
+                load_policy_snapshot(actor, snapshot)
+            except queue.Empty:
+                break
+        if version is None:
+            continue
+
+        experience = actor.run_play(
+            steps=          steps,
+            training=       True,
+            reset=          False,
+            break_terminal= False)
+        experience = [np.asarray(e) for e in experience]
+
+        mu = None
+        if behaviour_probs:
+            observations, actions = experience[0], experience[1]
+            mu = actor._get_policy_probs(observations)[np.arange(len(actions)), actions]
+
+        while not stop.is_set():
+            try:
+                trajectories.put({'experience':experience, 'version':version, 'mu':mu}, timeout=0.1)
+                break
+            except queue.Full:
+                pass
+
+
+class ActorLearner:
+    """ ActorLearner decouples acting and learning of on-policy actors (PG, AC, A2C, PPO) - IMPALA style:
+    n_workers processes step their own envies (built from envy.kwargs) with lagged copies of actor policy
+    and send trajectory batches through a bounded queue,
+    attach() makes training run_play() of actor (learner) take those batches instead of playing,
+    updated policy is broadcast to workers every broadcast_freq updates,
+    batches played by policy older than the learner one may be corrected (off_policy_correction):
+    rows of training data are resampled with truncated importance weights min(rho_clip, pi(a|s) / mu(a|s)),
+    where mu(a|s) is probability of action under worker policy (exact for sampled actions without exploration) """
+
+    def __init__(
+            self,
+            envy: RLEnvy,
+            actor_type: type(TrainableActor),
+            actor_point: Dict,
+            name: str=                      'ActorLearner',
+            n_workers: int=                 2,
+            steps: Optional[int]=           None,   # steps of a trajectory batch, defaults to actor batch_size
+            queue_size: Optional[int]=      None,   # max number of batches waiting for the learner, defaults to n_workers
+            broadcast_freq: int=            1,
+            off_policy_correction: bool=    False,
+            rho_clip: float=                1.0,
+            seed: int=                      123,
+    ):
+        if off_policy_correction and getattr(envy, 'action_width', None):
+            raise ValueError('off-policy correction is supported for discrete actions only')
+        self.broadcast_freq = broadcast_freq
+        self.off_policy_correction = off_policy_correction
+        self.rho_clip = rho_clip
+        self._rng = np.random.default_rng(seed)
+
+        self.version = 0                # number of learner updates
+        self.lags: List[int] = []       # policy lag (in updates) of every batch taken by the learner
+        self._mu: Optional[np.ndarray] = None
+
+        mp_context = multiprocessing.get_context('spawn')
+        self._stop = mp_context.Event()
+        self._trajectories = mp_context.Queue(maxsize=queue_size or n_workers)
+        self._snapshots = [mp_context.Queue() for _ in range(n_workers)]
+        self._workers = [
+            mp_context.Process(
+                target= _rollout_worker,
+                kwargs= {
+                    'envy_type':        type(envy),
+                    'envy_point':       envy_kwargs(envy),
+                    'actor_type':       actor_type,
+                    'actor_point':      actor_point,
+                    'name':             f'{name}_rw{wix}',
+                    'seed':             seed + 1000 * (wix+1),
+                    'steps':            steps or actor_point.get('batch_size', 64),
+                    'trajectories':     self._trajectories,
+                    'snapshots':        self._snapshots[wix],
+                    'stop':             self._stop,
+                    'behaviour_probs':  off_policy_correction},
+                daemon= True)
+            for wix in range(n_workers)]
+        for w in self._workers:
+            w.start()
+
+    def publish(self, actor:TrainableActor):
+        snapshot = policy_snapshot(actor)
+        for snapshots in self._snapshots:
+            snapshots.put((self.version, snapshot))
+
+    def get_batch(self) -> Dict:
+        """ returns next trajectory batch of workers """
+        while True:
+            try:
+                return self._trajectories.get(timeout=1.0)
+            except queue.Empty:
+                if not any(w.is_alive() for w in self._workers):
+                    raise RuntimeError('all rollout workers are dead')
+
+    def _correct(self, actor:TrainableActor, batch:Dict, training_data:Dict) -> Dict:
+        """ resamples rows of training_data with truncated importance weights """
+        mu, self._mu = self._mu, None
+        n_rows = len(batch['actions'])
+        if mu is None or len(mu) != n_rows:
+            return training_data
+        pi = actor._get_policy_probs(batch['observations'])[np.arange(n_rows), batch['actions']]
+        rho = np.minimum(self.rho_clip, pi / np.maximum(mu, 1e-8))
+        ixs = self._rng.choice(n_rows, size=n_rows, p=rho/rho.sum())
+        return {k: v[ixs] if isinstance(v, np.ndarray) and len(v) == n_rows else v for k, v in training_data.items()}
+
+    def attach(self, actor:TrainableActor):
+        """ training run_play() of actor takes batches of workers, policy is broadcast after updates """
+        self.publish(actor)
+
+        run_play = actor.run_play
+        signature = inspect.signature(run_play)
+        def _run_play(*args, **kwargs):
+            arguments = signature.bind(*args, **kwargs)
+            arguments.apply_defaults()
+            if not arguments.arguments.get('training', False) or arguments.arguments.get('reset', True):
+                return run_play(*args, **kwargs)
+            batch = self.get_batch()
+            self.lags.append(self.version - batch['version'])
+            self._mu = batch['mu']
+            return batch['experience']
+        actor.run_play = _run_play
+
+        update = actor._update
+        def _update(*args, **kwargs):
+            metrics = update(*args, **kwargs)
+            self.version += 1
+            if self.version % self.broadcast_freq == 0:
+                self.publish(actor)
+            return metrics
+        actor._update = _update
+
+        if self.off_policy_correction:
+            build_training_data = actor._build_training_data
+            def _build_training_data(batch:Dict) -> Dict:
+                return self._correct(actor=actor, batch=batch, training_data=build_training_data(batch=batch))
+            actor._build_training_data = _build_training_data
+
+    def close(self):
+        self._stop.set()
+        # takes batches of workers waiting to put
+        while any(w.is_alive() for w in self._workers):
+            try:
+                self._trajectories.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        for w in self._workers:
+            w.join()
+        # snapshots not taken by workers are not flushed at exit
+        for snapshots in self._snapshots:
+            snapshots.cancel_join_thread()
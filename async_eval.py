@@ -0,0 +1,197 @@
+import copy
+import multiprocessing
+import queue
+import time
+from pypaq.lipytools.pylogger import get_pylogger
+from typing import Dict, List, Optional, Tuple
+
+from r4c.envy import RLEnvy
+from r4c.actor import TrainableActor
+
+
+def policy_snapshot(actor:TrainableActor) -> Dict:
+    """ returns snapshot of actor policy:
+    state_dict of torch modules (MOTorch) and copies of QTable (*Table) objects """
+    snapshot = {}
+    for k, v in vars(actor).items():
+        if k == 'envy':
+            continue
+        if callable(getattr(v, 'state_dict', None)) and callable(getattr(v, 'load_state_dict', None)):
+            snapshot[k] = {n: t.detach().cpu() if hasattr(t, 'detach') else t for n, t in v.state_dict().items()}
+        elif 'Table' in type(v).__name__:
+            snapshot[k] = copy.deepcopy(v)
+    return snapshot
+
+
+def load_policy_snapshot(actor:TrainableActor, snapshot:Dict):
+    for k, v in snapshot.items():
+        if isinstance(v, dict):
+            getattr(actor, k).load_state_dict(v)
+        else:
+            setattr(actor, k, v)
+
+
+def envy_kwargs(envy:RLEnvy) -> Dict:
+    """ returns kwargs to build a copy of envy (as build_renderable() does) in other process """
+    return {k: v for k, v in envy.kwargs.items() if k not in ('logger', 'seed')}
+
+
+# evaluation worker loop, runs test episodes of received policy snapshots
+def _eval_worker(
+        envy_type: type,
+        envy_point: Dict,
+        actor_type: type,
+        actor_point: Dict,
+        name: str,
+        seed: int,
+        tasks: multiprocessing.Queue,
+        results: multiprocessing.Queue,
+):
+    logger = get_pylogger(name=name, add_stamp=False, level=50)
+    envy = envy_type(seed=seed, logger=logger, **envy_point)
+    actor = actor_type(
+        name=           name,
+        add_stamp=      False,
+        envy=           envy,
+        seed=           seed,
+        logger=         logger,
+        hpmser_mode=    True,
+        **actor_point)
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        task_ix, snapshot, n_episodes, max_steps = task
+        load_policy_snapshot(actor, snapshot)
+        results.put((task_ix, *actor.test_on_episodes(n_episodes=n_episodes, max_steps=max_steps)))
+
+
+class AsyncEvaluator:
+    """ AsyncEvaluator runs test episodes of actor policy snapshots in background worker processes,
+    every worker builds its own envy (from envy.kwargs) and actor copy,
+    attach() replaces actor.test_on_episodes() with non-blocking version:
+    it submits current policy snapshot and returns results of submitted tests in order (when they are ready),
+    so training tests (and break_ntests) see results lagged by (at least) max_lag tests """
+
+    def __init__(
+            self,
+            envy: RLEnvy,
+            actor_type: type(TrainableActor),
+            actor_point: Dict,
+            name: str=                  'AsyncEvaluator',
+            n_workers: int=             1,
+            max_lag: Optional[int]=     1,      # max number of not finished evaluations, None never blocks
+            seed: int=                  123,
+    ):
+        self.max_lag = max_lag
+
+        mp_context = multiprocessing.get_context('spawn')
+        self._tasks = mp_context.Queue()
+        self._results = mp_context.Queue()
+        self._workers = [
+            mp_context.Process(
+                target= _eval_worker,
+                kwargs= {
+                    'envy_type':    type(envy),
+                    'envy_point':   envy_kwargs(envy),
+                    'actor_type':   actor_type,
+                    'actor_point':  actor_point,
+                    'name':         f'{name}_eval{wix}',
+                    'seed':         seed + 1000 * (wix+1),
+                    'tasks':        self._tasks,
+                    'results':      self._results},
+                daemon= True)
+            for wix in range(n_workers)]
+        for w in self._workers:
+            w.start()
+
+        self._n_tasks = 0
+        self.results: Dict[int,Tuple[float,float]] = {}     # {task_ix: (won factor, avg reward)}
+        self._periodic: List[int] = []                      # task_ix of periodic tests
+        self._n_returned = 0                                # number of periodic tests results returned
+
+    def submit(self, actor:TrainableActor, n_episodes:int, max_steps:Optional[int]=None) -> int:
+        task_ix = self._n_tasks
+        self._tasks.put((task_ix, policy_snapshot(actor), n_episodes, max_steps))
+        self._n_tasks += 1
+        return task_ix
+
+    def _collect(self, block:bool) -> bool:
+        """ collects single result, returns False if none was available """
+        while True:
+            try:
+                task_ix, won, reward = self._results.get(block=block, timeout=1.0 if block else None)
+                break
+            except queue.Empty:
+                if not block:
+                    return False
+                if not any(w.is_alive() for w in self._workers):
+                    raise Exception('all AsyncEvaluator workers died')
+        self.results[task_ix] = (won, reward)
+        return True
+
+    @property
+    def n_pending(self) -> int:
+        return self._n_tasks - len(self.results)
+
+    def attach(self, actor:TrainableActor):
+        """ replaces actor.test_on_episodes with non-blocking version,
+        it returns result of the oldest not returned test if it is ready,
+        placeholder (0.0, nan) otherwise (e.g. always for the first test with max_lag > 0) """
+
+        def test_on_episodes(n_episodes:int=10, max_steps:Optional[int]=None) -> Tuple[float,float]:
+            self._periodic.append(self.submit(actor, n_episodes=n_episodes, max_steps=max_steps))
+            while self._collect(block=False):
+                pass
+            if self.max_lag is not None:
+                while self.n_pending > self.max_lag:
+                    self._collect(block=True)
+            task_ix = self._periodic[self._n_returned]
+            if task_ix not in self.results:
+                return 0.0, float('nan')
+            self._n_returned += 1
+            return self.results[task_ix]
+
+        actor.test_on_episodes = test_on_episodes
+
+    def ready_results(self, start:int=0, block:bool=False) -> List[Tuple[float,float]]:
+        """ returns results of periodic tests from start on that are ready (in order, without gaps),
+        block waits for all of them """
+        if block:
+            return self.periodic_results()[start:]
+        while self._collect(block=False):
+            pass
+        results = []
+        for task_ix in self._periodic[start:]:
+            if task_ix not in self.results:
+                break
+            results.append(self.results[task_ix])
+        return results
+
+    def periodic_results(self) -> List[Tuple[float,float]]:
+        """ waits for all evaluations, returns results of periodic tests in order """
+        while self.n_pending:
+            self._collect(block=True)
+        return [self.results[task_ix] for task_ix in self._periodic]
+
+    def test_on_episodes(self, actor:TrainableActor, n_episodes:int, max_steps:Optional[int]=None) -> Tuple[float,float]:
+        """ plays n_episodes of current actor policy split among all workers, waits for result """
+        n_workers = len(self._workers)
+        split = [n_episodes // n_workers + (1 if wix < n_episodes % n_workers else 0) for wix in range(n_workers)]
+        task_n = {self.submit(actor, n_episodes=n, max_steps=max_steps): n for n in split if n}
+        while any(task_ix not in self.results for task_ix in task_n):
+            self._collect(block=True)
+        won = sum(self.results[task_ix][0] * n for task_ix, n in task_n.items()) / n_episodes
+        reward = sum(self.results[task_ix][1] * n for task_ix, n in task_n.items()) / n_episodes
+        return won, reward
+
+    def close(self, timeout:float=10.0):
+        """ stops workers, worker not finished within timeout (e.g. stuck in an episode) is terminated """
+        for _ in self._workers:
+            self._tasks.put(None)
+        deadline = time.time() + timeout
+        for w in self._workers:
+            w.join(timeout=max(0.0, deadline - time.time()))
+            if w.is_alive():
+                w.terminate()
+                w.join()
@@ -0,0 +1,93 @@
+import numpy as np
+from typing import Optional, Tuple
+
+from async_eval import envy_kwargs
+from envy_pool import EnvyPool, get_envy_pool
+
+
+def _softmax(x:np.ndarray) -> np.ndarray:
+    e = np.exp(x - x.max(axis=-1, keepdims=True))
+    return e / e.sum(axis=-1, keepdims=True)
+
+
+def policy_actions(
+        actor,
+        observations: np.ndarray,
+        rng: Optional[np.random.Generator]= None,
+) -> np.ndarray:
+    """ returns test (not exploring) actions of actor for a batch of observation vectors with single policy call:
+    QLearning actors (get_QVs_batch) and PG actors (_get_policy_probs) take argmax,
+    rows sampled with actor.sampled_PL probability are sampled (from softmax of QVs or policy probs),
+    other actors get action for every row with _get_action() """
+
+    rng = rng or np.random.default_rng()
+    if hasattr(actor, 'get_QVs_batch'):
+        probs = _softmax(np.asarray(actor.get_QVs_batch(observations)))
+    elif hasattr(actor, '_get_policy_probs'):
+        probs = np.asarray(actor._get_policy_probs(observations))
+    else:
+        return np.asarray([actor._get_action(observation=o) for o in observations])
+
+    actions = probs.argmax(axis=-1)
+    sampled = rng.random(len(actions)) < getattr(actor, 'sampled_PL', 0.0)
+    for ix in np.flatnonzero(sampled):
+        actions[ix] = rng.choice(probs.shape[-1], p=probs[ix])
+    return actions
+
+
+def test_on_episodes_batched(
+        actor,
+        n_episodes: int=            10,
+        max_steps: Optional[int]=   None,
+        pool: Optional[EnvyPool]=   None,   # pool of envies copies, defaults to EnvyPool of this process
+) -> Tuple[float,float]:
+    """ plays n_episodes at once on copies of actor.envy (from EnvyPool) in lockstep,
+    every step calls policy once with a batch of observations of not finished episodes,
+    episodes are seeded as actor.test_on_episodes() does (next seeds of actor.envy),
+    returns (won factor, avg reward) """
+
+    envy = actor.envy
+    if pool is None:
+        pool = get_envy_pool()
+    envies = [
+        pool.acquire(type(envy), seed=envy.seed + ix, logger=getattr(envy, '_rlog', None), **envy_kwargs(envy))
+        for ix in range(n_episodes)]
+    envy.seed += n_episodes
+    if max_steps is None:
+        max_steps = envy.max_steps
+
+    observation = envy.observation_vector(envies[0].observation)
+    observations = np.zeros((n_episodes,) + observation.shape, dtype=observation.dtype)
+    rewards = np.zeros(n_episodes)
+    won = np.zeros(n_episodes, dtype=bool)
+    active = np.ones(n_episodes, dtype=bool)
+    rng = np.random.default_rng(envy.seed)
+
+    n_steps = 0
+    while active.any() and (max_steps is None or n_steps < max_steps):
+        active_ixs = np.flatnonzero(active)
+        for ix in active_ixs:
+            envies[ix].observation_vector(None, out=observations[ix])
+        actions = policy_actions(actor, observations[active_ixs], rng=rng)
+        for ix, action in zip(active_ixs, actions):
+            rewards[ix] += envies[ix].run(action.item() if isinstance(action, np.generic) else action)
+            if envies[ix].is_terminal():
+                won[ix] = envies[ix].has_won()
+                active[ix] = False
+        n_steps += 1
+
+    for e in envies:
+        pool.release(e)
+    return float(won.mean()), float(rewards.mean())
+
+
+def attach_batched_test(actor):
+    """ replaces actor.test_on_episodes with test_on_episodes_batched,
+    envies copies are kept (for the largest n_episodes) as long as the actor """
+
+    pool = EnvyPool(max_idle=None)
+
+    def test_on_episodes(n_episodes:int=10, max_steps:Optional[int]=None) -> Tuple[float,float]:
+        return test_on_episodes_batched(actor=actor, n_episodes=n_episodes, max_steps=max_steps, pool=pool)
+
+    actor.test_on_episodes = test_on_episodes
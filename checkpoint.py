@@ -0,0 +1,227 @@
+import copy
+import glob
+import numpy as np
+import os
+import pickle
+import sys
+import threading
+from typing import Dict, List, Optional
+
+from async_eval import policy_snapshot
+
+CHECKPOINT_PATTERN = 'ckpt_*.pkl'
+
+
+# returns copy of object with cloned tensors (state_dicts share storage with live model)
+def _clone(o):
+    if hasattr(o, 'detach'):
+        return o.detach().cpu().clone()
+    if isinstance(o, dict):
+        return {k: _clone(v) for k, v in o.items()}
+    if isinstance(o, (list, tuple)):
+        return type(o)(_clone(v) for v in o)
+    return copy.deepcopy(o)
+
+
+# returns torch parts of model object (MOTorch): module, optimizer and LR scheduler
+def _torch_parts(model) -> Dict:
+    parts = {
+        'module':       getattr(model, 'module', model),
+        'opt':          getattr(model, '_opt', None),
+        'scheduler':    getattr(model, '_scheduler', None)}
+    return {k: v for k, v in parts.items() if callable(getattr(v, 'state_dict', None))}
+
+
+# returns models of actor (and of its critic): {path: model}
+def _models(actor) -> Dict:
+    models = {}
+    owners = {'': actor}
+    if getattr(actor, 'critic', None) is not None:
+        owners['critic.'] = actor.critic
+    for prefix, owner in owners.items():
+        for k, v in vars(owner).items():
+            if k != 'envy' and _torch_parts(v).get('module') is not None:
+                models[f'{prefix}{k}'] = v
+    return models
+
+
+def _get_path(actor, path:str):
+    for k in path.split('.'):
+        actor = getattr(actor, k)
+    return actor
+
+
+def envy_state(envy) -> Dict:
+    """ returns copy of envy state: snapshot() (if supported), seed counter and RNGs (also of action space) """
+    state = {'seed': getattr(envy, 'seed', None)}
+    if hasattr(envy, 'actions_rng'):
+        state['actions_rng'] = copy.deepcopy(envy.actions_rng.bit_generator.state)
+    gym_envy = getattr(envy, 'gym_envy', None)
+    if hasattr(getattr(gym_envy, 'unwrapped', None), 'np_random'):
+        state['np_random'] = copy.deepcopy(gym_envy.unwrapped.np_random.bit_generator.state)
+    if hasattr(getattr(gym_envy, 'action_space', None), 'np_random'):
+        state['action_space_np_random'] = copy.deepcopy(gym_envy.action_space.np_random.bit_generator.state)
+    if hasattr(envy, 'snapshot'):
+        try:
+            state['snapshot'] = envy.snapshot()
+        except NotImplementedError:
+            pass
+    return state
+
+
+def restore_envy_state(envy, state:Dict):
+    if state['seed'] is not None:
+        envy.seed = state['seed']
+    if 'actions_rng' in state:
+        envy.actions_rng.bit_generator.state = state['actions_rng']
+    if 'np_random' in state:
+        envy.gym_envy.unwrapped.np_random.bit_generator.state = state['np_random']
+    if 'action_space_np_random' in state:
+        envy.gym_envy.action_space.np_random.bit_generator.state = state['action_space_np_random']
+    if 'snapshot' in state:
+        envy.restore(state['snapshot'])
+
+
+def training_state(actor, **extra) -> Dict:
+    """ returns copy of actor training state, safe to be written by other thread while training continues:
+    policy (as policy_snapshot), optimizer & LR scheduler of torch models (also of the critic),
+    replay memory (ExperienceMemory), update step, NumPy / torch RNGs and envy state,
+    extra kwargs (e.g. number of batches done) are added to the state """
+
+    models = _models(actor)
+    memory = getattr(actor, 'memory', None)
+    state = {
+        'policy':       {k: _clone(v) for k, v in policy_snapshot(actor).items() if k not in models},
+        'models':       {k: {n: _clone(p.state_dict()) for n, p in _torch_parts(m).items()} for k, m in models.items()},
+        'memory':       {k: None if v is None else np.copy(v) for k, v in memory._mem.items()} if hasattr(memory, '_mem') else None,
+        'upd_step':     getattr(actor, '_upd_step', 0),
+        'np_random':    np.random.get_state(),
+        'torch_random': sys.modules['torch'].get_rng_state() if 'torch' in sys.modules else None,
+        'envy':         envy_state(actor.envy)}
+    state.update(extra)
+    return state
+
+
+def restore_training_state(actor, state:Dict):
+    """ loads training_state() into (newly built) actor """
+    for k, parts in state['models'].items():
+        model_parts = _torch_parts(_get_path(actor, k))
+        for n, sd in parts.items():
+            model_parts[n].load_state_dict(sd)
+    for k, v in state['policy'].items():
+        setattr(actor, k, copy.deepcopy(v))
+    if state['memory'] is not None and hasattr(actor.memory, '_mem'):
+        actor.memory._mem = {k: None if v is None else np.copy(v) for k, v in state['memory'].items()}
+    actor._upd_step = state['upd_step']
+    np.random.set_state(state['np_random'])
+    if state['torch_random'] is not None:
+        import torch
+        torch.set_rng_state(state['torch_random'])
+    restore_envy_state(actor.envy, state['envy'])
+
+
+# replaces obj.method with no-op for its first call (e.g. envy.reset() and memory.clear() at start of run_train())
+def _skip_first_call(obj, method:str):
+    original = getattr(obj, method)
+    def skipped(*args, **kwargs):
+        setattr(obj, method, original)
+    setattr(obj, method, skipped)
+
+
+def prepare_resume(actor, state:Dict):
+    """ restores training state and makes following run_train() continue with it
+    (run_train() starts with envy.reset() and memory.clear()),
+    streak of succeeded tests of run_train() (break_ntests) starts from 0 """
+    restore_training_state(actor, state)
+    _skip_first_call(actor.envy, 'reset')
+    if state['memory'] is not None and hasattr(actor.memory, '_mem'):
+        _skip_first_call(actor.memory, 'clear')
+
+
+class CheckpointWriter:
+    """ CheckpointWriter writes checkpoints (training_state() dicts) to folder with a background thread,
+    save() only hands the state over (training does not wait on disk),
+    state not written yet is replaced by a newer one, last keep checkpoints are kept,
+    checkpoints that fail to be written are counted in n_errors (and reported with close()) """
+
+    def __init__(self, folder:str, keep:int=2, logger=None):
+        self.folder = folder
+        self.keep = keep
+        self._rlog = logger
+        os.makedirs(self.folder, exist_ok=True)
+
+        self._pending: Optional[Dict] = None
+        self._cond = threading.Condition()
+        self._closed = False
+        self.n_written = 0
+        self.n_dropped = 0
+        self.n_errors = 0
+        self.last_error: Optional[Exception] = None
+
+        self._thread = threading.Thread(target=self._write_loop, daemon=True)
+        self._thread.start()
+
+    def save(self, state:Dict):
+        """ state must have 'n_batches' """
+        with self._cond:
+            if self._pending is not None:
+                self.n_dropped += 1
+            self._pending = state
+            self._cond.notify_all()
+
+    def _write_loop(self):
+        while True:
+            with self._cond:
+                while self._pending is None and not self._closed:
+                    self._cond.wait()
+                if self._pending is None:
+                    return
+                state, self._pending = self._pending, None
+            try:
+                self._write(state)
+            except Exception as e:
+                self.n_errors += 1
+                self.last_error = e
+                if self._rlog:
+                    self._rlog.warning(f'checkpoint of {state.get("n_batches")} batches not written: {e}')
+
+    def _write(self, state:Dict):
+        path = f'{self.folder}/ckpt_{state["n_batches"]:07d}.pkl'
+        try:
+            with open(f'{path}.tmp', 'wb') as file:
+                pickle.dump(state, file, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            if os.path.exists(f'{path}.tmp'):
+                os.remove(f'{path}.tmp')
+            raise
+        os.replace(f'{path}.tmp', path)
+        for old in checkpoints(self.folder)[:-self.keep]:
+            os.remove(old)
+        self.n_written += 1
+        if self._rlog:
+            self._rlog.debug(f'checkpoint saved: {path}')
+
+    def close(self):
+        """ writes pending checkpoint and stops the thread, reports write errors """
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+        if self.n_errors and self._rlog:
+            self._rlog.error(f'{self.n_errors} checkpoints not written to {self.folder}, last error: {self.last_error!r}')
+
+
+def checkpoints(folder:str) -> List[str]:
+    """ returns checkpoint files of folder, from the oldest """
+    return sorted(glob.glob(f'{folder}/{CHECKPOINT_PATTERN}'))
+
+
+def find_checkpoint(save_topdir:str, prefix:str='') -> Optional[str]:
+    """ returns the newest checkpoint file of runs (folders {save_topdir}/{prefix}*/checkpoints) """
+    files = [f for folder in glob.glob(f'{save_topdir}/{prefix}*/checkpoints') for f in checkpoints(folder)]
+    return max(files, key=os.path.getmtime) if files else None
+
+
+def load_checkpoint(path:str) -> Dict:
+    with open(path, 'rb') as file:
+        return pickle.load(file)
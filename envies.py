@@ -1,19 +1,71 @@
 from abc import ABC
-import gymnasium
+import copy
+from functools import partial
 import numpy as np
 import random
 from r4c.envy import RLEnvy, FiniteActionsRLEnvy, CASRLEnvy
-from typing import List, Optional
-
-
-
-class SimpleBoardGame(FiniteActionsRLEnvy):
+from typing import Dict, List, Optional, Sequence, Tuple
+
+
+def pack_board(board:Sequence[int]) -> int:
+    """ packs board (fields values 0, 1 or 2) into int key, base-3 with field 0 as the least significant """
+    key = 0
+    for v in reversed(board):
+        key = key * 3 + v
+    return key
+
+
+def unpack_board(key:int, board_size:int) -> List[int]:
+    board = []
+    for _ in range(board_size):
+        key, v = divmod(key, 3)
+        board.append(v)
+    return board
+
+
+class BatchedActionsMixin:
+    """ batched actions API of envies with finite actions:
+    cached valid actions mask, exploration actions sampled for many states at once
+    from one seeded np.random.Generator (self.actions_rng) and vectorized epsilon-greedy,
+    scalar sample_action() keeps sampling of the envy (random / Gym action_space) """
+
+    def valid_actions_mask(self) -> np.ndarray:
+        """ returns cached (read-only) boolean mask of valid actions """
+        mask = getattr(self, '_valid_actions_mask', None)
+        if mask is None:
+            valid_actions = self.get_valid_actions()
+            mask = np.zeros(max(valid_actions) + 1, dtype=bool)
+            mask[valid_actions] = True
+            mask.setflags(write=False)
+            self._valid_actions_mask = mask
+        return mask
+
+    def sample_actions(self, n:Optional[int]=None) -> np.ndarray:
+        """ samples n valid actions, n defaults to num_envs of vector envy """
+        if n is None:
+            n = self.num_envs
+        mask = self.valid_actions_mask()
+        if mask.all():
+            return self.actions_rng.integers(len(mask), size=n)
+        return self.actions_rng.choice(np.flatnonzero(mask), size=n)
+
+    def epsilon_greedy(self, q_values:np.ndarray, exploration:float) -> np.ndarray:
+        """ returns actions for (n,num_actions) q_values: greedy (among valid)
+        or sampled with exploration probability """
+        greedy = np.where(self.valid_actions_mask(), q_values, -np.inf).argmax(axis=1)
+        explore = self.actions_rng.random(len(q_values)) < exploration
+        return np.where(explore, self.sample_actions(len(q_values)), greedy)
+
+
+class SimpleBoardGame(FiniteActionsRLEnvy, BatchedActionsMixin):
     """ SimpleBoardGame has N fields on the board,
     task is to get into each field once, after that game is won """
 
     def __init__(self, board_size=4, render=False, **kwargs):
 
         self.board_size = board_size
+        self._valid_actions = list(range(self.board_size))
+        self.actions_rng = np.random.default_rng(kwargs.get('seed'))
         super().__init__(**kwargs)
 
         self.kwargs = kwargs
@@ -55,11 +107,134 @@ class SimpleBoardGame(FiniteActionsRLEnvy):
     def max_steps(self) -> Optional[int]:
         return self.board_size
 
-    def observation_vector(self, observation:List[int]) -> np.ndarray:
+    def observation_vector(self, observation:Optional[List[int]], out:Optional[np.ndarray]=None) -> np.ndarray:
+        """ observation None is current state (read without a copy),
+        if out is given (e.g. a row of caller batch buffer), vector is written into it """
+        if observation is None:
+            observation = self.state
+        if out is not None:
+            out[:] = observation
+            return out
         return np.asarray(observation, dtype=int)
 
     def get_valid_actions(self) -> List[int]:
-        return list(range(self.board_size))
+        """ returns cached list, should not be modified """
+        return self._valid_actions
+
+    def state_key(self, observation:Optional[List[int]]=None) -> int:
+        """ returns compact int key of observation (of current state by default),
+        keys are < 3**board_size, so may index flat tables """
+        return pack_board(self.state if observation is None else observation)
+
+    def decode_state_key(self, key:int) -> List[int]:
+        return unpack_board(key, self.board_size)
+
+    def snapshot(self) -> Tuple[int,...]:
+        """ returns copy of current state (board), may be restored many times """
+        return tuple(self.state)
+
+    def restore(self, snapshot:Tuple[int,...]):
+        self.state = list(snapshot)
+
+
+class VectorSimpleBoardGame(BatchedActionsMixin):
+    """ VectorSimpleBoardGame plays num_envs SimpleBoardGame boards at once,
+    boards are kept in (num_envs,board_size) int8 array,
+    boards that reach terminal state are automatically reset """
+
+    def __init__(
+            self,
+            num_envs=   10,
+            board_size= 4,
+            seed=       123,
+            render=     False):
+
+        self.num_envs = num_envs
+        self.board_size = board_size
+        self.seed = seed
+        self.render = render
+
+        self.kwargs = {'num_envs':num_envs, 'board_size':board_size}
+
+        self.actions_rng = np.random.default_rng(seed)
+        self._rows = np.arange(self.num_envs)
+        self._valid_actions = list(range(self.board_size))
+        self._key_powers = 3 ** np.arange(self.board_size, dtype=np.uint64)
+        self.reset()
+
+    @property
+    def observation(self) -> np.ndarray:
+        return self.state.copy()
+
+    def run(self, actions:np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """ plays one action on every board, returns:
+        next observations (before auto-reset), rewards, terminal mask, won mask """
+
+        self.state[self._rows, actions] += 1
+        self.n_moves += 1
+
+        # single field is incremented per move, so a board is lost only at the played field
+        # and is won when it was not lost for board_size moves
+        lost = self.state[self._rows, actions] > 1
+        won = ~lost & (self.n_moves == self.board_size)
+        terminal = lost | won
+        rewards = np.where(lost, -1.0, 1.0)
+
+        next_observation = self.state.copy()
+        if self.render:
+            print(next_observation)
+
+        if terminal.any():
+            self.state[terminal] = 0
+            self.n_moves[terminal] = 0
+
+        return next_observation, rewards, terminal, won
+
+    def reset_with_seed(self, seed:int) -> np.ndarray:
+        """ seed is used only for sample_actions() since SimpleBoardGame is deterministic """
+        self.actions_rng = np.random.default_rng(seed)
+        self.state = np.zeros((self.num_envs, self.board_size), dtype=np.int8)
+        self.n_moves = np.zeros(self.num_envs, dtype=int)
+        return self.state
+
+    def reset(self) -> np.ndarray:
+        state = self.reset_with_seed(seed=self.seed)
+        self.seed += 1
+        return state
+
+    @property
+    def max_steps(self) -> int:
+        return self.board_size
+
+    def observation_vector(self, observation:Optional[np.ndarray], out:Optional[np.ndarray]=None) -> np.ndarray:
+        if observation is None:
+            observation = self.state
+        if out is not None:
+            np.copyto(out, observation)
+            return out
+        return np.asarray(observation, dtype=int)
+
+    def get_valid_actions(self) -> List[int]:
+        return self._valid_actions
+
+    def state_keys(self, observation:Optional[np.ndarray]=None) -> np.ndarray:
+        """ returns uint64 keys (as SimpleBoardGame.state_key) of (num_envs,board_size) observation,
+        (of current states by default), supports board_size up to 40 """
+        if self.board_size > 40:
+            raise ValueError('uint64 state keys support board_size up to 40')
+        board = self.state if observation is None else observation
+        return board.astype(np.uint64) @ self._key_powers
+
+    def decode_state_keys(self, keys:np.ndarray) -> np.ndarray:
+        return ((np.asarray(keys, dtype=np.uint64)[:,None] // self._key_powers) % 3).astype(np.int8)
+
+    def snapshot(self) -> Tuple[np.ndarray, np.ndarray]:
+        """ returns copy of boards and moves counters """
+        return self.state.copy(), self.n_moves.copy()
+
+    def restore(self, snapshot:Tuple[np.ndarray, np.ndarray]):
+        self.state[:] = snapshot[0]
+        self.n_moves[:] = snapshot[1]
 
 
 class GymBasedEnvy(RLEnvy, ABC):
@@ -67,14 +242,22 @@ class GymBasedEnvy(RLEnvy, ABC):
 
     GYM_KWARGS = {'id': '__GYM_ENVY_NAME__'}
 
+    # attributes of unwrapped gym envy (physics state) saved by snapshot(), None if state can not be saved
+    SNAPSHOT_ATTRS: Optional[Tuple[str,...]] = ('state',)
+
+    # dtype of observation_vector(), np.float32 returns (float32) Gym observation without a copy
+    OBSERVATION_DTYPE = np.float64
+
     def __init__(
             self,
             max_steps=  500,  # you can override default of Gym Envy
             render=     False,
             **kwargs):
 
-        render_mode = "human" if render else None
-        self.gym_envy = gymnasium.make(render_mode=render_mode, **self.GYM_KWARGS)
+        self.gym_envy = self._build_gym_envy(render=render)
+        if hasattr(self.gym_envy.action_space, 'n'):
+            self._valid_actions = list(range(self.gym_envy.action_space.n))
+        self.actions_rng = np.random.default_rng(kwargs.get('seed'))
 
         super().__init__(**kwargs)
 
@@ -86,6 +269,12 @@ class GymBasedEnvy(RLEnvy, ABC):
         self.kwargs = kwargs
         self.kwargs['max_steps'] = max_steps
 
+    def _build_gym_envy(self, render:bool=False):
+        """ builds envy that implements gymnasium API """
+        import gymnasium # imported lazily, SimpleBoardGame does not need it
+        render_mode = "human" if render else None
+        return gymnasium.make(render_mode=render_mode, **self.GYM_KWARGS)
+
     def build_renderable(self) -> "RLEnvy":
         return type(self)(**self.kwargs, render=True)
 
@@ -123,13 +312,44 @@ class GymBasedEnvy(RLEnvy, ABC):
     def max_steps(self) -> int:
         return self._max_steps
 
-    def observation_vector(self, observation:np.ndarray) -> np.ndarray:
-        return observation.astype(float)
-
-
-class CartPoleEnvy(GymBasedEnvy, FiniteActionsRLEnvy):
+    def snapshot(self) -> Dict:
+        """ returns copy of envy state: gym envy physics state (SNAPSHOT_ATTRS), observation, step counter and is_over,
+        snapshot may be restored many times """
+        if self.SNAPSHOT_ATTRS is None:
+            raise NotImplementedError(f'{self.__class__.__name__} does not support snapshot')
+        unwrapped = self.gym_envy.unwrapped
+        return {
+            'gym':      {k: _copy(getattr(unwrapped, k)) for k in self.SNAPSHOT_ATTRS},
+            'state':    _copy(self.state),
+            'step':     self.step,
+            'is_over':  self.is_over}
+
+    def restore(self, snapshot:Dict):
+        if self.SNAPSHOT_ATTRS is None:
+            raise NotImplementedError(f'{self.__class__.__name__} does not support restore')
+        unwrapped = self.gym_envy.unwrapped
+        for k, v in snapshot['gym'].items():
+            setattr(unwrapped, k, _copy(v))
+        self.state = _copy(snapshot['state'])
+        self.step = snapshot['step']
+        self.is_over = snapshot['is_over']
+        _restore_wrappers(self.gym_envy, elapsed_steps=self.step)
+
+    def observation_vector(self, observation:Optional[np.ndarray], out:Optional[np.ndarray]=None) -> np.ndarray:
+        """ returns OBSERVATION_DTYPE vector, observation None is current state,
+        if out is given (e.g. a row of caller batch buffer), vector is written into it """
+        if observation is None:
+            observation = self.state
+        if out is not None:
+            np.copyto(out, observation)
+            return out
+        return np.asarray(observation, dtype=self.OBSERVATION_DTYPE)
+
+
+class CartPoleEnvy(GymBasedEnvy, FiniteActionsRLEnvy, BatchedActionsMixin):
 
     GYM_KWARGS = {'id': 'CartPole-v1'}
+    SNAPSHOT_ATTRS = ('state', 'steps_beyond_terminated')
 
     def __init__(
             self,
@@ -157,10 +377,10 @@ class CartPoleEnvy(GymBasedEnvy, FiniteActionsRLEnvy):
         return reward
 
     def get_valid_actions(self) -> List[int]:
-        return list(range(self.gym_envy.action_space.n))
+        return self._valid_actions
 
 
-class AcrobotEnvy(GymBasedEnvy, FiniteActionsRLEnvy):
+class AcrobotEnvy(GymBasedEnvy, FiniteActionsRLEnvy, BatchedActionsMixin):
 
     GYM_KWARGS = {'id': 'Acrobot-v1'}
 
@@ -177,7 +397,7 @@ class AcrobotEnvy(GymBasedEnvy, FiniteActionsRLEnvy):
         return self.end_game_reward if self.has_won() else reward
 
     def get_valid_actions(self) -> List[int]:
-        return list(range(self.gym_envy.action_space.n))
+        return self._valid_actions
 
 
 class LunarLanderEnvy(GymBasedEnvy, CASRLEnvy):
@@ -189,10 +409,257 @@ class LunarLanderEnvy(GymBasedEnvy, CASRLEnvy):
     Again, the throttle scales affinely from 50% to 100% between -1 and -0.5 (and 0.5 and 1, respectively). """
 
     GYM_KWARGS = {'id':'LunarLander-v2', 'continuous':True}
+    SNAPSHOT_ATTRS = None # Box2D world can not be copied
 
     def __init__(self, max_steps=500, **kwargs):
         super().__init__(max_steps=max_steps, **kwargs)
 
     @property
     def action_width(self) -> int:
-        return 2
\ No newline at end of file
+        return 2
+
+
+class VectorGymBasedEnvy(ABC):
+    """ VectorGymBasedEnvy plays num_envs Gymnasium Envies at once with gymnasium.vector,
+    keeps step / is_over bookkeeping for every sub-envy,
+    sub-envies that reach terminal state are automatically reset (on the same step) """
+
+    GYM_KWARGS = {'id': '__GYM_ENVY_NAME__'}
+
+    def __init__(
+            self,
+            num_envs=       8,
+            max_steps=      500,    # you can override default of Gym Envy
+            asynchronous=   False,  # uses AsyncVectorEnv (sub-envies in subprocesses) instead of SyncVectorEnv
+            seed=           123):
+
+        self.gym_envy = self._build_vector_envy(num_envs=num_envs, max_steps=max_steps, asynchronous=asynchronous)
+        if hasattr(self.gym_envy.single_action_space, 'n'):
+            self._valid_actions = list(range(self.gym_envy.single_action_space.n))
+        self.actions_rng = np.random.default_rng(seed)
+
+        self.num_envs = num_envs
+        self._max_steps = max_steps
+        self.seed = seed
+        self.is_over = np.zeros(self.num_envs, dtype=bool)
+        self.step = np.zeros(self.num_envs, dtype=int)
+
+        self.kwargs = {'num_envs':num_envs, 'max_steps':max_steps, 'asynchronous':asynchronous}
+
+        self.reset()
+
+    def _build_vector_envy(self, num_envs:int, max_steps:int, asynchronous:bool):
+        """ builds vector envy that implements gymnasium.vector API (with same step autoreset) """
+        import gymnasium
+        env_fns = [partial(gymnasium.make, max_episode_steps=max_steps, **self.GYM_KWARGS)] * num_envs
+        vector_type = gymnasium.vector.AsyncVectorEnv if asynchronous else gymnasium.vector.SyncVectorEnv
+        return vector_type(env_fns, **_same_step_autoreset())
+
+    @property
+    def observation(self) -> np.ndarray:
+        return self.state
+
+    def _lost_episode(self) -> np.ndarray:
+        return self.is_over & (self.step < self.max_steps)
+
+    def has_won(self) -> np.ndarray:
+        return self.is_over & (self.step >= self.max_steps)
+
+    def is_terminal(self) -> np.ndarray:
+        return self._lost_episode() | self.has_won()
+
+    def _override_step_reward(self, reward:np.ndarray) -> np.ndarray:
+        """ allows to override default step reward """
+        return reward
+
+    def run(self, actions:np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """ plays one action on every sub-envy, returns:
+        next observations (before auto-reset), rewards, terminal mask, won mask """
+
+        # sub-envies that were over at previous step have been already reset by gymnasium
+        self.step[self.is_over] = 0
+
+        next_state, reward, terminated, truncated, info = self.gym_envy.step(actions)
+        self.step += 1
+        self.state = next_state
+        self.is_over = terminated | truncated
+
+        next_observation = next_state
+        if self.is_over.any():
+            next_observation = next_state.copy()
+            next_observation[self.is_over] = np.stack(_final_observations(info)[self.is_over])
+
+        rewards = self._override_step_reward(np.asarray(reward, dtype=float))
+        return next_observation, rewards, self.is_terminal(), self.has_won()
+
+    def reset_with_seed(self, seed:int) -> np.ndarray:
+        """ sub-envies are seeded with seed, seed+1, .. """
+        self.state, _ = self.gym_envy.reset(seed=seed)
+        self.is_over[:] = False
+        self.step[:] = 0
+        return self.state
+
+    def reset(self) -> np.ndarray:
+        state = self.reset_with_seed(seed=self.seed)
+        self.seed += self.num_envs
+        return state
+
+    @property
+    def max_steps(self) -> int:
+        return self._max_steps
+
+    def observation_vector(self, observation:Optional[np.ndarray], out:Optional[np.ndarray]=None) -> np.ndarray:
+        if observation is None:
+            observation = self.state
+        if out is not None:
+            np.copyto(out, observation)
+            return out
+        return np.asarray(observation, dtype=np.float32)
+
+    def close(self):
+        self.gym_envy.close()
+
+
+class VectorCartPoleEnvy(VectorGymBasedEnvy, BatchedActionsMixin):
+
+    GYM_KWARGS = CartPoleEnvy.GYM_KWARGS
+
+    def __init__(
+            self,
+            step_reward=    1.0,
+            won_reward=     100,
+            lost_reward=   -100.0,
+            max_steps=      500,
+            **kwargs):
+
+        self.step_reward = float(step_reward)
+        self.won_reward = float(won_reward)
+        self.lost_reward = float(lost_reward)
+
+        super().__init__(max_steps=max_steps, **kwargs)
+
+        self.kwargs.update({
+            'step_reward':  step_reward,
+            'won_reward':   won_reward,
+            'lost_reward':  lost_reward})
+
+    def _override_step_reward(self, reward:np.ndarray) -> np.ndarray:
+        reward = np.full(self.num_envs, self.step_reward)
+        reward[self._lost_episode()] = self.lost_reward
+        reward[self.has_won()] = self.won_reward
+        return reward
+
+    def get_valid_actions(self) -> List[int]:
+        return self._valid_actions
+
+
+class VectorAcrobotEnvy(VectorGymBasedEnvy, BatchedActionsMixin):
+
+    GYM_KWARGS = AcrobotEnvy.GYM_KWARGS
+
+    def __init__(
+            self,
+            end_game_reward=    100,
+            max_steps=          500,
+            **kwargs):
+        self.end_game_reward = float(end_game_reward)
+        super().__init__(max_steps=max_steps, **kwargs)
+        self.kwargs['end_game_reward'] = self.end_game_reward
+
+    def _override_step_reward(self, reward:np.ndarray) -> np.ndarray:
+        return np.where(self.has_won(), self.end_game_reward, reward)
+
+    def get_valid_actions(self) -> List[int]:
+        return self._valid_actions
+
+
+class VectorLunarLanderEnvy(VectorGymBasedEnvy):
+    """ continuous action space, actions: np.array of shape (num_envs,2), see LunarLanderEnvy """
+
+    GYM_KWARGS = LunarLanderEnvy.GYM_KWARGS
+
+    def __init__(self, max_steps=500, **kwargs):
+        super().__init__(max_steps=max_steps, **kwargs)
+
+    def sample_actions(self) -> np.ndarray:
+        return self.gym_envy.action_space.sample()
+
+    @property
+    def action_width(self) -> int:
+        return 2
+
+
+class NativeCartPoleEnvy(CartPoleEnvy):
+    """ CartPoleEnvy with pure python physics (native_physics) - same trajectories as CartPoleEnvy, no gymnasium step overhead """
+
+    SNAPSHOT_ATTRS = ('state', 'elapsed')
+
+    def _build_gym_envy(self, render:bool=False):
+        if render:
+            raise NotImplementedError(f'{self.__class__.__name__} can not render, use CartPoleEnvy')
+        from native_physics import CartPolePhysics
+        return CartPolePhysics()
+
+    def build_renderable(self) -> "RLEnvy":
+        return CartPoleEnvy(**self.kwargs, render=True)
+
+
+class NativeAcrobotEnvy(AcrobotEnvy):
+    """ AcrobotEnvy with pure python physics (native_physics) - same trajectories as AcrobotEnvy, no gymnasium step overhead """
+
+    SNAPSHOT_ATTRS = ('state', 'elapsed')
+
+    def _build_gym_envy(self, render:bool=False):
+        if render:
+            raise NotImplementedError(f'{self.__class__.__name__} can not render, use AcrobotEnvy')
+        from native_physics import AcrobotPhysics
+        return AcrobotPhysics()
+
+    def build_renderable(self) -> "RLEnvy":
+        return AcrobotEnvy(**self.kwargs, render=True)
+
+
+class NativeVectorCartPoleEnvy(VectorCartPoleEnvy):
+    """ VectorCartPoleEnvy with NumPy batched physics (native_physics) - all sub-envies are stepped with single array op,
+    trajectories are the same as of VectorCartPoleEnvy, asynchronous is ignored (there are no subprocesses) """
+
+    def _build_vector_envy(self, num_envs:int, max_steps:int, asynchronous:bool):
+        from native_physics import CartPoleVector
+        return CartPoleVector(num_envs=num_envs, max_steps=max_steps)
+
+
+class NativeVectorAcrobotEnvy(VectorAcrobotEnvy):
+    """ VectorAcrobotEnvy with NumPy batched physics (native_physics),
+    trajectories may slightly diverge from VectorAcrobotEnvy (float rounding, see AcrobotVector) """
+
+    def _build_vector_envy(self, num_envs:int, max_steps:int, asynchronous:bool):
+        from native_physics import AcrobotVector
+        return AcrobotVector(num_envs=num_envs, max_steps=max_steps)
+
+
+def _same_step_autoreset() -> Dict:
+    """ gymnasium>=1.0 resets finished sub-envy with the next step() by default,
+    SAME_STEP mode (default of older versions) keeps step counting aligned with single envy """
+    import gymnasium
+    autoreset_mode = getattr(gymnasium.vector, 'AutoresetMode', None)
+    return {'autoreset_mode': autoreset_mode.SAME_STEP} if autoreset_mode else {}
+
+
+def _final_observations(info:Dict) -> np.ndarray:
+    """ returns observations of finished sub-envies (before auto-reset) from vector envy info """
+    return info['final_obs'] if 'final_obs' in info else info['final_observation']
+
+
+def _copy(v):
+    return v.copy() if isinstance(v, np.ndarray) else copy.deepcopy(v)
+
+
+def _restore_wrappers(gym_envy, elapsed_steps:int):
+    """ sets state of gym wrappers after restore: TimeLimit steps counter, OrderEnforcing reset flag """
+    env = gym_envy
+    while env is not None:
+        if hasattr(env, '_elapsed_steps'):
+            env._elapsed_steps = elapsed_steps
+        if hasattr(env, '_has_reset'):
+            env._has_reset = True
+        env = getattr(env, 'env', None)
@@ -0,0 +1,89 @@
+from contextlib import contextmanager
+import numpy as np
+import os
+from typing import Dict, List, Optional, Tuple, Union
+
+from registry import get_envy_type
+
+# envy kwargs not used in pool key, these are set on every acquire()
+NOT_KEY_KWARGS = ('seed', 'logger')
+
+
+class EnvyPool:
+    """ EnvyPool keeps built envies of this process keyed on (type, kwargs),
+    acquire() hands out reset instance reseeded with given seed (builds new one if none is idle),
+    release() takes it back, so e.g. next hpmser trial in the same worker reuses already built envy """
+
+    def __init__(self, max_idle:Optional[int]=4):
+        self.max_idle = max_idle                    # max number of idle envies kept per key, None - no limit
+        self._idle: Dict[Tuple,List] = {}
+        self.n_built = 0
+        self.n_reused = 0
+
+    @staticmethod
+    def key(envy_type:type, kwargs:Dict) -> Tuple:
+        return envy_type, tuple(sorted((k, repr(v)) for k, v in kwargs.items() if k not in NOT_KEY_KWARGS))
+
+    def acquire(
+            self,
+            envy_type: Union[str,type],
+            seed: int=      123,
+            logger=         None,
+            **kwargs):
+        envy_type = get_envy_type(envy_type)
+        idle = self._idle.get(self.key(envy_type, kwargs))
+        if idle:
+            envy = idle.pop()
+            envy.seed = seed
+            if hasattr(envy, 'kwargs'):
+                envy.kwargs['seed'] = seed
+            if hasattr(envy, 'actions_rng'):
+                envy.actions_rng = np.random.default_rng(seed)
+            if logger is not None:
+                envy._rlog = logger
+            self.n_reused += 1
+        else:
+            envy = envy_type(seed=seed, logger=logger, **kwargs)
+            envy._pool_kwargs = kwargs
+            self.n_built += 1
+        envy.reset_with_seed(seed=seed)
+        return envy
+
+    def release(self, envy):
+        """ takes back envy acquired from the pool, envy over max_idle is closed """
+        idle = self._idle.setdefault(self.key(type(envy), envy._pool_kwargs), [])
+        if self.max_idle is None or len(idle) < self.max_idle:
+            idle.append(envy)
+        elif hasattr(envy, 'close'):
+            envy.close()
+
+    @contextmanager
+    def envy(self, envy_type:Union[str,type], seed:int=123, logger=None, **kwargs):
+        envy = self.acquire(envy_type, seed=seed, logger=logger, **kwargs)
+        try:
+            yield envy
+        finally:
+            self.release(envy)
+
+    def clear(self):
+        for idle in self._idle.values():
+            for envy in idle:
+                if hasattr(envy, 'close'):
+                    envy.close()
+        self._idle = {}
+
+    def __len__(self) -> int:
+        return sum(len(idle) for idle in self._idle.values())
+
+
+_POOL: Optional[EnvyPool] = None
+_POOL_PID: Optional[int] = None
+
+
+def get_envy_pool() -> EnvyPool:
+    """ returns EnvyPool of current process (forked process gets new one) """
+    global _POOL, _POOL_PID
+    if _POOL is None or _POOL_PID != os.getpid():
+        _POOL = EnvyPool()
+        _POOL_PID = os.getpid()
+    return _POOL
@@ -0,0 +1,305 @@
+from collections import deque
+import json
+import socket
+import socketserver
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+
+# sends message (dict) as a line of JSON
+def _send(wfile, message:Dict, lock:Optional[threading.Lock]=None):
+    data = (json.dumps(message) + '\n').encode()
+    if lock is None:
+        wfile.write(data)
+        wfile.flush()
+    else:
+        with lock:
+            wfile.write(data)
+            wfile.flush()
+
+
+# returns next message or None when connection was closed
+def _recv(rfile) -> Optional[Dict]:
+    line = rfile.readline()
+    return json.loads(line) if line else None
+
+
+class _Trial:
+
+    def __init__(self, trial_id:int, kwargs:Dict):
+        self.trial_id = trial_id
+        self.kwargs = kwargs
+        self.worker: Optional[str] = None   # name of worker running the trial
+        self.last_seen = 0.0                # time of last heartbeat from worker
+        self.attempts = 0
+        self.score: Optional[float] = None
+        self.error: Optional[str] = None
+        self.done = threading.Event()
+
+
+class TrialCoordinator:
+    """ TrialCoordinator hands out hpmser trials to remote workers over TCP (JSON lines protocol),
+    trials are submitted by run_remote_trial() (HPMSer func) and block until some worker returns the score,
+    worker pulls a trial, sends heartbeats while running it and returns the score (or error),
+    trial of a worker that disconnected or was not heard for heartbeat_timeout is given to another worker,
+    there is no authentication - run it in a trusted network only """
+
+    def __init__(
+            self,
+            host: str=                  'localhost',
+            port: int=                  6150,       # 0 picks a free port (see address)
+            heartbeat_timeout: float=   60.0,
+            max_attempts: int=          3,          # trial is failed after being lost by that many workers
+            logger=                     None,
+    ):
+        self.heartbeat_timeout = heartbeat_timeout
+        self.max_attempts = max_attempts
+        self._rlog = logger
+
+        self._trials: Dict[int,_Trial] = {}
+        self._pending = deque()
+        self._cond = threading.Condition()
+        self._next_id = 0
+        self._closed = False
+        self.n_reassigned = 0
+
+        coordinator = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                coordinator._handle(self.rfile, self.wfile, peer=f'{self.client_address[0]}:{self.client_address[1]}')
+
+        self._server = socketserver.ThreadingTCPServer((host, port), Handler, bind_and_activate=False)
+        self._server.daemon_threads = True
+        self._server.allow_reuse_address = True
+        self._server.server_bind()
+        self._server.server_activate()
+
+        self._threads = [
+            threading.Thread(target=self._server.serve_forever, daemon=True),
+            threading.Thread(target=self._monitor, daemon=True)]
+        for t in self._threads:
+            t.start()
+
+    @property
+    def address(self) -> Tuple[str,int]:
+        return self._server.server_address[:2]
+
+    @property
+    def connect_host(self) -> str:
+        """ host to connect to the coordinator from this machine (bound to all interfaces -> localhost) """
+        host = self.address[0]
+        return 'localhost' if host in ('', '0.0.0.0', '::') else host
+
+    def _log(self, msg:str):
+        if self._rlog:
+            self._rlog.info(msg)
+
+    def _handle(self, rfile, wfile, peer:str):
+        """ serves single connection: trial submitter or worker """
+        worker = peer
+        try:
+            while True:
+                message = _recv(rfile)
+                if message is None:
+                    break
+                mtype = message['type']
+
+                if mtype == 'submit':
+                    trial = self.submit(message['kwargs'])
+                    trial.done.wait()
+                    _send(wfile, {'type':'result', 'score':trial.score, 'error':trial.error})
+
+                if mtype == 'hello':
+                    worker = f'{message.get("name")}@{peer}'
+                    self._log(f'worker {worker} connected')
+
+                if mtype == 'pull':
+                    trial = self._assign(worker)
+                    if trial is None:
+                        break
+                    _send(wfile, {'type':'trial', 'trial_id':trial.trial_id, 'kwargs':trial.kwargs})
+
+                if mtype == 'heartbeat':
+                    with self._cond:
+                        trial = self._trials.get(message['trial_id'])
+                        if trial is not None and trial.worker == worker:
+                            trial.last_seen = time.time()
+
+                if mtype == 'result':
+                    self._finish(message['trial_id'], score=message.get('score'), error=message.get('error'))
+
+        except (ConnectionError, OSError, ValueError):
+            pass
+        # malformed or partial message, connection is closed
+        except (KeyError, TypeError, AttributeError) as e:
+            self._log(f'bad message from {worker}: {type(e).__name__}: {e}')
+        self._lost(worker)
+
+    def submit(self, kwargs:Dict) -> _Trial:
+        """ queues trial, returned trial.done is set when the score is there """
+        with self._cond:
+            trial = _Trial(trial_id=self._next_id, kwargs=kwargs)
+            self._next_id += 1
+            self._trials[trial.trial_id] = trial
+            self._pending.append(trial.trial_id)
+            self._cond.notify_all()
+        return trial
+
+    def _assign(self, worker:str) -> Optional[_Trial]:
+        """ blocks until there is a pending trial, returns None when coordinator is closed """
+        with self._cond:
+            while not self._pending and not self._closed:
+                self._cond.wait()
+            if self._closed:
+                return None
+            trial = self._trials[self._pending.popleft()]
+            trial.worker = worker
+            trial.last_seen = time.time()
+            trial.attempts += 1
+        self._log(f'trial #{trial.trial_id} (attempt {trial.attempts}) -> {worker}')
+        return trial
+
+    def _finish(self, trial_id:int, score:Optional[float], error:Optional[str]):
+        """ first result of a trial wins, result of reassigned trial from the previous worker is accepted as well """
+        with self._cond:
+            trial = self._trials.pop(trial_id, None)
+            if trial is None:
+                return
+            if trial_id in self._pending:
+                self._pending.remove(trial_id)
+            trial.score = score
+            trial.error = error
+        trial.done.set()
+
+    def _requeue(self, trial:_Trial, reason:str):
+        """ puts back trial of lost worker (self._cond must be held) """
+        self._log(f'trial #{trial.trial_id} lost by {trial.worker} ({reason})')
+        trial.worker = None
+        if trial.attempts >= self.max_attempts:
+            self._trials.pop(trial.trial_id)
+            trial.error = f'trial lost by {trial.attempts} workers'
+            trial.done.set()
+        else:
+            self._pending.appendleft(trial.trial_id)
+            self.n_reassigned += 1
+            self._cond.notify_all()
+
+    def _lost(self, worker:str):
+        with self._cond:
+            for trial in list(self._trials.values()):
+                if trial.worker == worker:
+                    self._requeue(trial, reason='disconnected')
+
+    def _monitor(self):
+        while not self._closed:
+            time.sleep(min(1.0, self.heartbeat_timeout / 4))
+            with self._cond:
+                now = time.time()
+                for trial in list(self._trials.values()):
+                    if trial.worker is not None and now - trial.last_seen > self.heartbeat_timeout:
+                        self._requeue(trial, reason='no heartbeat')
+
+    def close(self):
+        """ stops serving, waiting submitters get an error, workers are disconnected """
+        with self._cond:
+            self._closed = True
+            for trial in self._trials.values():
+                trial.error = 'coordinator closed'
+                trial.done.set()
+            self._trials = {}
+            self._cond.notify_all()
+        self._server.shutdown()
+        self._server.server_close()
+
+
+# HPMSer func running the trial on a remote worker, returns its score
+def run_remote_trial(
+        coordinator_host: str,
+        coordinator_port: int,
+        device=             None,   # device of HPMSer is not used, worker uses its own
+        **kwargs,
+) -> float:
+    with socket.create_connection((coordinator_host, coordinator_port)) as sock:
+        rfile = sock.makefile('rb')
+        wfile = sock.makefile('wb')
+        _send(wfile, {'type':'submit', 'kwargs':kwargs})
+        message = _recv(rfile)
+    if message is None:
+        raise ConnectionError('coordinator closed connection')
+    if message['error'] is not None:
+        raise RuntimeError(f'remote trial failed: {message["error"]}')
+    return message['score']
+
+
+def run_worker(
+        coordinator_host: str=      'localhost',
+        coordinator_port: int=      6150,
+        name: Optional[str]=        None,
+        device=                     None,
+        func: Optional[Callable]=   None,   # trial function, defaults to run_actor_training_wrap
+        heartbeat_interval: float=  10.0,
+        connect_timeout: float=     60.0,   # time to wait for the coordinator to start
+        logger=                     None,
+) -> int:
+    """ pulls trials from TrialCoordinator and runs them locally with given device until coordinator closes,
+    returns number of trials done """
+
+    if func is None:
+        from run_hpmser import run_actor_training_wrap
+        func = run_actor_training_wrap
+    name = name or socket.gethostname()
+
+    start = time.time()
+    while True:
+        try:
+            sock = socket.create_connection((coordinator_host, coordinator_port))
+            break
+        except ConnectionRefusedError:
+            if time.time() - start > connect_timeout:
+                raise
+            time.sleep(1)
+
+    rfile = sock.makefile('rb')
+    wfile = sock.makefile('wb')
+    lock = threading.Lock()
+    n_done = 0
+    try:
+        _send(wfile, {'type':'hello', 'name':name}, lock)
+        while True:
+            _send(wfile, {'type':'pull'}, lock)
+            message = _recv(rfile)
+            if message is None:
+                break
+            trial_id = message['trial_id']
+
+            running = threading.Event()
+            running.set()
+            def heartbeat():
+                while running.is_set():
+                    try:
+                        _send(wfile, {'type':'heartbeat', 'trial_id':trial_id}, lock)
+                    except OSError:
+                        return
+                    time.sleep(heartbeat_interval)
+            hb_thread = threading.Thread(target=heartbeat, daemon=True)
+            hb_thread.start()
+
+            result = {'type':'result', 'trial_id':trial_id, 'score':None, 'error':None}
+            try:
+                result['score'] = float(func(device=device, **message['kwargs']))
+            except Exception as e:
+                result['error'] = f'{type(e).__name__}: {e}'
+            running.clear()
+
+            if logger:
+                logger.info(f'{name} trial #{trial_id}: {result["score"] if result["error"] is None else result["error"]}')
+            _send(wfile, result, lock)
+            n_done += 1
+
+    except (ConnectionError, OSError):
+        pass
+    finally:
+        sock.close()
+    return n_done
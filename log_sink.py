@@ -0,0 +1,179 @@
+import logging
+import queue
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+SINK_POLICIES = ('aggregate', 'drop')
+
+
+class _SinkHandler(logging.Handler):
+    """ puts records of logger to AsyncSink, handlers of logger are called by the sink thread """
+
+    def __init__(self, sink:"AsyncSink", handlers:List[logging.Handler]):
+        super().__init__()
+        self.sink = sink
+        self.handlers = handlers
+
+    def emit(self, record:logging.LogRecord):
+        # message is formatted now, args may change before the sink thread writes it
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        self.sink._put(('log', self.handlers, record), block=record.levelno >= logging.WARNING)
+
+
+class AsyncSink:
+    """ AsyncSink moves logger and TensorBoard (TBwr) writes off the training thread:
+    records and scalars are put to a bounded queue and written in batches by a background thread,
+    when the queue is full scalars are aggregated (mean per tag, written with the last step) or dropped (policy),
+    histograms, texts and log records below WARNING are dropped, WARNING and above wait for the queue,
+    items that fail to be written (writer or handler exception) are counted in n_errors """
+
+    def __init__(
+            self,
+            max_queue: int=         10000,
+            policy: str=            'aggregate',
+            flush_size: int=        1000,   # max number of items written in one batch
+            flush_interval: float=  1.0,    # writers are flushed at most that often (sec)
+    ):
+        if policy not in SINK_POLICIES:
+            raise ValueError(f'unknown sink policy: {policy}, available: {", ".join(SINK_POLICIES)}')
+        self.policy = policy
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._overflow: Dict[Tuple[int,str],List] = {}  # {(writer ix, tag): [sum, n, last step]}
+        self._lock = threading.Lock()
+        self._writers = []                              # original methods of attached TBwr
+        self._loggers = []                              # (logger, its handlers)
+        self._closed = False
+        self.n_written = 0
+        self.n_aggregated = 0
+        self.n_dropped = 0
+        self.n_errors = 0
+
+        self._thread = threading.Thread(target=self._write_loop, daemon=True)
+        self._thread.start()
+
+    def _put(self, item:Tuple, block:bool=False) -> bool:
+        """ block waits for the queue as long as the sink thread is alive """
+        while True:
+            try:
+                self._queue.put(item, block=block, timeout=self.flush_interval if block else None)
+                return True
+            except queue.Full:
+                if not block or not self._thread.is_alive():
+                    return False
+
+    def attach_tbwr(self, tbwr):
+        """ makes tbwr (TBwr instance, shared by actor and its components) write through the sink """
+        if any(original['instance'] is tbwr for original in self._writers):
+            return
+        wix = len(self._writers)
+        original = {'instance': tbwr, **{m: getattr(tbwr, m) for m in ('add', 'add_histogram', 'add_text', 'flush') if hasattr(tbwr, m)}}
+        self._writers.append(original)
+
+        def add(value, tag:str, step:Optional[int]=None):
+            if not self._put(('add', wix, {'value':value, 'tag':tag, 'step':step})):
+                if self.policy == 'aggregate':
+                    with self._lock:
+                        agg = self._overflow.setdefault((wix, tag), [0.0, 0, step])
+                        agg[0] += float(value)
+                        agg[1] += 1
+                        agg[2] = step
+                        self.n_aggregated += 1
+                else:
+                    with self._lock:
+                        self.n_dropped += 1
+        tbwr.add = add
+
+        for method in ('add_histogram', 'add_text'):
+            if method in original:
+                def queued(*args, _method=method, **kwargs):
+                    if not self._put((_method, wix, (args, kwargs))):
+                        with self._lock:
+                            self.n_dropped += 1
+                setattr(tbwr, method, queued)
+
+        if 'flush' in original:
+            tbwr.flush = lambda: None
+
+    def attach_logger(self, logger:logging.Logger):
+        """ handlers of logger are called by the sink thread """
+        handlers = logger.handlers[:]
+        self._loggers.append((logger, handlers))
+        logger.handlers = [_SinkHandler(self, handlers)]
+
+    def _write(self, item:Tuple):
+        kind, target, data = item
+        if kind == 'log':
+            for handler in target:
+                if data.levelno >= handler.level:
+                    handler.handle(data)
+        elif kind == 'add':
+            self._writers[target]['add'](**data)
+        else:
+            args, kwargs = data
+            self._writers[target][kind](*args, **kwargs)
+        self.n_written += 1
+
+    def _write_overflow(self):
+        with self._lock:
+            overflow, self._overflow = self._overflow, {}
+        for (wix, tag), (total, n, step) in overflow.items():
+            self._writers[wix]['add'](value=total/n, tag=tag, step=step)
+
+    def _flush_writers(self):
+        for original in self._writers:
+            if 'flush' in original:
+                original['flush']()
+        for _, handlers in self._loggers:
+            for handler in handlers:
+                handler.flush()
+
+    def _safe(self, method:Callable, *args):
+        """ calls method, exception is counted, the sink thread keeps running """
+        try:
+            method(*args)
+        except Exception:
+            self.n_errors += 1
+
+    def _write_loop(self):
+        last_flush = time.time()
+        while True:
+            batch = []
+            try:
+                batch.append(self._queue.get(timeout=self.flush_interval))
+                while len(batch) < self.flush_size:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                pass
+            for item in batch:
+                if item is not None:
+                    self._safe(self._write, item)
+            self._safe(self._write_overflow)
+            if time.time() - last_flush > self.flush_interval:
+                self._safe(self._flush_writers)
+                last_flush = time.time()
+            if self._closed and self._queue.empty():
+                self._safe(self._write_overflow)
+                self._safe(self._flush_writers)
+                return
+
+    def close(self):
+        """ writes everything queued, gives back loggers handlers and TBwr methods """
+        self._closed = True
+        self._put(None, block=True) # wakes the thread up (does not wait if it is not alive)
+        self._thread.join()
+        for logger, handlers in self._loggers:
+            logger.handlers = handlers
+        for original in self._writers:
+            for m in original:
+                if m != 'instance':
+                    delattr(original['instance'], m) # methods of the class are used again
+        self._loggers = []
+        self._writers = []
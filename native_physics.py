@@ -0,0 +1,348 @@
+import math
+import numpy as np
+from typing import Dict, Optional, Tuple
+
+
+class DiscreteSpace:
+    """ minimal discrete action space (n, sample, seed),
+    as of gymnasium it is not seeded by envy reset(seed) """
+
+    def __init__(self, n:int, seed:Optional[int]=None):
+        self.n = n
+        self.np_random = np.random.default_rng(seed)
+
+    def sample(self) -> int:
+        return int(self.np_random.integers(self.n))
+
+    def seed(self, seed:Optional[int]=None):
+        self.np_random = np.random.default_rng(seed)
+
+
+class CartPoleParams:
+    """ CartPole-v1 constants (gymnasium CartPoleEnv) """
+
+    N_ACTIONS = 2
+    STATE_WIDTH = 4
+
+    gravity = 9.8
+    masscart = 1.0
+    masspole = 0.1
+    total_mass = masspole + masscart
+    length = 0.5
+    polemass_length = masspole * length
+    force_mag = 10.0
+    tau = 0.02
+    theta_threshold_radians = 12 * 2 * math.pi / 360
+    x_threshold = 2.4
+
+    @staticmethod
+    def _initial_state(rng:np.random.Generator) -> np.ndarray:
+        return rng.uniform(low=-0.05, high=0.05, size=(4,))
+
+
+class AcrobotParams:
+    """ Acrobot-v1 constants (gymnasium AcrobotEnv, 'book' equations, no torque noise) """
+
+    N_ACTIONS = 3
+    STATE_WIDTH = 4
+
+    dt = 0.2
+    LINK_LENGTH_1 = 1.0
+    LINK_MASS_1 = 1.0
+    LINK_MASS_2 = 1.0
+    LINK_COM_POS_1 = 0.5
+    LINK_COM_POS_2 = 0.5
+    LINK_MOI = 1.0
+    MAX_VEL_1 = 4 * math.pi
+    MAX_VEL_2 = 9 * math.pi
+    AVAIL_TORQUE = [-1.0, 0.0, 1]
+
+    @staticmethod
+    def _initial_state(rng:np.random.Generator) -> np.ndarray:
+        return rng.uniform(low=-0.1, high=0.1, size=(4,)).astype(np.float32)
+
+
+class PhysicsEnvy:
+    """ single envy with pure python physics,
+    implements subset of gymnasium envy API used by GymBasedEnvy: reset(seed), step(action), action_space, unwrapped,
+    episode is truncated after _max_episode_steps (as TimeLimit does),
+    float operations follow gymnasium step, so trajectories are the same for the same seed """
+
+    N_ACTIONS = 2
+
+    def __init__(self, max_steps:int=500):
+        self._max_episode_steps = max_steps
+        self.action_space = DiscreteSpace(self.N_ACTIONS)
+        self.np_random = np.random.default_rng()
+        self.state = None
+        self.elapsed = 0
+
+    @property
+    def unwrapped(self):
+        return self
+
+    def _initial_state(self, rng:np.random.Generator) -> np.ndarray: pass
+
+    def _dynamics(self, action:int) -> Tuple[bool,float]:
+        """ updates self.state, returns terminated and reward """
+        pass
+
+    def _observation(self) -> np.ndarray: pass
+
+    def reset(self, seed:Optional[int]=None) -> Tuple[np.ndarray, Dict]:
+        if seed is not None:
+            self.np_random = np.random.default_rng(seed)
+        self.state = self._initial_state(self.np_random).tolist()
+        self.elapsed = 0
+        return self._observation(), {}
+
+    def step(self, action:int) -> Tuple[np.ndarray, float, bool, bool, Dict]:
+        terminated, reward = self._dynamics(int(action))
+        self.elapsed += 1
+        return self._observation(), reward, terminated, self.elapsed >= self._max_episode_steps, {}
+
+    def close(self):
+        pass
+
+
+class CartPolePhysics(CartPoleParams, PhysicsEnvy):
+
+    def _dynamics(self, action:int) -> Tuple[bool,float]:
+        x, x_dot, theta, theta_dot = self.state
+        force = self.force_mag if action == 1 else -self.force_mag
+        costheta = math.cos(theta)
+        sintheta = math.sin(theta)
+
+        temp = (force + self.polemass_length * (theta_dot * theta_dot) * sintheta) / self.total_mass
+        thetaacc = (self.gravity * sintheta - costheta * temp) / (
+            self.length * (4.0 / 3.0 - self.masspole * (costheta * costheta) / self.total_mass))
+        xacc = temp - self.polemass_length * thetaacc * costheta / self.total_mass
+
+        x = x + self.tau * x_dot
+        x_dot = x_dot + self.tau * xacc
+        theta = theta + self.tau * theta_dot
+        theta_dot = theta_dot + self.tau * thetaacc
+        self.state = [x, x_dot, theta, theta_dot]
+
+        terminated = (
+            x < -self.x_threshold or x > self.x_threshold or
+            theta < -self.theta_threshold_radians or theta > self.theta_threshold_radians)
+        return terminated, 1.0
+
+    def _observation(self) -> np.ndarray:
+        return np.array(self.state, dtype=np.float32)
+
+
+class AcrobotPhysics(AcrobotParams, PhysicsEnvy):
+
+    N_ACTIONS = 3
+
+    def _dsdt(self, s, a:float):
+        m1 = self.LINK_MASS_1
+        m2 = self.LINK_MASS_2
+        l1 = self.LINK_LENGTH_1
+        lc1 = self.LINK_COM_POS_1
+        lc2 = self.LINK_COM_POS_2
+        I1 = self.LINK_MOI
+        I2 = self.LINK_MOI
+        g = 9.8
+        theta1, theta2, dtheta1, dtheta2 = s
+        d1 = m1 * lc1**2 + m2 * (l1**2 + lc2**2 + 2 * l1 * lc2 * math.cos(theta2)) + I1 + I2
+        d2 = m2 * (lc2**2 + l1 * lc2 * math.cos(theta2)) + I2
+        phi2 = m2 * lc2 * g * math.cos(theta1 + theta2 - math.pi / 2.0)
+        phi1 = (
+            -m2 * l1 * lc2 * dtheta2**2 * math.sin(theta2)
+            - 2 * m2 * l1 * lc2 * dtheta2 * dtheta1 * math.sin(theta2)
+            + (m1 * lc1 + m2 * l1) * g * math.cos(theta1 - math.pi / 2)
+            + phi2)
+        ddtheta2 = (a + d2 / d1 * phi1 - m2 * l1 * lc2 * dtheta1**2 * math.sin(theta2) - phi2) / (
+            m2 * lc2**2 + I2 - d2**2 / d1)
+        ddtheta1 = -(d2 * ddtheta2 + phi1) / d1
+        return dtheta1, dtheta2, ddtheta1, ddtheta2
+
+    def _dynamics(self, action:int) -> Tuple[bool,float]:
+        torque = self.AVAIL_TORQUE[action]
+
+        # single rk4 step over [0, dt]
+        s = self.state
+        dt = self.dt
+        dt2 = dt / 2.0
+        k1 = self._dsdt(s, torque)
+        k2 = self._dsdt([y + dt2 * k for y, k in zip(s, k1)], torque)
+        k3 = self._dsdt([y + dt2 * k for y, k in zip(s, k2)], torque)
+        k4 = self._dsdt([y + dt * k for y, k in zip(s, k3)], torque)
+        ns = [y + dt / 6.0 * (a + 2 * b + 2 * c + d) for y, a, b, c, d in zip(s, k1, k2, k3, k4)]
+
+        ns[0] = _wrap(ns[0], -math.pi, math.pi)
+        ns[1] = _wrap(ns[1], -math.pi, math.pi)
+        ns[2] = min(max(ns[2], -self.MAX_VEL_1), self.MAX_VEL_1)
+        ns[3] = min(max(ns[3], -self.MAX_VEL_2), self.MAX_VEL_2)
+        self.state = ns
+
+        terminated = -math.cos(ns[0]) - math.cos(ns[1] + ns[0]) > 1.0
+        return terminated, 0.0 if terminated else -1.0
+
+    def _observation(self) -> np.ndarray:
+        s = self.state
+        return np.array([math.cos(s[0]), math.sin(s[0]), math.cos(s[1]), math.sin(s[1]), s[2], s[3]], dtype=np.float32)
+
+
+def _wrap(x:float, m:float, M:float) -> float:
+    diff = M - m
+    while x > M:
+        x = x - diff
+    while x < m:
+        x = x + diff
+    return x
+
+
+class PhysicsVector:
+    """ NumPy batched physics of num_envs envies,
+    implements subset of gymnasium.vector API used by VectorGymBasedEnvy: reset(seed), step(actions), close(),
+    sub-envy i is seeded with seed+i and uses its own generator (as gymnasium.vector does),
+    sub-envy is truncated after max_steps (as TimeLimit does),
+    sub-envies that are over are reset on the same step (final observations in info['final_obs']) """
+
+    N_ACTIONS = 2
+    STATE_WIDTH = 4
+
+    def __init__(self, num_envs:int, max_steps:int=500):
+        self.num_envs = num_envs
+        self.max_steps = max_steps
+        self.single_action_space = DiscreteSpace(self.N_ACTIONS)
+        self.state = np.zeros((self.num_envs, self.STATE_WIDTH))
+        self.elapsed = np.zeros(self.num_envs, dtype=int)
+        self._rngs = [np.random.default_rng() for _ in range(self.num_envs)]
+
+    def _initial_state(self, rng:np.random.Generator) -> np.ndarray: pass
+
+    def _dynamics(self, actions:np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """ updates self.state, returns terminated mask and rewards """
+        pass
+
+    def _observations(self) -> np.ndarray: pass
+
+    def _reset_envs(self, ixs:np.ndarray):
+        for ix in ixs:
+            self.state[ix] = self._initial_state(self._rngs[ix])
+        self.elapsed[ixs] = 0
+
+    def reset(self, seed:Optional[int]=None) -> Tuple[np.ndarray, Dict]:
+        if seed is not None:
+            self._rngs = [np.random.default_rng(seed + ix) for ix in range(self.num_envs)]
+        self._reset_envs(np.arange(self.num_envs))
+        return self._observations(), {}
+
+    def step(self, actions:np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, Dict]:
+        terminated, rewards = self._dynamics(np.asarray(actions))
+        self.elapsed += 1
+        truncated = self.elapsed >= self.max_steps
+        observations = self._observations()
+        info = {}
+        done = terminated | truncated
+        if done.any():
+            info['final_obs'] = observations.copy()
+            ixs = np.flatnonzero(done)
+            self._reset_envs(ixs)
+            observations[ixs] = self._observations()[ixs]
+        return observations, rewards, terminated, truncated, info
+
+    def close(self):
+        pass
+
+
+class CartPoleVector(CartPoleParams, PhysicsVector):
+    """ batched CartPoleEnv step, float64 trajectories are the same as of gymnasium """
+
+    def _dynamics(self, actions:np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        x, x_dot, theta, theta_dot = self.state.T
+        force = np.where(actions == 1, self.force_mag, -self.force_mag)
+        costheta = np.cos(theta)
+        sintheta = np.sin(theta)
+
+        temp = (force + self.polemass_length * np.square(theta_dot) * sintheta) / self.total_mass
+        thetaacc = (self.gravity * sintheta - costheta * temp) / (
+            self.length * (4.0 / 3.0 - self.masspole * np.square(costheta) / self.total_mass))
+        xacc = temp - self.polemass_length * thetaacc * costheta / self.total_mass
+
+        x = x + self.tau * x_dot
+        x_dot = x_dot + self.tau * xacc
+        theta = theta + self.tau * theta_dot
+        theta_dot = theta_dot + self.tau * thetaacc
+        self.state = np.stack([x, x_dot, theta, theta_dot], axis=-1)
+
+        terminated = (
+            (x < -self.x_threshold) | (x > self.x_threshold) |
+            (theta < -self.theta_threshold_radians) | (theta > self.theta_threshold_radians))
+        return terminated, np.ones(self.num_envs)
+
+    def _observations(self) -> np.ndarray:
+        return self.state.astype(np.float32)
+
+
+class AcrobotVector(AcrobotParams, PhysicsVector):
+    """ batched AcrobotEnv step,
+    squares of arrays are rounded (x*x) differently than gymnasium scalar pow(x,2) in ~0.1% of cases,
+    so trajectories may differ by 1 ulp per step (what chaotic acrobot amplifies in long episodes) """
+
+    N_ACTIONS = 3
+
+    def _dsdt(self, s:np.ndarray, a:np.ndarray) -> np.ndarray:
+        m1 = self.LINK_MASS_1
+        m2 = self.LINK_MASS_2
+        l1 = self.LINK_LENGTH_1
+        lc1 = self.LINK_COM_POS_1
+        lc2 = self.LINK_COM_POS_2
+        I1 = self.LINK_MOI
+        I2 = self.LINK_MOI
+        g = 9.8
+        theta1, theta2, dtheta1, dtheta2 = s.T
+        d1 = m1 * lc1**2 + m2 * (l1**2 + lc2**2 + 2 * l1 * lc2 * np.cos(theta2)) + I1 + I2
+        d2 = m2 * (lc2**2 + l1 * lc2 * np.cos(theta2)) + I2
+        phi2 = m2 * lc2 * g * np.cos(theta1 + theta2 - np.pi / 2.0)
+        phi1 = (
+            -m2 * l1 * lc2 * dtheta2**2 * np.sin(theta2)
+            - 2 * m2 * l1 * lc2 * dtheta2 * dtheta1 * np.sin(theta2)
+            + (m1 * lc1 + m2 * l1) * g * np.cos(theta1 - np.pi / 2)
+            + phi2)
+        ddtheta2 = (a + d2 / d1 * phi1 - m2 * l1 * lc2 * dtheta1**2 * np.sin(theta2) - phi2) / (
+            m2 * lc2**2 + I2 - d2**2 / d1)
+        ddtheta1 = -(d2 * ddtheta2 + phi1) / d1
+        return np.stack([dtheta1, dtheta2, ddtheta1, ddtheta2], axis=-1)
+
+    def _dynamics(self, actions:np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        torque = np.asarray(self.AVAIL_TORQUE, dtype=float)[actions][:,None]
+
+        # single rk4 step over [0, dt]
+        s = self.state
+        dt = self.dt
+        dt2 = dt / 2.0
+        k1 = self._dsdt(s, torque[:,0])
+        k2 = self._dsdt(s + dt2 * k1, torque[:,0])
+        k3 = self._dsdt(s + dt2 * k2, torque[:,0])
+        k4 = self._dsdt(s + dt * k3, torque[:,0])
+        ns = s + dt / 6.0 * (k1 + 2 * k2 + 2 * k3 + k4)
+
+        ns[:,0] = _wrap_array(ns[:,0], -np.pi, np.pi)
+        ns[:,1] = _wrap_array(ns[:,1], -np.pi, np.pi)
+        ns[:,2] = np.minimum(np.maximum(ns[:,2], -self.MAX_VEL_1), self.MAX_VEL_1)
+        ns[:,3] = np.minimum(np.maximum(ns[:,3], -self.MAX_VEL_2), self.MAX_VEL_2)
+        self.state = ns
+
+        terminated = -np.cos(ns[:,0]) - np.cos(ns[:,1] + ns[:,0]) > 1.0
+        return terminated, np.where(terminated, 0.0, -1.0)
+
+    def _observations(self) -> np.ndarray:
+        s = self.state
+        return np.stack([np.cos(s[:,0]), np.sin(s[:,0]), np.cos(s[:,1]), np.sin(s[:,1]), s[:,2], s[:,3]], axis=-1).astype(np.float32)
+
+
+def _wrap_array(x:np.ndarray, m:float, M:float) -> np.ndarray:
+    """ _wrap() of array """
+    diff = M - m
+    x = x.copy()
+    while (x > M).any():
+        x[x > M] -= diff
+    while (x < m).any():
+        x[x < m] += diff
+    return x
@@ -0,0 +1,83 @@
+from typing import Dict, Iterator, Optional
+
+from r4c.actor import TrainableActor
+
+from rollouts import RolloutReader
+
+
+# cycles over reader batches, new epoch is shuffled with next seed
+def _cycle_batches(reader:RolloutReader, batch_size:int, shuffle:bool, seed:int) -> Iterator[Dict]:
+    epoch = 0
+    while True:
+        for batch in reader.iter_batches(batch_size=batch_size, shuffle=shuffle, seed=seed+epoch):
+            yield batch
+        epoch += 1
+
+
+def run_offline_train(
+        actor: TrainableActor,
+        reader: RolloutReader,
+        num_batches: int,
+        test_freq: Optional[int],
+        test_episodes: Optional[int],
+        test_max_steps: Optional[int]=  None,
+        break_ntests: Optional[int]=    None,
+        seed: int=                      123,
+        logger=                         None,
+        **kwargs,
+) -> Dict:
+    """ trains actor with experience recorded by RolloutRecorder (does not step envy while training),
+    updates as TrainableActor.run_train() does, but batches come from reader:
+    random rows for actors sampling memory (e.g. DQN), consecutive rows for other (e.g. PG),
+    envy is stepped only by tests, tests are skipped when test_freq is None,
+    returns training results with the same keys as run_train() """
+
+    if not len(reader):
+        raise ValueError(f'dataset {reader.folder} is empty')
+    observation_width = actor.envy.observation_vector(actor.envy.observation).shape[-1]
+    if reader.chunk(0)['observations'].shape[-1] != observation_width:
+        raise ValueError(f'dataset {reader.folder} observations do not match {actor.envy.__class__.__name__} observation width {observation_width}')
+
+    logger = logger or getattr(actor, '_rlog', None)
+    sample_memory = getattr(actor, '_sample_memory', True)
+    batches = _cycle_batches(reader=reader, batch_size=actor.batch_size, shuffle=sample_memory, seed=seed)
+
+    n_action = 0
+    n_won = 0
+    n_terminals = 0
+    succeeded_row_curr = 0
+    succeeded_row_max = 0
+
+    batch_ix = 1
+    while batch_ix <= num_batches:
+
+        batch = next(batches)
+        n_action += len(batch['rewards'])
+        n_won += int(batch['wons'].sum())
+        n_terminals += int(batch['terminals'].sum())
+
+        training_data = actor._build_training_data(batch=batch)
+        metrics = actor._update(training_data=training_data)
+        actor._publish(batch=batch, training_data=training_data, metrics=metrics, inspect=False)
+        actor._upd_step += 1
+
+        if test_freq and batch_ix % test_freq == 0:
+            avg_won, avg_return = actor.test_on_episodes(n_episodes=test_episodes, max_steps=test_max_steps)
+            if avg_won == 1:
+                succeeded_row_curr += 1
+                succeeded_row_max = max(succeeded_row_max, succeeded_row_curr)
+            else:
+                succeeded_row_curr = 0
+            if logger:
+                logger.info(f'# {batch_ix:3} offline loss:{metrics["loss"]:.4f} -- {test_episodes}xTS: avg_won:{avg_won*100:.1f}%, avg_return:{avg_return:.1f}')
+            if break_ntests is not None and succeeded_row_curr == break_ntests:
+                break
+
+        batch_ix += 1
+
+    return {
+        'n_action':             n_action,
+        'n_terminal':           n_terminals,
+        'n_won':                n_won,
+        'succeeded_row_max':    succeeded_row_max,
+        'n_updates_done':       min(batch_ix, num_batches)}
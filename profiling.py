@@ -0,0 +1,138 @@
+import cProfile
+import functools
+import io
+import pstats
+import time
+from typing import Dict, Optional, Tuple
+
+
+class PhaseTimer:
+    """ PhaseTimer measures time and number of calls of methods (phases) of given objects,
+    methods are wrapped on the instance, so the class is not modified,
+    time of a phase called inside other phase (e.g. envy run inside test) is not counted twice:
+    it is subtracted from the outer phase (exclusive time) """
+
+    def __init__(self):
+        self.time: Dict[str,float] = {}
+        self.calls: Dict[str,int] = {}
+        self._stack = [] # [phase, start time, time of inner phases]
+        self.stime = time.perf_counter()
+
+    def wrap(self, obj, method_name:str, phase:str):
+        """ wraps method of obj, does nothing if obj has no such method """
+        method = getattr(obj, method_name, None)
+        if method is None:
+            return
+        self.time.setdefault(phase, 0.0)
+        self.calls.setdefault(phase, 0)
+
+        @functools.wraps(method)
+        def timed(*args, **kwargs):
+            entry = [phase, time.perf_counter(), 0.0]
+            self._stack.append(entry)
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self._stack.pop()
+                taken = time.perf_counter() - entry[1]
+                self.time[phase] += taken - entry[2]
+                self.calls[phase] += 1
+                if self._stack:
+                    self._stack[-1][2] += taken
+
+        setattr(obj, method_name, timed)
+
+    @property
+    def total(self) -> float:
+        return time.perf_counter() - self.stime
+
+    def report(self) -> str:
+        total = self.total
+        other = total - sum(self.time.values())
+        nfo = f'Phases breakdown (exclusive time, {total:.2f}sec total):\n'
+        for phase in sorted(self.time, key=lambda p: -self.time[p]):
+            calls = self.calls[phase]
+            per_call = self.time[phase] / calls * 1e6 if calls else 0.0
+            nfo += f'> {phase:20} {self.time[phase]:8.2f}sec {self.time[phase]/total*100:5.1f}% {calls:9} calls {per_call:8.1f}us/call\n'
+        nfo += f'> {"other":20} {other:8.2f}sec {other/total*100:5.1f}%'
+        return nfo
+
+    def publish(self, tbwr, step:int):
+        """ publishes phases time shares to TB """
+        total = self.total
+        for phase, phase_time in self.time.items():
+            tbwr.add(value=phase_time/total, tag=f'profile/{phase}', step=step)
+
+
+# envy and actor methods timed as phases
+ENVY_PHASES = {
+    'run':                  'envy_run',
+    'reset_with_seed':      'envy_reset',
+    'observation_vector':   'observation_vector'}
+ACTOR_PHASES = {
+    '_get_action':          'get_action',
+    '_build_training_data': 'build_training_data',
+    '_update':              'update',
+    'test_on_episodes':     'test'}
+MEMORY_PHASES = {
+    'add':                  'memory_add',
+    'get_sample':           'memory_sample',
+    'get_all':              'memory_sample'}
+
+
+def instrument_training(
+        envy,
+        actor,
+        tbwr=                                   None,   # TBwr to publish phases breakdown every publish_freq updates
+        publish_freq: int=                      50,
+        profile_batches: Optional[Tuple[int,int]]=  None,   # (first, last) update with cProfile enabled
+        profile_file: Optional[str]=            None,   # cProfile stats file (pstats / snakeviz compatible)
+) -> Tuple[PhaseTimer, Optional[cProfile.Profile]]:
+    """ wraps envy & actor methods with PhaseTimer, optionally runs cProfile for a window of batches """
+
+    timer = PhaseTimer()
+    for method_name, phase in ENVY_PHASES.items():
+        timer.wrap(envy, method_name, phase)
+    memory = getattr(actor, 'memory', None)
+    if memory is not None:
+        for method_name, phase in MEMORY_PHASES.items():
+            timer.wrap(memory, method_name, phase)
+    for method_name, phase in ACTOR_PHASES.items():
+        timer.wrap(actor, method_name, phase)
+
+    profiler = cProfile.Profile() if profile_batches else None
+
+    # counts updates to publish and to control profiler window
+    update = getattr(actor, '_update', None)
+    if update is not None and (tbwr or profiler):
+
+        n_updates = [0]
+
+        @functools.wraps(update)
+        def counted_update(*args, **kwargs):
+            n_updates[0] += 1
+            if profiler and n_updates[0] == profile_batches[0]:
+                profiler.enable()
+            metrics = update(*args, **kwargs)
+            if profiler and n_updates[0] == profile_batches[1]:
+                profiler.disable()
+                if profile_file:
+                    profiler.dump_stats(profile_file)
+            if tbwr and n_updates[0] % publish_freq == 0:
+                timer.publish(tbwr=tbwr, step=n_updates[0])
+            return metrics
+
+        actor._update = counted_update
+
+    return timer, profiler
+
+
+# returns top of cProfile stats (sorted by cumulative time)
+def profiler_report(profiler:cProfile.Profile, top:int=20) -> str:
+    stream = io.StringIO()
+    try:
+        stats = pstats.Stats(profiler, stream=stream)
+    except TypeError: # profiler was never enabled - training stopped before the window
+        return 'profiling window not reached, no stats collected'
+    stats.sort_stats('cumulative').print_stats(top)
+    return stream.getvalue()
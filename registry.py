@@ -0,0 +1,60 @@
+import importlib
+from typing import Dict, Union
+
+# envy types available by name: {name: module}
+ENVY_TYPES: Dict[str,str] = {
+    'SimpleBoardGame':          'envies',
+    'CartPoleEnvy':             'envies',
+    'AcrobotEnvy':              'envies',
+    'LunarLanderEnvy':          'envies',
+    'VectorSimpleBoardGame':    'envies',
+    'VectorCartPoleEnvy':       'envies',
+    'VectorAcrobotEnvy':        'envies',
+    'VectorLunarLanderEnvy':    'envies',
+    # native physics: single envies for training (RUN_CONFIGS *_native), NumPy batched vector envies for rollouts / benchmarks
+    'NativeCartPoleEnvy':       'envies',
+    'NativeAcrobotEnvy':        'envies',
+    'NativeVectorCartPoleEnvy': 'envies',
+    'NativeVectorAcrobotEnvy':  'envies',
+}
+
+# actor types available by name: {name: module}
+ACTOR_TYPES: Dict[str,str] = {
+    'QTableActor':              'r4c.qlearning.qtable.qt_actor',
+    'DQNActor':                 'r4c.qlearning.dqn.dqn_actor',
+    'PGActor':                  'r4c.policy_gradients.pg_actor',
+    'ACActor':                  'r4c.policy_gradients.actor_critic.ac_actor',
+    'A2CActor':                 'r4c.policy_gradients.a2c.a2c_actor',
+    'PPOActor':                 'r4c.policy_gradients.ppo.ppo_actor',
+    'PPOCASActor':              'r4c.policy_gradients.ppo_cas.ppo_cas_actor',
+}
+
+
+# returns type given by name (module is imported with the first call), type is returned as is
+def _resolve(type_or_name:Union[str,type], registry:Dict[str,str], kind:str) -> type:
+    if isinstance(type_or_name, type):
+        return type_or_name
+    if type_or_name not in registry:
+        raise ValueError(f'unknown {kind} type: {type_or_name}, registered: {", ".join(registry)}')
+    return getattr(importlib.import_module(registry[type_or_name]), type_or_name)
+
+
+def get_envy_type(type_or_name:Union[str,type]) -> type:
+    return _resolve(type_or_name, ENVY_TYPES, 'envy')
+
+
+def get_actor_type(type_or_name:Union[str,type]) -> type:
+    return _resolve(type_or_name, ACTOR_TYPES, 'actor')
+
+
+def register_envy_type(name:str, module:str):
+    ENVY_TYPES[name] = module
+
+
+def register_actor_type(name:str, module:str):
+    ACTOR_TYPES[name] = module
+
+
+# returns name of type (or name as is)
+def type_name(type_or_name:Union[str,type]) -> str:
+    return type_or_name if isinstance(type_or_name, str) else type_or_name.__name__
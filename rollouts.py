@@ -0,0 +1,199 @@
+import inspect
+import json
+import numpy as np
+import os
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from r4c.actor import TrainableActor
+
+EXPERIENCE_KEYS = ('observations', 'actions', 'rewards', 'next_observations', 'terminals', 'wons')
+
+
+class RolloutRecorder:
+    """ RolloutRecorder streams experience (as returned by actor.run_play) to chunked memory-mapped .npy files,
+    every chunk is a set of files {column}_{chunk ix}.npy with chunk_size rows,
+    rows are written directly into memmap, so RAM used is bounded,
+    column 'firsts' marks first steps of trajectories,
+    rollout.json keeps number of rows of closed chunks (chunk being written is not visible to readers) """
+
+    def __init__(
+            self,
+            folder: str,
+            observation_width: int,
+            action_shape: Tuple[int,...]=   (),
+            action_dtype=                   np.int64,
+            chunk_size: int=                10000,
+            meta: Optional[Dict]=           None,   # json serializable info saved with rollout (e.g. envy type and point)
+    ):
+        self.folder = folder
+        self.meta = meta or {}
+        os.makedirs(self.folder, exist_ok=True)
+        self.chunk_size = chunk_size
+        self.columns_spec = {
+            'observations':         ((observation_width,),  np.float32),
+            'actions':              (tuple(action_shape),   np.dtype(action_dtype)),
+            'rewards':              ((),                    np.float32),
+            'next_observations':    ((observation_width,),  np.float32),
+            'terminals':            ((),                    np.bool_),
+            'wons':                 ((),                    np.bool_),
+            'firsts':               ((),                    np.bool_)}
+        self.chunks: List[int] = [] # number of rows of closed chunks
+        self._chunk: Optional[Dict[str,np.ndarray]] = None
+        self._n_rows = 0            # number of rows in current chunk
+        self._first = True          # next row starts new trajectory
+
+    def _open_chunk(self):
+        self._chunk = {
+            k: np.lib.format.open_memmap(
+                filename=   f'{self.folder}/{k}_{len(self.chunks):05d}.npy',
+                mode=       'w+',
+                dtype=      dtype,
+                shape=      (self.chunk_size,) + shape)
+            for k, (shape, dtype) in self.columns_spec.items()}
+        self._n_rows = 0
+
+    def _close_chunk(self):
+        for column in self._chunk.values():
+            if column is not None:
+                column.flush()
+        self._chunk = None
+        self.chunks.append(self._n_rows)
+        self._save_meta()
+
+    def _save_meta(self):
+        meta = {
+            'chunk_size':   self.chunk_size,
+            'chunks':       self.chunks,
+            'columns':      {k: [list(shape), np.dtype(dtype).str] for k, (shape, dtype) in self.columns_spec.items()},
+            'meta':         self.meta}
+        with open(f'{self.folder}/rollout.json', 'w') as file:
+            json.dump(meta, file, default=str)
+
+    def add(self, experience:Dict[str,List], new_trajectory:bool=False):
+        """ adds experience, new_trajectory starts a new trajectory (e.g. after envy reset) """
+        n = len(experience['observations'])
+        if not n:
+            return
+        if new_trajectory:
+            self._first = True
+        terminals = np.asarray(experience['terminals'], dtype=bool)
+        firsts = np.zeros(n, dtype=bool)
+        firsts[0] = self._first
+        firsts[1:] = terminals[:-1]
+        self._first = bool(terminals[-1])
+        data = dict(experience, firsts=firsts)
+
+        ix = 0
+        while ix < n:
+            if self._chunk is None:
+                self._open_chunk()
+            n_add = min(n - ix, self.chunk_size - self._n_rows)
+            for k, column in self._chunk.items():
+                column[self._n_rows:self._n_rows+n_add] = data[k][ix:ix+n_add]
+            self._n_rows += n_add
+            ix += n_add
+            if self._n_rows == self.chunk_size:
+                self._close_chunk()
+
+    def attach(self, actor:TrainableActor, training:bool=True, test:bool=False):
+        """ records experience of actor.run_play() called while training and / or testing """
+        run_play = actor.run_play
+        signature = inspect.signature(run_play)
+
+        def _recorded_run_play(*args, **kwargs):
+            experience = run_play(*args, **kwargs)
+            arguments = signature.bind(*args, **kwargs)
+            arguments.apply_defaults()
+            is_training = arguments.arguments.get('training', False)
+            if (training and is_training) or (test and not is_training):
+                self.add(
+                    experience=     dict(zip(EXPERIENCE_KEYS, experience)),
+                    new_trajectory= arguments.arguments.get('reset', True))
+            return experience
+
+        actor.run_play = _recorded_run_play
+
+    def close(self):
+        """ closes last chunk (truncated to number of rows written) """
+        if self._chunk is not None:
+            n_rows = self._n_rows
+            for k in list(self._chunk):
+                self._chunk[k].flush()
+                self._chunk[k] = None
+                if n_rows < self.chunk_size:
+                    file_path = f'{self.folder}/{k}_{len(self.chunks):05d}.npy'
+                    data = np.array(np.load(file_path, mmap_mode='r')[:n_rows])
+                    np.save(file_path, data)
+            self._close_chunk()
+        self._save_meta()
+
+
+class RolloutReader:
+    """ RolloutReader lazily reads experience saved by RolloutRecorder,
+    chunks are opened as read-only memmaps, only sliced / iterated rows are loaded """
+
+    def __init__(self, folder:str):
+        self.folder = folder
+        with open(f'{self.folder}/rollout.json') as file:
+            meta = json.load(file)
+        self.chunk_size = meta['chunk_size']
+        self.chunks = meta['chunks']
+        self.keys = list(meta['columns'])
+        self.meta = meta.get('meta', {})
+        self._offsets = np.cumsum([0] + self.chunks)
+
+    def __len__(self) -> int:
+        return int(self._offsets[-1])
+
+    def chunk(self, cix:int) -> Dict[str,np.ndarray]:
+        return {
+            k: np.load(f'{self.folder}/{k}_{cix:05d}.npy', mmap_mode='r')[:self.chunks[cix]]
+            for k in self.keys}
+
+    def __getitem__(self, ixs:slice) -> Dict[str,np.ndarray]:
+        """ returns rows of slice (loaded only from chunks covering it) """
+        start, stop, step = ixs.indices(len(self))
+        if step < 1:
+            raise ValueError('RolloutReader supports only slices with positive step')
+        parts = {k: [] for k in self.keys}
+        for cix in range(len(self.chunks)):
+            c_start, c_stop = int(self._offsets[cix]), int(self._offsets[cix+1])
+            first = start if start >= c_start else start + -(-(c_start - start) // step) * step
+            if first >= min(stop, c_stop):
+                continue
+            for k, column in self.chunk(cix).items():
+                parts[k].append(np.asarray(column[first-c_start:min(stop,c_stop)-c_start:step]))
+        return {k: np.concatenate(v) for k, v in parts.items() if v}
+
+    def iter_chunks(self) -> Iterator[Dict[str,np.ndarray]]:
+        for cix in range(len(self.chunks)):
+            yield self.chunk(cix)
+
+    def trajectories(self) -> Iterator[Dict[str,np.ndarray]]:
+        """ iterates over trajectories (also these crossing chunks) """
+        parts = []
+        for data in self.iter_chunks():
+            bounds = sorted({0, len(data['firsts'])} | set(np.flatnonzero(data['firsts']).tolist()))
+            for s, e in zip(bounds[:-1], bounds[1:]):
+                if data['firsts'][s] and parts:
+                    yield {k: np.concatenate([p[k] for p in parts]) for k in self.keys}
+                    parts = []
+                parts.append({k: np.asarray(v[s:e]) for k, v in data.items()})
+        if parts:
+            yield {k: np.concatenate([p[k] for p in parts]) for k in self.keys}
+
+    def iter_batches(
+            self,
+            batch_size: int,
+            shuffle: bool=  True,
+            seed: int=      123,
+    ) -> Iterator[Dict[str,np.ndarray]]:
+        """ iterates over batches of rows (single epoch), shuffled within chunks """
+        rng = np.random.default_rng(seed)
+        chunk_ixs = rng.permutation(len(self.chunks)) if shuffle else range(len(self.chunks))
+        for cix in chunk_ixs:
+            data = self.chunk(cix)
+            ixs = rng.permutation(self.chunks[cix]) if shuffle else np.arange(self.chunks[cix])
+            for s in range(0, len(ixs), batch_size):
+                bixs = np.sort(ixs[s:s+batch_size])
+                yield {k: v[bixs] for k, v in data.items()}
@@ -0,0 +1,259 @@
+import glob
+import json
+import os
+from pypaq.lipytools.pylogger import get_pylogger
+from pypaq.lipytools.printout import stamp
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional, Sequence, Union
+
+from registry import ENVY_TYPES, get_envy_type, type_name
+from run_training import RUN_CONFIGS, run_actor_training
+
+# startup targets: {name: python code}, code is timed in a fresh interpreter
+STARTUP_TARGETS = {
+    'import_envies':        'import envies',
+    'import_run_training':  'import run_training',
+    'SimpleBoardGame':      'from envies import SimpleBoardGame; SimpleBoardGame()',
+    'CartPoleEnvy':         'from envies import CartPoleEnvy; CartPoleEnvy()',
+    'QTable_SBG':           "from run_training import RUN_CONFIGS; from registry import get_envy_type, get_actor_type; "
+                            "c = RUN_CONFIGS['QTable_SBG']; get_envy_type(c['envy_type']); get_actor_type(c['actor_type'])",
+}
+
+# heavy modules reported as loaded (or not) by startup target
+HEAVY_MODULES = ('gymnasium', 'torch')
+
+
+def benchmark_envy(
+        envy_type: Union[str,type],
+        n_steps: int=   10000,
+        n_resets: int=  1000,
+        seed: int=      121,
+) -> Dict[str,float]:
+    """ measures raw throughput of envy: run() steps/sec (with reset of terminal envy),
+    reset_with_seed() / sec and observation_vector() / sec,
+    for vector envies steps are counted for every sub-envy """
+
+    envy = get_envy_type(envy_type)(seed=seed)
+    num_envs = getattr(envy, 'num_envs', None)
+    sample = envy.sample_actions if num_envs else envy.sample_action
+    n_calls = n_steps // num_envs if num_envs else n_steps
+    actions = [sample() for _ in range(n_calls)]
+
+    stime = time.perf_counter()
+    if num_envs:
+        for action in actions:
+            envy.run(action)
+    else:
+        for action in actions:
+            envy.run(action)
+            if envy.is_terminal():
+                envy.reset()
+    run_time = time.perf_counter() - stime
+
+    stime = time.perf_counter()
+    for ix in range(n_resets):
+        envy.reset_with_seed(seed=seed+ix)
+    reset_time = time.perf_counter() - stime
+
+    observation = envy.observation
+    stime = time.perf_counter()
+    for _ in range(n_calls):
+        envy.observation_vector(observation)
+    obs_vec_time = time.perf_counter() - stime
+
+    if hasattr(envy, 'close'):
+        envy.close()
+
+    return {
+        'run_steps_per_sec':            n_calls * (num_envs or 1) / run_time,
+        'resets_per_sec':               n_resets / reset_time,
+        'observation_vector_per_sec':   n_calls / obs_vec_time}
+
+
+def benchmark_actor(
+        run_config_name: str,
+        num_batches: int=   50,
+        seed: int=          121,
+) -> Dict[str,float]:
+    """ measures end-to-end actor throughput of RUN_CONFIGS entry with num_batches,
+    single test is played at the end of training """
+
+    config = dict(RUN_CONFIGS[run_config_name])
+    config.update({
+        'num_batches':      num_batches,
+        'test_freq':        num_batches,
+        'test_episodes':    1})
+
+    stime = time.perf_counter()
+    tr_res = run_actor_training(**config, seed=seed, hpmser_mode=True)
+    run_time = time.perf_counter() - stime
+
+    return {
+        'actions_per_sec':  tr_res['n_action'] / run_time,
+        'updates_per_sec':  tr_res['n_updates_done'] / run_time,
+        'time':             run_time}
+
+
+def benchmark_startup(
+        code: str,
+        n_runs: int=    5,
+) -> Dict[str,float]:
+    """ measures time of given python code run in a fresh interpreter (best of n_runs),
+    reports heavy modules (HEAVY_MODULES) loaded by the code """
+    script = (
+        'import sys, time\n'
+        's = time.perf_counter()\n'
+        f'{code}\n'
+        'print(time.perf_counter() - s)\n'
+        f'print(*[m in sys.modules for m in {HEAVY_MODULES}])')
+    times = []
+    for _ in range(n_runs):
+        out = subprocess.check_output(
+            [sys.executable, '-c', script],
+            cwd=    os.path.dirname(os.path.abspath(__file__)),
+            stderr= subprocess.DEVNULL).decode().split('\n')
+        times.append(float(out[0]))
+    res = {'startup_sec': min(times)}
+    for m, loaded in zip(HEAVY_MODULES, out[1].split()):
+        res[f'loads_{m}'] = float(loaded == 'True')
+    return res
+
+
+def run_benchmarks(
+        envy_types: Sequence[Union[str,type]]=      tuple(ENVY_TYPES),
+        run_config_names: Optional[Sequence[str]]=  None,   # None benchmarks all RUN_CONFIGS
+        n_steps: int=                               10000,
+        num_batches: int=                           50,
+        startup_targets: Optional[Dict[str,str]]=   None,   # None benchmarks STARTUP_TARGETS
+        save_topdir: str=                           '_benchmarks',
+) -> Dict:
+    """ runs startup, envies and actors benchmarks, saves results to json file under save_topdir """
+
+    if run_config_names is None:
+        run_config_names = list(RUN_CONFIGS.keys())
+    if startup_targets is None:
+        startup_targets = STARTUP_TARGETS
+
+    logger = get_pylogger(name='run_benchmarks')
+
+    results = {
+        'stamp':    stamp(),
+        'commit':   _git_commit(),
+        'startup':  {},
+        'envies':   {},
+        'actors':   {}}
+
+    for name, code in startup_targets.items():
+        try:
+            results['startup'][name] = benchmark_startup(code=code)
+        except Exception as e:
+            logger.warning(f'startup benchmark of {name} failed: {e}')
+            continue
+        logger.info(f'startup {name}: {_nfo(results["startup"][name])}')
+
+    for et in envy_types:
+        et_name = type_name(et)
+        try:
+            results['envies'][et_name] = benchmark_envy(envy_type=et, n_steps=n_steps)
+        except Exception as e:
+            logger.warning(f'benchmark of {et_name} failed: {e}')
+            continue
+        logger.info(f'{et_name}: {_nfo(results["envies"][et_name])}')
+
+    for rcn in run_config_names:
+        try:
+            results['actors'][rcn] = benchmark_actor(run_config_name=rcn, num_batches=num_batches)
+        except Exception as e:
+            logger.warning(f'benchmark of {rcn} failed: {e}')
+            continue
+        logger.info(f'{rcn}: {_nfo(results["actors"][rcn])}')
+
+    for name, speedup in native_speedups(results).items():
+        logger.info(f'{name} speedup vs Gym: {speedup:.2f}x')
+
+    os.makedirs(save_topdir, exist_ok=True)
+    file_path = f'{save_topdir}/bench_{results["stamp"]}.json'
+    with open(file_path, 'w') as file:
+        json.dump(results, file, indent=4)
+    logger.info(f'benchmark results saved to {file_path}')
+
+    return results
+
+
+def compare_benchmarks(
+        prev: Dict,
+        curr: Dict,
+        tolerance: float=   0.1,    # relative drop of throughput reported as regression
+) -> List[str]:
+    """ compares two run_benchmarks() results, returns list of regressions,
+    throughput (per_sec) drop or startup time growth by more than tolerance is a regression """
+    regressions = []
+    for group in ['startup', 'envies', 'actors']:
+        for name in curr.get(group, {}):
+            for metric, value in curr[group][name].items():
+                prev_value = prev.get(group, {}).get(name, {}).get(metric)
+                if not prev_value:
+                    continue
+                if metric.endswith('per_sec'):
+                    regressed = value < prev_value * (1 - tolerance)
+                elif metric == 'startup_sec':
+                    regressed = value > prev_value * (1 + tolerance)
+                else:
+                    continue
+                if regressed:
+                    regressions.append(
+                        f'{name} {metric}: {prev_value:.3f} -> {value:.3f} ({(value/prev_value-1)*100:.1f}%)')
+    return regressions
+
+
+# returns speedups of native physics envies (Native*) and RUN_CONFIGS (*_native) vs Gym based ones found in results
+def native_speedups(results:Dict) -> Dict[str,float]:
+    speedups = {}
+    for name, res in results['envies'].items():
+        gym_name = name.replace('Native', '', 1)
+        if name.startswith('Native') and gym_name in results['envies']:
+            speedups[name] = res['run_steps_per_sec'] / results['envies'][gym_name]['run_steps_per_sec']
+    for rcn, res in results['actors'].items():
+        gym_rcn = rcn[:-len('_native')]
+        if rcn.endswith('_native') and gym_rcn in results['actors']:
+            speedups[rcn] = res['actions_per_sec'] / results['actors'][gym_rcn]['actions_per_sec']
+    return speedups
+
+
+# returns latest benchmark results saved in save_topdir (excluding given stamp)
+def load_latest_benchmark(save_topdir:str='_benchmarks', exclude_stamp:Optional[str]=None) -> Optional[Dict]:
+    file_paths = sorted(glob.glob(f'{save_topdir}/bench_*.json'), key=os.path.getmtime)
+    file_paths = [fp for fp in file_paths if exclude_stamp is None or exclude_stamp not in fp]
+    if not file_paths:
+        return None
+    with open(file_paths[-1]) as file:
+        return json.load(file)
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=    os.path.dirname(os.path.abspath(__file__)),
+            stderr= subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+
+def _nfo(res:Dict[str,float]) -> str:
+    return ', '.join(f'{k}: {v:.1f}' if k.endswith('per_sec') else f'{k}: {v:.3f}' for k, v in res.items())
+
+
+if __name__ == "__main__":
+
+    results = run_benchmarks(
+        #run_config_names=  ['QTable_SBG','DQN_CP'],
+    )
+
+    prev_results = load_latest_benchmark(exclude_stamp=results['stamp'])
+    if prev_results:
+        regressions = compare_benchmarks(prev=prev_results, curr=results)
+        print(f'regressions vs {prev_results["commit"]} ({prev_results["stamp"]}):')
+        print('\n'.join(regressions) if regressions else '> none')
@@ -1,8 +1,135 @@
+from contextlib import contextmanager
 from copy import deepcopy
+import fcntl
+import hashlib
 from hpmser.search import HPMSer
+import inspect
+import json
+import math
+import os
+import pickle
+from pypaq.lipytools.printout import stamp
 from pypaq.mpython.devices import DevicesPypaq
+import sqlite3
+import time
+from typing import Dict, List, Optional, Tuple
 
-from run_training import RUN_CONFIGS, run_actor_training
+from hpmser_remote import TrialCoordinator, run_remote_trial
+from run_training import RUN_CONFIGS, run_actor_training, TrainingBreak
+
+
+class SuccessiveHalving:
+    """ asynchronous successive halving (ASHA, stopping variant) of hpmser trials,
+    rungs are placed at min_tests * eta**r training tests,
+    trial reaching a rung records its (won factor, avg reward) and is continued only when it is in the top 1/eta
+    of trials recorded at this rung so far, rungs records are shared by trial processes with files in folder """
+
+    def __init__(
+            self,
+            folder: str,
+            eta: int=       3,
+            min_tests: int= 1,
+    ):
+        self.folder = folder
+        self.eta = eta
+        self.min_tests = min_tests
+        os.makedirs(self.folder, exist_ok=True)
+
+    def rung(self, n_tests:int) -> Optional[int]:
+        """ returns rung index for n_tests or None if it is not a rung """
+        if n_tests < self.min_tests or n_tests % self.min_tests:
+            return None
+        r = round(math.log(n_tests // self.min_tests, self.eta))
+        return r if self.min_tests * self.eta ** r == n_tests else None
+
+    def _record(self, rung:int, won:float, reward:float) -> List[Tuple[float,float]]:
+        """ appends trial result to rung records, returns all rung records """
+        with open(f'{self.folder}/rung_{rung}.txt', 'a+') as file:
+            fcntl.flock(file, fcntl.LOCK_EX)
+            file.write(f'{won} {reward}\n')
+            file.flush()
+            file.seek(0)
+            records = [tuple(float(v) for v in line.split()) for line in file if line.strip()]
+            fcntl.flock(file, fcntl.LOCK_UN)
+        return records
+
+    def report(self, n_tests:int, won:float, reward:float) -> bool:
+        """ reports trial test result, returns False if trial should be stopped """
+        rung = self.rung(n_tests)
+        if rung is None:
+            return True
+        records = self._record(rung=rung, won=won, reward=reward)
+        if len(records) < self.eta:
+            return True
+        n_promoted = max(1, len(records) // self.eta)
+        cutoff = sorted(records, reverse=True)[n_promoted-1]
+        return (won, reward) >= cutoff
+
+    def test_callback(self, n_tests:int, won:float, reward:float):
+        """ run_actor_training() test_callback, stops the trial with TrainingBreak """
+        if not self.report(n_tests=n_tests, won=won, reward=reward):
+            raise TrainingBreak(f'stopped by SuccessiveHalving at test {n_tests}')
+
+
+class TrialCache:
+    """ persistent (sqlite file) cache of trials tr_res keyed by hash of full trial config (with seed),
+    least recently used trials are evicted above max_size, may be shared by many processes """
+
+    # config keys that do not change trial result
+    IGNORED_KEYS = ('device', 'test_callback', 'loglevel', 'reuse_envy')
+
+    def __init__(self, file_path:str, max_size:int=10000):
+        self.file_path = file_path
+        self.max_size = max_size
+        os.makedirs(os.path.dirname(file_path) or '.', exist_ok=True)
+        with self._connect() as db:
+            db.execute('CREATE TABLE IF NOT EXISTS trials (key TEXT PRIMARY KEY, tr_res BLOB, last_access REAL)')
+
+    @contextmanager
+    def _connect(self):
+        """ yields connection, commits and closes it """
+        db = sqlite3.connect(self.file_path, timeout=60)
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    @staticmethod
+    def config_hash(config:Dict) -> str:
+        """ canonical hash of (nested) config dict, types are represented by their full names """
+
+        def canonical(o):
+            if isinstance(o, dict):
+                return {str(k): canonical(v) for k, v in o.items() if k not in TrialCache.IGNORED_KEYS}
+            if isinstance(o, (list, tuple)):
+                return [canonical(v) for v in o]
+            if isinstance(o, type):
+                return f'{o.__module__}.{o.__qualname__}'
+            if isinstance(o, (str, int, float, bool)) or o is None:
+                return o
+            return repr(o)
+
+        return hashlib.sha256(json.dumps(canonical(config), sort_keys=True).encode()).hexdigest()
+
+    def get(self, key:str) -> Optional[Dict]:
+        with self._connect() as db:
+            row = db.execute('SELECT tr_res FROM trials WHERE key=?', (key,)).fetchone()
+            if row is None:
+                return None
+            db.execute('UPDATE trials SET last_access=? WHERE key=?', (time.time(), key))
+        return pickle.loads(row[0])
+
+    def put(self, key:str, tr_res:Dict):
+        with self._connect() as db:
+            db.execute('INSERT OR REPLACE INTO trials VALUES (?,?,?)', (key, pickle.dumps(tr_res), time.time()))
+            db.execute(
+                'DELETE FROM trials WHERE key IN (SELECT key FROM trials ORDER BY last_access DESC LIMIT -1 OFFSET ?)',
+                (self.max_size,))
+
+    def __len__(self):
+        with self._connect() as db:
+            return db.execute('SELECT COUNT(*) FROM trials').fetchone()[0]
 
 
 # updates nested dict (run_configs[run_config_name]) with kwargs, returns score <0;1>
@@ -11,6 +138,11 @@ def run_actor_training_wrap(
         device: DevicesPypaq,
         max_batch_size: int,
         hpmser_mode=        True,
+        asha_folder: Optional[str]= None,   # enables SuccessiveHalving of trials with records in folder
+        asha_eta: int=              3,
+        asha_min_tests: int=        1,
+        cache_file: Optional[str]=  None,   # enables TrialCache of trials results in sqlite file
+        cache_max_size: int=        10000,
         **kwargs                # kwargs starting with specific prefix go to one of mdicts
 ) -> float:
 
@@ -39,12 +171,36 @@ def run_actor_training_wrap(
     if 'motorch_point' in pd['actor_point']:
         pd['actor_point']['motorch_point'].update(motorch_point)
 
+    cache = None
+    if cache_file:
+        cache = TrialCache(file_path=cache_file, max_size=cache_max_size)
+        pd.setdefault('seed', inspect.signature(run_actor_training).parameters['seed'].default)
+        cache_key = TrialCache.config_hash(pd)
+        tr_res = cache.get(cache_key)
+        if tr_res is not None:
+            return _score(tr_res=tr_res, pd=pd, batch_size=actor_point['batch_size'], max_batch_size=max_batch_size)
+
+    if asha_folder:
+        asha = SuccessiveHalving(folder=asha_folder, eta=asha_eta, min_tests=asha_min_tests)
+        pd['test_callback'] = asha.test_callback
+
     tr_res = run_actor_training(**pd)
 
-    if tr_res['n_updates_done'] == pd['num_batches']:
+    # trials stopped by SuccessiveHalving are not cached since it depends on other trials
+    if cache is not None and 'broken' not in tr_res:
+        cache.put(cache_key, tr_res)
+
+    return _score(tr_res=tr_res, pd=pd, batch_size=actor_point['batch_size'], max_batch_size=max_batch_size)
+
+
+# returns trial score <0;1>
+def _score(tr_res:Dict, pd:Dict, batch_size:int, max_batch_size:int) -> float:
+
+    # not solved (also stopped by SuccessiveHalving)
+    if tr_res['n_updates_done'] == pd['num_batches'] or 'broken' in tr_res:
         return 0.0
 
-    num_actions_done = tr_res['n_updates_done'] * actor_point['batch_size']
+    num_actions_done = tr_res['n_updates_done'] * batch_size
     num_actions_max = pd['num_batches'] * max_batch_size
 
     return (num_actions_max - num_actions_done) / num_actions_max
@@ -114,6 +270,11 @@ if __name__ == "__main__":
 
     }
 
+    # runs trials on remote workers (run_hpmser_worker.py) connected to TrialCoordinator at (host, port),
+    # None runs trials with local processes
+    remote = None # ('0.0.0.0', 6150)
+    remote_slots = 10 # max number of trials run at once by all workers
+
     for rc_name in [
         #'DQN_CP',
         #'PG_CP',
@@ -129,17 +290,35 @@ if __name__ == "__main__":
             'inspect':          False,
             'break_ntests':     1,
             'max_batch_size':   max(hpmser_configs[rc_name]['psdd']['act_batch_size']),
+            'asha_folder':      f'_hpmser/asha_{rc_name}_{stamp()}',
+            'asha_eta':         3,
+            'asha_min_tests':   2,
+            'cache_file':       f'_hpmser/trials_cache_{rc_name}.db',
+            'reuse_envy':       True,
         }
         if 'const' in hpmser_configs[rc_name]:
             func_const.update(hpmser_configs[rc_name]['const'])
 
+        func = run_actor_training_wrap
+        devices = [None]*10
+        coordinator = None
+        if remote:
+            # asha_folder and cache_file are local to every worker machine
+            coordinator = TrialCoordinator(host=remote[0], port=remote[1])
+            func = run_remote_trial
+            func_const.update({'coordinator_host':coordinator.connect_host, 'coordinator_port':coordinator.address[1]})
+            devices = [None]*remote_slots
+
         HPMSer(
-            func=       run_actor_training_wrap,
+            func=       func,
             func_psdd=  hpmser_configs[rc_name]['psdd'],
             func_const= func_const,
-            devices=    [None]*10,
+            devices=    devices,
             n_loops=    1000,
             plot_axes=  ['mot_hidden_width','act_exploration'],
             #loglevel=   10,
             #do_TB=      False,
-        )
\ No newline at end of file
+        )
+
+        if coordinator:
+            coordinator.close()
\ No newline at end of file
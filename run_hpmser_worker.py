@@ -0,0 +1,25 @@
+from multiprocessing import Process
+import socket
+
+from hpmser_remote import run_worker
+
+
+if __name__ == "__main__":
+
+    coordinator_host = 'localhost'  # machine running run_hpmser.py with remote set
+    coordinator_port = 6150
+    devices = [None]*4              # one worker process per device
+
+    workers = [
+        Process(
+            target= run_worker,
+            kwargs= {
+                'coordinator_host': coordinator_host,
+                'coordinator_port': coordinator_port,
+                'name':             f'{socket.gethostname()}_{ix}',
+                'device':           device})
+        for ix, device in enumerate(devices)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
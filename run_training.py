@@ -1,29 +1,26 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import multiprocessing
+import numpy as np
+import os
 from pypaq.lipytools.pylogger import get_pylogger
 from pypaq.lipytools.printout import stamp
 from pypaq.pms.base import POINT
-from typing import Dict
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
 
-from r4c.envy import RLEnvy
-from r4c.actor import TrainableActor
-from r4c.qlearning.qtable.qt_actor import QTableActor
-from r4c.qlearning.dqn.dqn_actor import DQNActor
-from r4c.policy_gradients.pg_actor import PGActor
-from r4c.policy_gradients.actor_critic.ac_actor import ACActor
-from r4c.policy_gradients.a2c.a2c_actor import A2CActor
-from r4c.policy_gradients.ppo.ppo_actor import PPOActor
-from r4c.policy_gradients.ppo_cas.ppo_cas_actor import PPOCASActor
+from profiling import instrument_training, profiler_report
+from envy_pool import get_envy_pool
+from registry import get_envy_type, get_actor_type
 
-from envies import SimpleBoardGame, CartPoleEnvy, AcrobotEnvy, LunarLanderEnvy
-
-# run_actor_training() configurations
+# run_actor_training() configurations, envy and actor types are given by names (registry), modules are imported lazily
 RUN_CONFIGS = {
 
     ### SimpleBoardGame
 
     'QTable_SBG': {
-        'envy_type':        SimpleBoardGame,
+        'envy_type':        'SimpleBoardGame',
         'envy_point':       {'board_size':6},
-        'actor_type':       QTableActor,
+        'actor_type':       'QTableActor',
         'actor_point':      {
             'exploration':      0.5,
             'discount':         0.5,
@@ -38,9 +35,9 @@ RUN_CONFIGS = {
     },
 
     'DQN_SBG': {
-        'envy_type':        SimpleBoardGame,
+        'envy_type':        'SimpleBoardGame',
         'envy_point':       {'board_size':6},
-        'actor_type':       DQNActor,
+        'actor_type':       'DQNActor',
         'actor_point':      {
             'exploration':      0.5,
             'discount':         0.5,
@@ -61,12 +58,12 @@ RUN_CONFIGS = {
     ### CartPole
 
     'DQN_CP': {
-        'envy_type': CartPoleEnvy,
+        'envy_type': 'CartPoleEnvy',
         'envy_point':       {
             'step_reward':      0.01,
             'won_reward':       0.0,
             'lost_reward':     -1.0},
-        'actor_type': DQNActor,
+        'actor_type': 'DQNActor',
         'actor_point': {
             'exploration':      0.6,
             'discount':         0.95,
@@ -85,12 +82,12 @@ RUN_CONFIGS = {
     },
 
     'PG_CP': {
-        'envy_type':        CartPoleEnvy,
+        'envy_type':        'CartPoleEnvy',
         'envy_point':       {
             'step_reward':      0.01,
             'won_reward':       0.0,
             'lost_reward':     -1.0},
-        'actor_type':       PGActor,
+        'actor_type':       'PGActor',
         'actor_point':      {
             'exploration':      0.0,
             'discount':         0.95,
@@ -107,15 +104,16 @@ RUN_CONFIGS = {
         'num_batches':      500,
         'test_freq':        50,
         'test_episodes':    10,
+        'rollout_workers':  0,  # >0 trains with decoupled rollout workers (ActorLearner)
     },
 
     'AC_CP': {
-        'envy_type':        CartPoleEnvy,
+        'envy_type':        'CartPoleEnvy',
         'envy_point':       {
             'step_reward':      0.01,
             'won_reward':       0.0,
             'lost_reward':     -1.0},
-        'actor_type':       ACActor,
+        'actor_type':       'ACActor',
         'actor_point':      {
             'exploration':      0.0,
             'discount':         0.95,
@@ -138,15 +136,16 @@ RUN_CONFIGS = {
         'num_batches':      1500,
         'test_freq':        50,
         'test_episodes':    10,
+        'rollout_workers':  0,  # >0 trains with decoupled rollout workers (ActorLearner)
     },
 
     'A2C_CP': {
-        'envy_type':        CartPoleEnvy,
+        'envy_type':        'CartPoleEnvy',
         'envy_point':       {
             'step_reward':      0.01,
             'won_reward':       0.0,
             'lost_reward':     -1.0},
-        'actor_type':       A2CActor,
+        'actor_type':       'A2CActor',
         'actor_point':      {
             'exploration':      0.0,
             'discount':         0.95,
@@ -165,15 +164,16 @@ RUN_CONFIGS = {
         'num_batches':      500,
         'test_freq':        50,
         'test_episodes':    10,
+        'rollout_workers':  0,  # >0 trains with decoupled rollout workers (ActorLearner)
     },
 
     'PPO_CP': {
-        'envy_type':        CartPoleEnvy,
+        'envy_type':        'CartPoleEnvy',
         'envy_point':       {
             'step_reward':      0.01,
             'won_reward':       0.0,
             'lost_reward':     -1.0},
-        'actor_type':       PPOActor,
+        'actor_type':       'PPOActor',
         'actor_point':      {
             'exploration':      0.0,
             'discount':         0.95,
@@ -197,14 +197,15 @@ RUN_CONFIGS = {
         'num_batches':      500,
         'test_freq':        50,
         'test_episodes':    10,
+        'rollout_workers':  0,  # >0 trains with decoupled rollout workers (ActorLearner)
     },
 
     ### Acrobot
 
     'AC_ACR': {
-        'envy_type':        AcrobotEnvy,
+        'envy_type':        'AcrobotEnvy',
         'envy_point':       {},
-        'actor_type':       ACActor,
+        'actor_type':       'ACActor',
         'actor_point':      {
             'exploration':      0.1,
             'discount':         0.95,
@@ -229,9 +230,9 @@ RUN_CONFIGS = {
     ### LunarLander
 
     'PPOC_LL': {
-        'envy_type':        LunarLanderEnvy,
+        'envy_type':        'LunarLanderEnvy',
         'envy_point':       {},
-        'actor_type':       PPOCASActor,
+        'actor_type':       'PPOCASActor',
         'actor_point':      {
             'exploration':      0.0,
             'discount':         0.95,
@@ -253,15 +254,35 @@ RUN_CONFIGS = {
         'num_batches':      500,
         'test_freq':        50,
         'test_episodes':    10,
+        'rollout_workers':  0,  # >0 trains with decoupled rollout workers (ActorLearner)
     },
 
 }
 
+# the same configurations with native physics envies (native_physics.py): trajectories as of Gym envies, faster steps
+RUN_CONFIGS.update({
+    f'{rcn}_native': {**RUN_CONFIGS[rcn], 'envy_type': f'Native{RUN_CONFIGS[rcn]["envy_type"]}'}
+    for rcn in ['DQN_CP', 'PG_CP', 'AC_CP', 'A2C_CP', 'PPO_CP', 'AC_ACR']})
+
+
+class TrainingBreak(Exception):
+    """ raised by run_actor_training() test_callback to stop training early """
+    pass
+
+
+# returns max number of won (won factor 1) tests in a row
+def _succeeded_row_max(test_results:List[Tuple[float,float]]) -> int:
+    row_max = row = 0
+    for won, _ in test_results:
+        row = row + 1 if won == 1 else 0
+        row_max = max(row_max, row)
+    return row_max
+
 
 def run_actor_training(
-        envy_type: type(RLEnvy),
-        envy_point: POINT,
-        actor_type: type(TrainableActor),
+        envy_type: Optional[Union[str,type]],   # type or registered name, may be None when training with dataset (taken from dataset)
+        envy_point: Optional[POINT],
+        actor_type: Union[str,type],            # type or registered name
         actor_point: POINT,
         num_TS_ep=          100,
         seed=               121,
@@ -269,6 +290,26 @@ def run_actor_training(
         save_topdir=        '_models',
         hpmser_mode=        False,
         picture: bool=      False,
+        profile: bool=      False,  # times training phases (envy, observation_vector, memory, update, test ..)
+        profile_batches: Optional[Tuple[int,int]]=  None,   # (first, last) batch profiled with cProfile (with profile)
+        async_eval: bool=   False,  # runs test episodes in background processes (AsyncEvaluator), training tests get results later: (0.0, nan) until the first one is ready
+        async_eval_workers: int=    2,
+        async_eval_max_lag: Optional[int]=  1,  # max number of not finished background tests, training waits above it
+        n_collectors: int=  0,      # processes collecting experience to shared replay memory (sample_memory actors)
+        rollout_workers: int=       0,      # processes playing trajectory batches for decoupled learner (on-policy actors)
+        off_policy_correction: bool=    False,  # corrects batches of lagged rollout workers policy (ActorLearner)
+        record: bool=       False,  # records training experience to {save_topdir}/{name}/rollouts (RolloutRecorder)
+        record_test: bool=  False,  # records also experience of test episodes
+        record_chunk_size: int=     10000,
+        dataset: Optional[str]=     None,   # folder of recorded rollouts, actor is trained offline with it (envy is only tested)
+        reuse_envy: bool=   False,  # takes envy from (and gives back to) this process EnvyPool
+        batched_test: bool= False,  # plays test episodes at once in lockstep with batched policy calls
+        checkpoint_freq: Optional[int]=     None,   # saves training checkpoint every N training tests to {save_topdir}/{name}/checkpoints
+        resume: Union[bool,str]=    False,  # continues from checkpoint: True - the newest of actor & envy types, str - checkpoint file or run folder (break_ntests counts tests from resume)
+        async_logging: bool=        False,  # logger & TensorBoard are written by background thread (AsyncSink)
+        sink_max_queue: int=        10000,
+        sink_policy: str=           'aggregate',    # scalars over full sink queue are: 'aggregate' - averaged, 'drop' - dropped
+        test_callback: Optional[Callable[[int,float,float],None]]=  None,   # called with (test ix, won, reward) after every training test, may raise TrainingBreak
         **train_point,
 ) -> Dict:
 
@@ -278,18 +319,49 @@ def run_actor_training(
         loglevel = 50
         picture = False
 
+    if profile_batches and not profile:
+        raise ValueError('profile_batches are profiled with profile=True only')
+
+    reader = None
+    if dataset:
+        from rollouts import RolloutReader
+        reader = RolloutReader(dataset)
+        if envy_type is None:
+            envy_type = reader.meta['envy_type']
+        if envy_point is None:
+            envy_point = reader.meta.get('envy_point', {})
+    envy_type = get_envy_type(envy_type)
+    actor_type = get_actor_type(actor_type)
+
     name = f'{actor_type.__name__}_{envy_type.__name__}_{stamp()}'
 
+    ckpt_state = None
+    if resume:
+        from checkpoint import checkpoints, find_checkpoint, load_checkpoint
+        if resume is True:
+            ckpt_path = find_checkpoint(save_topdir, prefix=f'{actor_type.__name__}_{envy_type.__name__}_')
+        elif os.path.isdir(resume):
+            ckpt_path = (checkpoints(f'{resume}/checkpoints') or [None])[-1]
+        else:
+            ckpt_path = resume
+        # training starts from scratch when there is no checkpoint yet
+        if ckpt_path:
+            ckpt_state = load_checkpoint(ckpt_path)
+            name = ckpt_state['name']
+
     logger = get_pylogger(
         name=       name,
         add_stamp=  False,
         folder=     f'{save_topdir}/{name}' if not hpmser_mode else None,
         level=      loglevel)
 
-    envy = envy_type(
-        seed=       seed,
-        logger=     logger,
-        **envy_point)
+    if reuse_envy:
+        envy = get_envy_pool().acquire(envy_type, seed=seed, logger=logger, **envy_point)
+    else:
+        envy = envy_type(
+            seed=       seed,
+            logger=     logger,
+            **envy_point)
     logger.debug(envy)
 
     actor = actor_type(
@@ -302,29 +374,388 @@ def run_actor_training(
         **actor_point)
     logger.debug(actor)
 
-    tr_res = actor.run_train(**train_point, picture=picture)
+    # checked before any worker process is started
+    if n_collectors:
+        if not getattr(actor, '_sample_memory', False):
+            raise ValueError('n_collectors are for sample_memory actors, on-policy actors may use rollout_workers')
+        if rollout_workers:
+            raise ValueError('n_collectors and rollout_workers can not be used together')
+    if rollout_workers and not reader and getattr(actor, '_sample_memory', False):
+        raise ValueError('rollout_workers are for on-policy actors, sample_memory actors may use n_collectors')
+
+    if batched_test:
+        from batched_eval import attach_batched_test
+        attach_batched_test(actor)
+
+    evaluator = None
+    if async_eval:
+        from async_eval import AsyncEvaluator
+        evaluator = AsyncEvaluator(
+            envy=           envy,
+            actor_type=     actor_type,
+            actor_point=    actor_point,
+            name=           name,
+            n_workers=      async_eval_workers,
+            max_lag=        async_eval_max_lag,
+            seed=           seed)
+        evaluator.attach(actor)
+
+    collectors = None
+    if n_collectors:
+        from shared_replay import ExperienceCollectors
+        collectors = ExperienceCollectors(
+            envy=           envy,
+            actor_type=     actor_type,
+            actor_point=    actor_point,
+            max_size=       actor_point.get('mem_batches', 10) * actor.batch_size,
+            name=           name,
+            n_collectors=   n_collectors,
+            chunk_size=     actor.batch_size,
+            seed=           seed)
+        collectors.attach(actor)
+
+    # restored before rollout workers get the first policy snapshot
+    n_batches_resumed = 0
+    if ckpt_state:
+        from checkpoint import prepare_resume, restore_training_state
+        # run_offline_train() does not reset envy & memory, run_train() does
+        if reader:
+            restore_training_state(actor, ckpt_state)
+        else:
+            prepare_resume(actor, ckpt_state)
+        n_batches_resumed = ckpt_state['n_batches']
+        train_point['num_batches'] = max(0, train_point['num_batches'] - n_batches_resumed)
+        logger.info(f'resumed from {ckpt_path} after {n_batches_resumed} batches')
+
+    learner = None
+    if rollout_workers and not reader:
+        from actor_learner import ActorLearner
+        learner = ActorLearner(
+            envy=                   envy,
+            actor_type=             actor_type,
+            actor_point=            actor_point,
+            name=                   name,
+            n_workers=              rollout_workers,
+            steps=                  actor.batch_size,
+            off_policy_correction=  off_policy_correction,
+            seed=                   seed)
+        learner.attach(actor)
+
+    recorder = None
+    if (record or record_test) and not hpmser_mode:
+        from rollouts import RolloutRecorder
+        action_width = getattr(envy, 'action_width', None)
+        recorder = RolloutRecorder(
+            folder=             f'{save_topdir}/{name}/rollouts',
+            observation_width=  envy.observation_vector(envy.observation).shape[-1],
+            action_shape=       (action_width,) if action_width else (),
+            action_dtype=       np.float32 if action_width else np.int64,
+            chunk_size=         record_chunk_size,
+            meta=               {'envy_type': envy.__class__.__name__, 'envy_point': envy_point})
+        recorder.attach(actor, training=record, test=record_test)
+
+    checkpointer = None
+    if checkpoint_freq and not hpmser_mode:
+        from checkpoint import CheckpointWriter, training_state
+        checkpointer = CheckpointWriter(folder=f'{save_topdir}/{name}/checkpoints', logger=logger)
+
+    timer, profiler, tbwr = None, None, None
+    if profile:
+        # phases are published with TBwr of actor (to its log folder)
+        if not hpmser_mode:
+            tbwr = getattr(actor, '_tbwr', None)
+        timer, profiler = instrument_training(
+            envy=               envy,
+            actor=              actor,
+            tbwr=               tbwr,
+            publish_freq=       train_point.get('test_freq') or 50,
+            profile_batches=    profile_batches,
+            profile_file=       f'{save_topdir}/{name}/{name}.prof' if not hpmser_mode else None)
+
+    sink = None
+    if async_logging:
+        from log_sink import AsyncSink
+        sink = AsyncSink(max_queue=sink_max_queue, policy=sink_policy)
+        sink.attach_logger(logger)
+        # TBwr instance is shared by actor components (critic, zeroes processors ..)
+        for tb in (getattr(actor, '_tbwr', None), getattr(getattr(actor, 'critic', None), '_tbwr', None), tbwr):
+            if tb is not None:
+                sink.attach_tbwr(tb)
+
+    # records results of test episodes played while training, tests are also checkpoints
+    test_results = list(ckpt_state['test_results']) if ckpt_state else []
+    n_tests_resumed = len(test_results)
+    n_tests = [n_tests_resumed] # tests played (with resumed ones), results of async evaluator may come later
+    test_on_episodes = actor.test_on_episodes
+    def _recorded_test_on_episodes(**kwargs):
+        ts_res = test_on_episodes(**kwargs)
+        n_tests[0] += 1
+        checkpoint_now = checkpointer and n_tests[0] % checkpoint_freq == 0
+        # async evaluator returns a placeholder or result of an earlier test, only ready results are recorded
+        if evaluator:
+            new_results = evaluator.ready_results(start=len(test_results)-n_tests_resumed, block=checkpoint_now)
+        else:
+            new_results = [ts_res]
+        for res in new_results:
+            test_results.append(res)
+            if test_callback:
+                test_callback(len(test_results), *res)
+        if checkpoint_now:
+            checkpointer.save(training_state(
+                actor=          actor,
+                name=           name,
+                n_batches=      n_tests[0] * train_point['test_freq'],
+                test_results=   list(test_results)))
+        return ts_res
+    actor.test_on_episodes = _recorded_test_on_episodes
+
+    try:
+        try:
+            if reader:
+                from offline import run_offline_train
+                tr_res = run_offline_train(actor=actor, reader=reader, seed=seed, logger=logger, **train_point)
+            else:
+                tr_res = actor.run_train(**train_point, picture=picture)
+        except TrainingBreak as e:
+            # update step of actor (restored when resumed) counts all updates done
+            n_updates_done = actor._upd_step
+            logger.info(f'training broken after {n_updates_done} batches: {e}')
+            tr_res = {
+                'n_action':             n_updates_done * actor.batch_size,
+                'n_terminal':           None,
+                'n_won':                None,
+                'succeeded_row_max':    None,
+                'n_updates_done':       n_updates_done,
+                'broken':               str(e)}
+        else:
+            tr_res['n_updates_done'] += n_batches_resumed
+            tr_res['n_action'] += n_batches_resumed * actor.batch_size
+
+        actor.test_on_episodes = test_on_episodes
+        if evaluator:
+            test_results = (list(ckpt_state['test_results']) if ckpt_state else []) + evaluator.periodic_results()
+        # (n_action, won factor, avg reward) of every test, tests are played every test_freq batches
+        tr_res['test_results'] = [
+            ((ix+1) * train_point['test_freq'] * actor.batch_size, *ts_res)
+            for ix, ts_res in enumerate(test_results)]
+        # run_train() counts succeeded tests in a row since resume only
+        if ckpt_state and tr_res['succeeded_row_max'] is not None:
+            tr_res['succeeded_row_max'] = max(tr_res['succeeded_row_max'], _succeeded_row_max(test_results))
+
+        if not hpmser_mode:
+            actor.save()
+
+        if not hpmser_mode:
+            tr_nfo =   'Training report:\n'
+            tr_nfo += f'> number of actions performed:            {tr_res["n_action"]}\n'
+            tr_nfo += f'> number of terminal states reached (TR): {tr_res["n_terminal"]}\n'
+            tr_nfo += f'> number of wins (n_won):                 {tr_res["n_won"]}\n'
+            tr_nfo += f'> max number of succeeded tests in a row: {tr_res["succeeded_row_max"]}'
+            logger.info(tr_nfo)
+
+        if timer:
+            tr_res['phases_time'] = dict(timer.time)
+            logger.info(timer.report())
+            if profiler:
+                profiler.disable()
+                logger.info(f'cProfile of batches {profile_batches}:\n{profiler_report(profiler)}')
+
+        if num_TS_ep:
+            test_max_steps = train_point.get('test_max_steps', None)
+            if evaluator:
+                ts_res = evaluator.test_on_episodes(actor=actor, n_episodes=num_TS_ep, max_steps=test_max_steps)
+            else:
+                ts_res = actor.test_on_episodes(n_episodes=num_TS_ep, max_steps=test_max_steps)
+            logger.info(f'Test report: won factor: {int(ts_res[0]*100)}%, avg reward: {ts_res[1]:.1f}')
+
+    finally:
+        # workers and writers are closed also when training fails
+        if evaluator:
+            evaluator.close()
+        if collectors:
+            collectors.close()
+        if learner:
+            logger.info(f'actor-learner: {len(learner.lags)} batches of {rollout_workers} rollout workers, avg policy lag: {np.mean(learner.lags) if learner.lags else 0:.2f} updates')
+            learner.close()
+        if recorder:
+            recorder.close()
+            logger.info(f'recorded {sum(recorder.chunks)} steps to {recorder.folder}')
+        if checkpointer:
+            checkpointer.close()
+        if reuse_envy:
+            get_envy_pool().release(envy)
+        if sink:
+            if sink.n_aggregated or sink.n_dropped or sink.n_errors:
+                logger.info(f'async logging: {sink.n_aggregated} scalars aggregated, {sink.n_dropped} dropped, {sink.n_errors} write errors')
+            sink.close()
 
-    if not hpmser_mode:
-        actor.save()
-
-    if not hpmser_mode:
-        tr_nfo =   'Training report:\n'
-        tr_nfo += f'> number of actions performed:            {tr_res["n_action"]}\n'
-        tr_nfo += f'> number of terminal states reached (TR): {tr_res["n_terminal"]}\n'
-        tr_nfo += f'> number of wins (n_won):                 {tr_res["n_won"]}\n'
-        tr_nfo += f'> max number of succeeded tests in a row: {tr_res["succeeded_row_max"]}'
-        logger.info(tr_nfo)
+    return tr_res
 
-    if num_TS_ep:
-        ts_res = actor.test_on_episodes(n_episodes=num_TS_ep, max_steps=train_point.get('test_max_steps', None))
-        logger.info(f'Test report: won factor: {int(ts_res[0]*100)}%, avg reward: {ts_res[1]:.1f}')
 
-    return tr_res
+# sets CPU affinity and torch threads of a pool worker
+def _pin_worker(
+        worker_counter,
+        cpus_per_worker: Optional[int],
+        torch_threads: int,
+):
+    with worker_counter.get_lock():
+        worker_ix = worker_counter.value
+        worker_counter.value += 1
+
+    if cpus_per_worker and hasattr(os, 'sched_setaffinity'):
+        cpus = sorted(os.sched_getaffinity(0))
+        first = (worker_ix * cpus_per_worker) % len(cpus)
+        os.sched_setaffinity(0, cpus[first:first+cpus_per_worker] or cpus[:cpus_per_worker])
+
+    import torch
+    torch.set_num_threads(torch_threads)
+
+
+# runs single RUN_CONFIGS entry with given seed, executed by pool worker
+def _run_config(run_config_name:str, seed:int, kwargs:Dict) -> Dict:
+    stime = time.time()
+    # kwargs override keys of the config
+    tr_res = run_actor_training(**{**RUN_CONFIGS[run_config_name], **kwargs, 'seed':seed})
+    return {
+        'run_config_name':  run_config_name,
+        'seed':             seed,
+        'time':             time.time() - stime,
+        'tr_res':           tr_res}
+
+
+def run_parallel_trainings(
+        run_config_names: Sequence[str],
+        seeds: Sequence[int]=           (121,),
+        n_workers: Optional[int]=       None,   # None uses all available CPUs
+        cpus_per_worker: Optional[int]= 1,      # pins every worker to its own CPUs, None disables pinning
+        torch_threads: int=             1,      # torch threads of every worker
+        **kwargs,                               # run_actor_training() params (e.g. num_TS_ep, loglevel)
+) -> List[Dict]:
+    """ runs run_actor_training() for every (config, seed) in a pool of worker processes,
+    returns list of results (sorted by config and seed), logs summary table """
+
+    jobs = [(rcn, seed) for rcn in run_config_names for seed in seeds]
+    if n_workers is None:
+        n_workers = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count()
+    n_workers = min(n_workers, len(jobs))
+
+    # spawn since torch does not support fork after its threads are started
+    mp_context = multiprocessing.get_context('spawn')
+    worker_counter = mp_context.Value('i', 0)
+
+    logger = get_pylogger(name='run_parallel_trainings', level=kwargs.get('loglevel', 20))
+
+    results = []
+    with ProcessPoolExecutor(
+            max_workers=    n_workers,
+            mp_context=     mp_context,
+            initializer=    _pin_worker,
+            initargs=       (worker_counter, cpus_per_worker, torch_threads),
+    ) as executor:
+        futures = {executor.submit(_run_config, rcn, seed, kwargs): (rcn, seed) for rcn, seed in jobs}
+        for future in as_completed(futures):
+            rcn, seed = futures[future]
+            try:
+                results.append(future.result())
+            except Exception as e:
+                logger.error(f'training of {rcn} with seed {seed} failed', exc_info=e)
+                results.append({'run_config_name':rcn, 'seed':seed, 'time':None, 'tr_res':None, 'error':repr(e)})
+
+    results.sort(key=lambda r: (run_config_names.index(r['run_config_name']), r['seed']))
+
+    logger.info(f'Parallel trainings summary ({len(jobs)} runs, {n_workers} workers):\n{trainings_summary(results)}')
+
+    return results
+
+
+TR_RES_KEYS = ('n_action', 'n_terminal', 'n_won', 'succeeded_row_max', 'n_updates_done')
+
+# prepares summary table of run_parallel_trainings() results
+def trainings_summary(results:List[Dict]) -> str:
+    header = ['config', 'seed', *TR_RES_KEYS, 'time(s)']
+    rows = []
+    for r in results:
+        if r['tr_res'] is None:
+            rows.append([r['run_config_name'], str(r['seed']), f'ERROR: {r.get("error")}'])
+        else:
+            rows.append([
+                r['run_config_name'],
+                str(r['seed']),
+                *[str(r['tr_res'].get(k)) for k in TR_RES_KEYS],
+                f'{r["time"]:.1f}'])
+    widths = [max([len(h)] + [len(row[ix]) for row in rows if len(row) == len(header)]) for ix, h in enumerate(header)]
+    lines = [header] + rows
+    return '\n'.join('  '.join(v.ljust(w) for v, w in zip(line, widths)).rstrip() for line in lines)
+
+
+# aggregates run_parallel_trainings() results (of one config) into mean / std / CI and sample-efficiency curves
+def seed_sweep_stats(results:List[Dict], ci_z:float=1.96) -> Dict[str,np.ndarray]:
+
+    sweep = {'seeds': np.asarray([r['seed'] for r in results])}
+    for k in TR_RES_KEYS:
+        values = np.asarray([r['tr_res'][k] for r in results], dtype=float)
+        sweep[k] = values
+        sweep[f'{k}_mean'] = values.mean()
+        sweep[f'{k}_std'] = values.std(ddof=1) if len(values) > 1 else 0.0
+        sweep[f'{k}_ci'] = ci_z * sweep[f'{k}_std'] / np.sqrt(len(values))
+
+    # curves of runs broken earlier (break_ntests) are padded with NaN
+    test_results = [r['tr_res']['test_results'] for r in results]
+    n_tests = max(len(tsr) for tsr in test_results)
+    curves = np.full((len(results), n_tests, 3), np.nan)
+    for ix, tsr in enumerate(test_results):
+        if tsr:
+            curves[ix,:len(tsr)] = tsr
+    sweep['curve_n_action'] = np.nanmax(curves[:,:,0], axis=0) if n_tests else np.zeros(0)
+    for cix, cname in [(1,'won'), (2,'reward')]:
+        sweep[f'curve_{cname}'] = curves[:,:,cix]
+        sweep[f'curve_{cname}_mean'] = np.nanmean(curves[:,:,cix], axis=0) if n_tests else np.zeros(0)
+        sweep[f'curve_{cname}_std'] = np.nanstd(curves[:,:,cix], axis=0) if n_tests else np.zeros(0)
+
+    return sweep
+
+
+def run_seed_sweep(
+        run_config_name: str,
+        n_seeds: int=           10,
+        first_seed: int=        121,
+        save_topdir: str=       '_models',
+        ci_z: float=            1.96,   # z-score of confidence interval (normal approximation)
+        **kwargs,                       # run_parallel_trainings() / run_actor_training() params
+) -> Dict[str,np.ndarray]:
+    """ runs RUN_CONFIGS entry with n_seeds seeds in parallel (quietly, without logger folders),
+    aggregates training stats into mean / std / CI and sample-efficiency curves
+    (won factor & avg reward of training tests vs number of actions),
+    saves everything to one .npz file, returns saved arrays """
+
+    seeds = list(range(first_seed, first_seed + n_seeds))
+    kwargs.setdefault('hpmser_mode', True)
+    results = run_parallel_trainings(
+        run_config_names=   [run_config_name],
+        seeds=              seeds,
+        **kwargs)
+    results = [r for r in results if r['tr_res'] is not None]
+    if not results:
+        raise Exception(f'all seed sweep runs of {run_config_name} failed')
+
+    sweep = seed_sweep_stats(results=results, ci_z=ci_z)
+
+    os.makedirs(save_topdir, exist_ok=True)
+    file_path = f'{save_topdir}/seed_sweep_{run_config_name}_{stamp()}.npz'
+    np.savez_compressed(file_path, **sweep)
+
+    nfo = f'Seed sweep report of {run_config_name} ({len(results)} seeds) saved to {file_path}:\n'
+    nfo += '\n'.join(
+        f'> {k:20} {sweep[f"{k}_mean"]:10.1f} +- {sweep[f"{k}_ci"]:.1f} (std {sweep[f"{k}_std"]:.1f})'
+        for k in TR_RES_KEYS)
+    get_pylogger(name='run_seed_sweep').info(nfo)
+
+    return sweep
 
 
 if __name__ == "__main__":
 
-    for run_config_name in [
+    run_config_names = [
         #'QTable_SBG',
         #'DQN_SBG',
         #'DQN_CP',
@@ -334,9 +765,24 @@ if __name__ == "__main__":
         #'PPO_CP',
         #'AC_ACR',
         'PPOC_LL',
-    ]:
-        run_actor_training(
-            num_TS_ep=  10,
-            #loglevel=   10,
-            #picture=    True,
-            **RUN_CONFIGS[run_config_name])
\ No newline at end of file
+    ]
+
+    parallel = False
+
+    if parallel:
+        run_parallel_trainings(
+            run_config_names=   run_config_names,
+            seeds=              (121,122,123),
+            num_TS_ep=          10)
+
+    else:
+        for run_config_name in run_config_names:
+            run_actor_training(
+                num_TS_ep=  10,
+                #loglevel=   10,
+                #picture=    True,
+                #record=     True,
+                #dataset=    '_models/<name>/rollouts',  # offline training with rollouts recorded earlier
+                #checkpoint_freq=    5,
+                #resume=     True,   # continues the newest checkpointed run of the config
+                **RUN_CONFIGS[run_config_name])
\ No newline at end of file
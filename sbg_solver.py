@@ -0,0 +1,85 @@
+import numpy as np
+from typing import Callable, Iterator, List, Optional, Sequence, Tuple
+
+
+class SimpleBoardGameSolver:
+    """ exact solver of SimpleBoardGame,
+    enumerates all reachable board states and computes Q* / V* with (vectorized) value iteration,
+    reachable boards have fields 0 or 1 only, so values are stored in compact arrays of 2**board_size rows
+    indexed with binary packed board (rows(), not base-3 SimpleBoardGame.state_key that also covers lost boards),
+    boards with a field visited twice are terminal (lost), Q* and V* of terminal states are 0 """
+
+    def __init__(
+            self,
+            board_size: int=    4,
+            discount: float=    0.9,
+            max_iters: int=     1000,
+    ):
+        if max_iters < 1:
+            raise ValueError('max_iters must be >= 1')
+        self.board_size = board_size
+        self.discount = discount
+        self.powers = 2 ** np.arange(self.board_size)
+
+        # non-terminal reachable states: every field visited at most once, not all visited
+        n_binary = 2 ** self.board_size
+        full = n_binary - 1
+        bits = (np.arange(n_binary)[:,None] >> np.arange(self.board_size)) & 1
+        next_binary = np.arange(n_binary)[:,None] | (1 << np.arange(self.board_size))
+        rewards = np.where(bits == 1, -1.0, 1.0)
+        non_terminal_next = (bits == 0) & (next_binary != full)
+
+        v = np.zeros(n_binary)
+        for _ in range(max_iters):
+            q = rewards + self.discount * v[next_binary] * non_terminal_next
+            v_new = q.max(axis=1)
+            v_new[full] = 0
+            if np.allclose(v_new, v):
+                break
+            v = v_new
+
+        q[full] = 0
+        self.q = q.astype(np.float32)
+        self.v = v.astype(np.float32)
+
+    def rows(self, observations:np.ndarray) -> np.ndarray:
+        """ returns rows of (n,board_size) observations in Q* / V* arrays, -1 for lost (terminal) boards """
+        observations = np.asarray(observations)
+        return np.where((observations > 1).any(axis=-1), -1, (observations == 1) @ self.powers)
+
+    def encode(self, state:Sequence[int]) -> Optional[int]:
+        """ returns row of state in Q* / V* arrays, None for lost (terminal) boards """
+        row = int(self.rows(state))
+        return row if row >= 0 else None
+
+    def q_values(self, state:Sequence[int]) -> np.ndarray:
+        row = self.encode(state)
+        return self.q[row] if row is not None else np.zeros(self.board_size, dtype=np.float32)
+
+    def q_values_batch(self, observations:np.ndarray) -> np.ndarray:
+        """ returns Q* of (n,board_size) observations """
+        rows = self.rows(observations)
+        q = self.q[rows]
+        q[rows < 0] = 0
+        return q
+
+    def value(self, state:Sequence[int]) -> float:
+        row = self.encode(state)
+        return float(self.v[row]) if row is not None else 0.0
+
+    def optimal_actions(self, state:Sequence[int]) -> List[int]:
+        q = self.q_values(state)
+        return np.flatnonzero(np.isclose(q, q.max())).tolist()
+
+    def is_optimal_action(self, state:Sequence[int], action:int) -> bool:
+        q = self.q_values(state)
+        return bool(np.isclose(q[action], q.max()))
+
+    def states(self) -> Iterator[Tuple[List[int], np.ndarray]]:
+        """ iterates over (observation, Q* values) of all non-terminal states, e.g. to warm-start QTableActor """
+        for row in range(2 ** self.board_size - 1):
+            yield [(row >> i) & 1 for i in range(self.board_size)], self.q[row]
+
+    def is_optimal_policy(self, get_action:Callable[[List[int]],int]) -> bool:
+        """ checks if given policy (observation -> action) takes optimal action in every non-terminal state """
+        return all(self.is_optimal_action(state, get_action(state)) for state, _ in self.states())
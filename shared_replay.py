@@ -0,0 +1,247 @@
+import multiprocessing
+from multiprocessing import shared_memory
+import numpy as np
+import queue
+from pypaq.lipytools.pylogger import get_pylogger
+from typing import Dict, List, Optional, Tuple
+
+from r4c.envy import RLEnvy
+from r4c.actor import TrainableActor
+
+from async_eval import policy_snapshot, load_policy_snapshot, envy_kwargs
+
+
+class SharedReplayMemory:
+    """ replay memory (ring buffer) in multiprocessing.shared_memory with fixed dtype columns,
+    implements ExperienceMemory interface (add, get_sample, get_all, clear, len), so it may replace actor.memory,
+    many processes may add experience (slots are reserved under lock) while the learner samples from the same memory,
+    rows of a slot reserved but not written yet may be sampled (as it is in most async RL replay memories) """
+
+    def __init__(
+            self,
+            max_size: int,
+            observation_width: int,
+            action_shape: Tuple[int,...]=   (),
+            action_dtype=                   np.int64,
+            seed: int=                      123,
+            _name: Optional[str]=           None,   # attaches to existing memory
+            _lock=                          None,
+    ):
+        self.max_size = max_size
+        self.observation_width = observation_width
+        self.action_shape = tuple(action_shape)
+        self.action_dtype = np.dtype(action_dtype)
+        self.seed = seed
+
+        self._columns_spec = {
+            'observations':         ((self.observation_width,), np.float32),
+            'actions':              (self.action_shape,         self.action_dtype),
+            'rewards':              ((),                        np.float32),
+            'next_observations':    ((self.observation_width,), np.float32),
+            'terminals':            ((),                        np.bool_),
+            'wons':                 ((),                        np.bool_)}
+
+        # header: [number of rows ever added, number of rows at last clear()]
+        sizes = [2 * 8] + [self.max_size * int(np.prod(shape, dtype=int)) * np.dtype(dtype).itemsize for shape, dtype in self._columns_spec.values()]
+        self._owner = _name is None
+        if self._owner:
+            self._shm = shared_memory.SharedMemory(create=True, size=sum(sizes))
+        else:
+            self._shm = shared_memory.SharedMemory(name=_name)
+        self._lock = _lock or multiprocessing.get_context('spawn').Lock()
+
+        self._header = np.ndarray((2,), dtype=np.int64, buffer=self._shm.buf)
+        if self._owner:
+            self._header[:] = 0
+        self.columns: Dict[str,np.ndarray] = {}
+        offset = sizes[0]
+        for (k, (shape, dtype)), size in zip(self._columns_spec.items(), sizes[1:]):
+            self.columns[k] = np.ndarray((self.max_size,) + shape, dtype=dtype, buffer=self._shm.buf, offset=offset)
+            offset += size
+
+        self._rng = np.random.default_rng(self.seed)
+
+    def __reduce__(self):
+        """ pickled memory (e.g. passed to a process) attaches to the same shared memory """
+        return _attach_memory, ({
+            'max_size':             self.max_size,
+            'observation_width':    self.observation_width,
+            'action_shape':         self.action_shape,
+            'action_dtype':         self.action_dtype.str,
+            'seed':                 self.seed,
+            '_name':                self._shm.name,
+            '_lock':                self._lock},)
+
+    def add(self, experience:Dict[str,List]):
+        n = len(experience['observations'])
+        if not n:
+            return
+        with self._lock:
+            start = int(self._header[0])
+            self._header[0] += n
+        ixs = np.arange(start, start + n) % self.max_size
+        for k, column in self.columns.items():
+            column[ixs] = experience[k]
+
+    def __len__(self) -> int:
+        return int(min(self._header[0] - self._header[1], self.max_size))
+
+    def _ixs(self) -> np.ndarray:
+        """ ring indexes of stored rows (oldest first) """
+        n_added = int(self._header[0])
+        return np.arange(n_added - len(self), n_added) % self.max_size
+
+    def get_sample(self, n:int) -> Dict[str,np.ndarray]:
+        stored = len(self)
+        ixs = self._ixs()[self._rng.choice(stored, size=min(n, stored), replace=False)]
+        return {k: column[ixs] for k, column in self.columns.items()}
+
+    def get_all(self, reset:bool=True) -> Dict[str,np.ndarray]:
+        ixs = self._ixs()
+        data = {k: column[ixs] for k, column in self.columns.items()}
+        if reset:
+            self.clear()
+        return data
+
+    def clear(self):
+        with self._lock:
+            self._header[1] = self._header[0]
+
+    def close(self):
+        self.columns = {}
+        self._header = None
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+
+
+def _attach_memory(kwargs:Dict) -> SharedReplayMemory:
+    return SharedReplayMemory(**kwargs)
+
+
+# experience collector loop, plays with lagged actor policy copy and adds experience to shared memory
+def _collector(
+        envy_type: type,
+        envy_point: Dict,
+        actor_type: type,
+        actor_point: Dict,
+        name: str,
+        seed: int,
+        memory: SharedReplayMemory,
+        snapshots: multiprocessing.Queue,
+        stop,
+        chunk_size: int,
+):
+    logger = get_pylogger(name=name, add_stamp=False, level=50)
+    envy = envy_type(seed=seed, logger=logger, **envy_point)
+    actor = actor_type(
+        name=           name,
+        add_stamp=      False,
+        envy=           envy,
+        seed=           seed,
+        logger=         logger,
+        hpmser_mode=    True,
+        **actor_point)
+    envy.reset()
+    while not stop.is_set():
+
+        # loads the newest policy snapshot
+        snapshot = None
+        while True:
+            try:
+                snapshot = snapshots.get_nowait()
+            except queue.Empty:
+                break
+        if snapshot is not None:
+            load_policy_snapshot(actor, snapshot)
+
+        observations, actions, rewards, next_observations, terminals, wons = actor.run_play(
+            steps=          chunk_size,
+            training=       True,
+            reset=          False,
+            break_terminal= False)
+        memory.add(experience={
+            'observations':         observations,
+            'actions':              actions,
+            'rewards':              rewards,
+            'next_observations':    next_observations,
+            'terminals':            terminals,
+            'wons':                 wons})
+    memory.close()
+
+
+class ExperienceCollectors:
+    """ ExperienceCollectors runs n_collectors processes,
+    every one steps its own envy (built from envy.kwargs) with lagged copy of actor policy
+    and adds experience to SharedReplayMemory,
+    attach() replaces actor.memory with the shared one and sends policy snapshots every snapshot_freq updates """
+
+    def __init__(
+            self,
+            envy: RLEnvy,
+            actor_type: type(TrainableActor),
+            actor_point: Dict,
+            max_size: int,
+            name: str=              'ExperienceCollectors',
+            n_collectors: int=      2,
+            chunk_size: int=        32,     # number of steps added to memory at once by collector
+            snapshot_freq: int=     10,
+            seed: int=              123,
+    ):
+        observation_width = envy.observation_vector(envy.observation).shape[-1]
+        action_width = getattr(envy, 'action_width', None)
+        self.memory = SharedReplayMemory(
+            max_size=           max_size,
+            observation_width=  observation_width,
+            action_shape=       (action_width,) if action_width else (),
+            action_dtype=       np.float32 if action_width else np.int64,
+            seed=               seed)
+        self.snapshot_freq = snapshot_freq
+
+        mp_context = multiprocessing.get_context('spawn')
+        self._stop = mp_context.Event()
+        self._snapshots = [mp_context.Queue() for _ in range(n_collectors)]
+        self._collectors = [
+            mp_context.Process(
+                target= _collector,
+                kwargs= {
+                    'envy_type':    type(envy),
+                    'envy_point':   envy_kwargs(envy),
+                    'actor_type':   actor_type,
+                    'actor_point':  actor_point,
+                    'name':         f'{name}_col{cix}',
+                    'seed':         seed + 1000 * (cix+1),
+                    'memory':       self.memory,
+                    'snapshots':    self._snapshots[cix],
+                    'stop':         self._stop,
+                    'chunk_size':   chunk_size},
+                daemon= True)
+            for cix in range(n_collectors)]
+        for c in self._collectors:
+            c.start()
+
+    def publish(self, actor:TrainableActor):
+        snapshot = policy_snapshot(actor)
+        for snapshots in self._snapshots:
+            snapshots.put(snapshot)
+
+    def attach(self, actor:TrainableActor):
+        """ replaces actor.memory with shared one, publishes actor policy every snapshot_freq updates """
+        actor.memory = self.memory
+        self.publish(actor)
+
+        update = actor._update
+        n_updates = [0]
+        def _update(*args, **kwargs):
+            metrics = update(*args, **kwargs)
+            n_updates[0] += 1
+            if n_updates[0] % self.snapshot_freq == 0:
+                self.publish(actor)
+            return metrics
+        actor._update = _update
+
+    def close(self):
+        self._stop.set()
+        for c in self._collectors:
+            c.join()
+        self.memory.close()
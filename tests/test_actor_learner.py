@@ -0,0 +1,152 @@
+import numpy as np
+import unittest
+
+from actor_learner import ActorLearner
+from envies import NativeCartPoleEnvy
+
+
+class UniformActor:
+    """ on-policy actor with uniform policy, counts local plays and updates """
+
+    def __init__(self, envy):
+        self.envy = envy
+        self.batch_size = 8
+        self.n_plays = 0
+        self.n_updates = 0
+
+    def _get_policy_probs(self, observations:np.ndarray) -> np.ndarray:
+        return np.full((len(observations), 2), 0.5)
+
+    def run_play(self, steps=None, training=False, reset=True, break_terminal=True, inspect=False):
+        self.n_plays += 1
+        return [np.zeros((steps, 4)), np.zeros(steps, dtype=int), np.zeros(steps), np.zeros((steps, 4)), np.zeros(steps, dtype=bool), np.zeros(steps, dtype=bool)]
+
+    def _build_training_data(self, batch):
+        return {'observations': batch['observations'], 'actions': batch['actions'], 'dreturns': np.arange(len(batch['actions']), dtype=float)}
+
+    def _update(self, training_data):
+        self.n_updates += 1
+        return {'loss': 0.0}
+
+
+class Policy:
+    """ probability of action 1, saved with state_dict (as torch modules) """
+
+    def __init__(self, p1:float=0.5):
+        self.p1 = p1
+
+    def state_dict(self) -> dict:
+        return {'p1': self.p1}
+
+    def load_state_dict(self, state:dict):
+        self.p1 = state['p1']
+
+
+class PolicyActor:
+    """ on-policy actor playing CartPole with Policy, built by rollout workers (in other processes) """
+
+    def __init__(self, envy, seed:int=123, batch_size:int=16, p1:float=0.5, **kwargs):
+        self.envy = envy
+        self.batch_size = batch_size
+        self.policy = Policy(p1)
+        self.rng = np.random.default_rng(seed)
+
+    def run_play(self, steps=None, training=False, reset=True, break_terminal=True, inspect=False):
+        if reset:
+            self.envy.reset()
+        experience = [[] for _ in range(6)]
+        for _ in range(steps):
+            observation = self.envy.observation_vector(self.envy.observation)
+            action = int(self.rng.random() < self.policy.p1)
+            reward = self.envy.run(action)
+            terminal = self.envy.is_terminal()
+            row = (observation, action, reward, self.envy.observation_vector(self.envy.observation), terminal, self.envy.has_won())
+            for e, v in zip(experience, row):
+                e.append(v)
+            if terminal:
+                if break_terminal:
+                    break
+                self.envy.reset()
+        return experience
+
+    def _update(self, training_data):
+        return {'loss': 0.0}
+
+
+def worker_batch(version:int, mu:np.ndarray) -> dict:
+    n = len(mu)
+    return {
+        'experience':   [np.ones((n, 4)), np.asarray([0,1]*(n//2)), np.ones(n), np.ones((n, 4)), np.zeros(n, dtype=bool), np.zeros(n, dtype=bool)],
+        'version':      version,
+        'mu':           mu}
+
+
+class TestActorLearner(unittest.TestCase):
+
+    def test_attach(self):
+        """ training plays come from workers queue, tests are played by the actor """
+        actor = UniformActor(NativeCartPoleEnvy())
+        learner = ActorLearner(envy=actor.envy, actor_type=UniformActor, actor_point={}, n_workers=0, queue_size=4)
+        learner.attach(actor)
+
+        learner._trajectories.put(worker_batch(version=0, mu=np.full(8, 0.5)))
+        experience = actor.run_play(steps=8, training=True, reset=False, break_terminal=False)
+        self.assertTrue(experience[0].tolist() == np.ones((8, 4)).tolist())
+        self.assertTrue(actor.n_plays == 0)
+        actor.run_play(steps=8, training=False, reset=True)
+        self.assertTrue(actor.n_plays == 1)
+
+        for _ in range(3):
+            actor._update(training_data={})
+        learner._trajectories.put(worker_batch(version=1, mu=np.full(8, 0.5)))
+        actor.run_play(8, True, False, False)
+        print(learner.lags, learner.version)
+        self.assertTrue(learner.lags == [0, 2] and learner.version == 3)
+        learner.close()
+
+    def test_correction(self):
+        actor = UniformActor(NativeCartPoleEnvy())
+        learner = ActorLearner(envy=actor.envy, actor_type=UniformActor, actor_point={}, n_workers=0, off_policy_correction=True)
+        learner.attach(actor)
+
+        # worker policy took action 1 with probability 0.9 and action 0 with 0.1 (pi = 0.5 for both)
+        n = 1000
+        learner._trajectories.put(worker_batch(version=0, mu=np.asarray([0.1,0.9]*(n//2))))
+        experience = actor.run_play(n, True, False, False)
+        batch = dict(zip(['observations','actions','rewards','next_observations','terminals','wons'], experience))
+        training_data = actor._build_training_data(batch=batch)
+        self.assertTrue(len(training_data['actions']) == n)
+        action_0 = (training_data['actions'] == 0).mean()
+        print(f'action 0 fraction after correction: {action_0:.3f}')
+        # rho: action 0 -> min(1, 5) = 1, action 1 -> 0.56, so action 0 is resampled ~64%
+        self.assertTrue(0.55 < action_0 < 0.73)
+        self.assertTrue(np.array_equal(training_data['dreturns'] % 2, training_data['actions']))
+
+        # batch without behaviour probs is not changed
+        training_data = actor._build_training_data(batch=batch)
+        self.assertTrue(np.array_equal(training_data['actions'], batch['actions']))
+        learner.close()
+
+    def test_workers(self):
+        """ workers play CartPole with snapshots of the learner policy, close() stops them """
+        actor = PolicyActor(NativeCartPoleEnvy(), p1=1.0)
+        learner = ActorLearner(envy=actor.envy, actor_type=PolicyActor, actor_point={}, n_workers=2, steps=16)
+        learner.attach(actor)
+
+        # workers wait for the first snapshot
+        for _ in range(4):
+            experience = actor.run_play(16, True, False, False)
+            self.assertTrue(len(experience[1]) == 16 and set(experience[1].tolist()) == {1})
+
+        actor.policy.p1 = 0.0
+        actor._update(training_data={})
+        for _ in range(100):
+            experience = actor.run_play(16, True, False, False)
+            if learner.lags[-1] == 0:
+                break
+        print(learner.lags)
+        self.assertTrue(learner.lags[-1] == 0 and set(experience[1].tolist()) == {0})
+        self.assertTrue(all(w.is_alive() for w in learner._workers))
+
+        learner.close()
+        self.assertTrue(not any(w.is_alive() for w in learner._workers))
@@ -0,0 +1,101 @@
+import math
+import time
+import unittest
+
+from envies import SimpleBoardGame
+from async_eval import AsyncEvaluator
+
+
+class StubPolicy:
+    """ policy with state_dict, snapshot of it is sent to evaluation workers """
+
+    def __init__(self):
+        self.params = {'reward':0.0, 'delay':0.0}
+
+    def state_dict(self):
+        return dict(self.params)
+
+    def load_state_dict(self, state_dict):
+        self.params = dict(state_dict)
+
+
+class StubActor:
+    """ test returns (n_episodes/10, reward+n_episodes) after delay """
+
+    def __init__(self, envy=None, **kwargs):
+        self.envy = envy
+        self.policy = StubPolicy()
+
+    def test_on_episodes(self, n_episodes:int=10, max_steps=None):
+        time.sleep(self.policy.params['delay'])
+        return n_episodes / 10, self.policy.params['reward'] + n_episodes
+
+
+class TestAsyncEvaluator(unittest.TestCase):
+
+    def test_base(self):
+
+        envy = SimpleBoardGame(seed=121, board_size=4)
+        actor = StubActor(envy=envy)
+        evaluator = AsyncEvaluator(
+            envy=           envy,
+            actor_type=     StubActor,
+            actor_point=    {},
+            n_workers=      2,
+            max_lag=        None)
+
+        # episodes split among workers [2,1] -> weighted average
+        actor.policy.params = {'reward':1.0, 'delay':0.5}
+        won, reward = evaluator.test_on_episodes(actor, n_episodes=3)
+        print(won, reward)
+        self.assertTrue(abs(won - 0.5/3) < 1e-9 and abs(reward - (1 + 5/3)) < 1e-9)
+
+        evaluator.attach(actor)
+
+        # first (slow) test is finished after the second one
+        actor.policy.params = {'reward':10.0, 'delay':3.0}
+        res = actor.test_on_episodes(n_episodes=1)
+        self.assertTrue(res[0] == 0.0 and math.isnan(res[1]))
+        actor.policy.params = {'reward':20.0, 'delay':0.0}
+        res = actor.test_on_episodes(n_episodes=1)
+        self.assertTrue(math.isnan(res[1]))
+
+        second = evaluator._periodic[1]
+        while second not in evaluator.results:
+            evaluator._collect(block=True)
+        self.assertTrue(evaluator._periodic[0] not in evaluator.results)
+        self.assertTrue(evaluator.ready_results() == []) # gap at the first test
+
+        # results are returned in order -> placeholder until the first one is ready
+        actor.policy.params = {'reward':30.0, 'delay':0.0}
+        res = actor.test_on_episodes(n_episodes=1)
+        self.assertTrue(math.isnan(res[1]))
+
+        periodic = evaluator.periodic_results()
+        print(periodic)
+        self.assertTrue([r for _, r in periodic] == [11.0, 21.0, 31.0])
+        self.assertTrue([r for _, r in evaluator.ready_results(start=1)] == [21.0, 31.0])
+
+        res = actor.test_on_episodes(n_episodes=1)
+        self.assertTrue(res == (0.1, 11.0))
+        res = actor.test_on_episodes(n_episodes=1)
+        self.assertTrue(res == (0.1, 21.0))
+
+        evaluator.close()
+
+    def test_close_timeout(self):
+        """ worker stuck in a test is terminated """
+        envy = SimpleBoardGame(seed=121, board_size=4)
+        actor = StubActor(envy=envy)
+        evaluator = AsyncEvaluator(
+            envy=           envy,
+            actor_type=     StubActor,
+            actor_point=    {},
+            n_workers=      1)
+        actor.policy.params = {'reward':0.0, 'delay':60.0}
+        evaluator.submit(actor, n_episodes=1)
+        s_time = time.time()
+        evaluator.close(timeout=2.0)
+        print(f'closed in {time.time()-s_time:.1f}s')
+        self.assertTrue(time.time() - s_time < 10)
+        self.assertTrue(not any(w.is_alive() for w in evaluator._workers))
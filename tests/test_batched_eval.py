@@ -0,0 +1,54 @@
+import numpy as np
+import unittest
+
+import batched_eval
+from envies import SimpleBoardGame
+from sbg_solver import SimpleBoardGameSolver
+
+
+class SolverActor:
+    """ plays SimpleBoardGame with Q* of solver, counts policy calls """
+
+    def __init__(self, envy:SimpleBoardGame):
+        self.envy = envy
+        self.solver = SimpleBoardGameSolver(board_size=envy.board_size)
+        self.n_calls = 0
+
+    def get_QVs_batch(self, observations:np.ndarray) -> np.ndarray:
+        self.n_calls += 1
+        return self.solver.q_values_batch(observations)
+
+
+class CountedSimpleBoardGame(SimpleBoardGame):
+    n_built = 0
+
+    def __init__(self, **kwargs):
+        CountedSimpleBoardGame.n_built += 1
+        super().__init__(**kwargs)
+
+
+class TestBatchedEval(unittest.TestCase):
+
+    def test_policy_actions(self):
+        actor = SolverActor(SimpleBoardGame(board_size=4))
+        actions = batched_eval.policy_actions(actor, np.asarray([[1,1,1,0],[0,1,1,1]]))
+        print(actions)
+        self.assertTrue(actions.tolist() == [3,0])
+
+    def test_batched(self):
+        actor = SolverActor(SimpleBoardGame(board_size=6))
+        won, reward = batched_eval.test_on_episodes_batched(actor, n_episodes=100)
+        print(won, reward, actor.n_calls)
+        self.assertTrue(won == 1.0 and reward == 6)
+        self.assertTrue(actor.n_calls == 6)
+
+    def test_attached(self):
+        """ attached test keeps copies of envy for next tests """
+        actor = SolverActor(CountedSimpleBoardGame(board_size=5))
+        batched_eval.attach_batched_test(actor)
+        n_built = CountedSimpleBoardGame.n_built
+        for n_episodes in (20, 20, 10, 20):
+            won, reward = actor.test_on_episodes(n_episodes=n_episodes)
+            self.assertTrue(won == 1.0 and reward == 5)
+        print(CountedSimpleBoardGame.n_built - n_built)
+        self.assertTrue(CountedSimpleBoardGame.n_built - n_built == 20)
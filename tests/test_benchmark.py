@@ -0,0 +1,49 @@
+import tempfile
+import unittest
+
+from run_benchmark import compare_benchmarks, load_latest_benchmark, native_speedups, run_benchmarks
+
+
+class TestBenchmark(unittest.TestCase):
+
+    def test_smoke(self):
+        with tempfile.TemporaryDirectory() as save_topdir:
+            results = run_benchmarks(
+                envy_types=         ['SimpleBoardGame'],
+                run_config_names=   ['QTable_SBG'],
+                n_steps=            200,
+                num_batches=        10,
+                startup_targets=    {'import_envies': 'import envies'},
+                save_topdir=        save_topdir)
+            print(results)
+            self.assertTrue(set(results) == {'stamp', 'commit', 'startup', 'envies', 'actors'})
+            self.assertTrue(set(results['startup']['import_envies']) == {'startup_sec', 'loads_gymnasium', 'loads_torch'})
+            self.assertTrue(set(results['envies']['SimpleBoardGame']) == {'run_steps_per_sec', 'resets_per_sec', 'observation_vector_per_sec'})
+            self.assertTrue(set(results['actors']['QTable_SBG']) == {'actions_per_sec', 'updates_per_sec', 'time'})
+            self.assertTrue(all(v > 0 for v in results['envies']['SimpleBoardGame'].values()))
+
+            saved = load_latest_benchmark(save_topdir)
+            self.assertTrue(saved['stamp'] == results['stamp'])
+            self.assertTrue(load_latest_benchmark(save_topdir, exclude_stamp=results['stamp']) is None)
+            self.assertTrue(compare_benchmarks(prev=saved, curr=results) == [])
+
+    def test_compare(self):
+        prev = {'envies': {'E': {'run_steps_per_sec': 100.0}}, 'startup': {'S': {'startup_sec': 1.0}}}
+        curr = {'envies': {'E': {'run_steps_per_sec': 80.0}}, 'startup': {'S': {'startup_sec': 1.05}}}
+        regressions = compare_benchmarks(prev=prev, curr=curr)
+        print(regressions)
+        self.assertTrue(len(regressions) == 1 and regressions[0].startswith('E run_steps_per_sec'))
+
+    def test_native_speedups(self):
+        with tempfile.TemporaryDirectory() as save_topdir:
+            results = run_benchmarks(
+                envy_types=         ['VectorCartPoleEnvy', 'NativeVectorCartPoleEnvy', 'SimpleBoardGame'],
+                run_config_names=   [],
+                n_steps=            2000,
+                startup_targets=    {},
+                save_topdir=        save_topdir)
+        results['actors'] = {'PG_CP': {'actions_per_sec': 100.0}, 'PG_CP_native': {'actions_per_sec': 250.0}}
+        speedups = native_speedups(results)
+        print(speedups)
+        self.assertTrue(set(speedups) == {'NativeVectorCartPoleEnvy', 'PG_CP_native'})
+        self.assertTrue(speedups['NativeVectorCartPoleEnvy'] > 0 and speedups['PG_CP_native'] == 2.5)
@@ -0,0 +1,123 @@
+import numpy as np
+import os
+import shutil
+import torch
+import unittest
+
+from checkpoint import CheckpointWriter, checkpoints, find_checkpoint, load_checkpoint
+from checkpoint import envy_state, restore_envy_state, training_state, restore_training_state
+from envies import CartPoleEnvy, NativeCartPoleEnvy
+
+TMP_DIR = '_tmp_checkpoint'
+
+
+class LinearModel:
+    """ has torch parts of MOTorch: module, optimizer & LR scheduler """
+
+    def __init__(self):
+        self.module = torch.nn.Linear(4, 2)
+        self._opt = torch.optim.Adam(self.module.parameters(), lr=0.01)
+        self._scheduler = torch.optim.lr_scheduler.StepLR(self._opt, step_size=2)
+
+    def backward(self, x:np.ndarray):
+        loss = self.module(torch.as_tensor(x, dtype=torch.float32)).pow(2).mean()
+        self._opt.zero_grad()
+        loss.backward()
+        self._opt.step()
+        self._scheduler.step()
+
+
+class Memory:
+    def __init__(self):
+        self._mem = {'observations': None}
+
+
+class LinearActor:
+
+    def __init__(self, envy):
+        self.envy = envy
+        self.model = LinearModel()
+        self.memory = Memory()
+        self._upd_step = 0
+
+    def train_step(self):
+        observation = self.envy.observation_vector(self.envy.observation)[None]
+        self.envy.run(self.envy.sample_action())
+        if self.envy.is_terminal():
+            self.envy.reset()
+        self.memory._mem['observations'] = observation if self.memory._mem['observations'] is None else np.concatenate([self.memory._mem['observations'], observation])
+        sample = self.memory._mem['observations'][np.random.choice(len(self.memory._mem['observations']), 4)]
+        self.model.backward(sample)
+        self._upd_step += 1
+
+
+class TestCheckpoint(unittest.TestCase):
+
+    def tearDown(self):
+        shutil.rmtree(TMP_DIR, ignore_errors=True)
+
+    def test_envy_state(self):
+        for envy_type in (CartPoleEnvy, NativeCartPoleEnvy):
+            envy = envy_type(seed=5)
+            envy.run(0)
+            state = envy_state(envy)
+            rewards = [envy.run(i % 2) for i in range(3)] + [envy.reset_with_seed(seed=None) is not None]
+            observation = envy.observation
+            restore_envy_state(envy, state)
+            self.assertTrue(rewards == [envy.run(i % 2) for i in range(3)] + [envy.reset_with_seed(seed=None) is not None])
+            print(envy_type.__name__, observation, envy.observation)
+            self.assertTrue(np.array_equal(observation, envy.observation))
+
+    def test_training_state(self):
+        """ actor restored from state trains the same as the one that continued """
+        actor = LinearActor(NativeCartPoleEnvy(seed=3))
+        for _ in range(5):
+            actor.train_step()
+        state = training_state(actor, n_batches=5)
+        self.assertTrue(state['n_batches'] == 5 and state['upd_step'] == 5)
+
+        for _ in range(5):
+            actor.train_step()
+        weights = actor.model.module.weight.detach().clone()
+
+        restored = LinearActor(NativeCartPoleEnvy(seed=7))
+        restore_training_state(restored, state)
+        self.assertTrue(len(restored.memory._mem['observations']) == 5)
+        for _ in range(5):
+            restored.train_step()
+        print(weights, restored.model.module.weight)
+        self.assertTrue(torch.equal(weights, restored.model.module.weight))
+        self.assertTrue(restored.model._scheduler.get_last_lr() == actor.model._scheduler.get_last_lr())
+        self.assertTrue(restored._upd_step == 10)
+
+    def test_writer(self):
+        actor = LinearActor(NativeCartPoleEnvy(seed=3))
+        folder = f'{TMP_DIR}/LinearActor_run/checkpoints'
+        writer = CheckpointWriter(folder=folder, keep=2)
+        for n_batches in range(1, 6):
+            actor.train_step()
+            writer.save(training_state(actor, n_batches=n_batches))
+        writer.close()
+        print(f'written: {writer.n_written}, dropped: {writer.n_dropped}')
+        self.assertTrue(writer.n_written + writer.n_dropped == 5)
+        files = checkpoints(folder)
+        self.assertTrue(len(files) <= 2)
+        self.assertTrue(find_checkpoint(TMP_DIR, prefix='LinearActor') == files[-1])
+        self.assertTrue(find_checkpoint(TMP_DIR, prefix='DQN') is None)
+        state = load_checkpoint(files[-1])
+        self.assertTrue(state['n_batches'] == 5)
+        self.assertTrue(torch.equal(state['models']['model']['module']['weight'], actor.model.module.weight.detach()))
+        self.assertFalse([f for f in os.listdir(folder) if f.endswith('.tmp')])
+
+    def test_writer_errors(self):
+        """ state that fails to be written is counted, thread keeps writing next ones """
+        folder = f'{TMP_DIR}/LinearActor_run/checkpoints'
+        writer = CheckpointWriter(folder=folder, keep=2)
+        writer.save({'n_batches': 1, 'not_picklable': lambda x: x})
+        writer._thread.join(timeout=0.5)
+        writer.save({'n_batches': 2})
+        writer.close()
+        print(f'written: {writer.n_written}, errors: {writer.n_errors}, last error: {writer.last_error!r}')
+        self.assertTrue(writer.n_errors + writer.n_dropped == 1 and writer.n_written == 1)
+        self.assertTrue([load_checkpoint(f)['n_batches'] for f in checkpoints(folder)] == [2])
+        self.assertFalse([f for f in os.listdir(folder) if f.endswith('.tmp')])
@@ -1,3 +1,4 @@
+import numpy as np
 import unittest
 
 from envies import SimpleBoardGame, CartPoleEnvy, AcrobotEnvy, LunarLanderEnvy
@@ -50,4 +51,51 @@ class TestEnvies(unittest.TestCase):
                 action = envy.sample_action()
                 reward = envy.run(action)
                 print(step, action, reward)
-                step += 1
\ No newline at end of file
+                step += 1
+
+    def test_observation_vector_out(self):
+
+        for et in ALL_ENVIES:
+
+            envy = et()
+            obs_vec = envy.observation_vector(envy.observation)
+            batch = np.zeros((3,) + obs_vec.shape, dtype=obs_vec.dtype)
+            for ix in range(3):
+                out = envy.observation_vector(envy.observation, out=batch[ix])
+                self.assertTrue(np.shares_memory(out, batch))
+                self.assertTrue(np.allclose(batch[ix], envy.observation_vector(envy.observation)))
+                envy.run(envy.sample_action())
+            print(f'Envy: {et} batch:\n{batch}')
+
+    def test_observation_dtype(self):
+        """ Gym envies vectors are float64 by default, float32 (OBSERVATION_DTYPE) is not copied """
+        envy = CartPoleEnvy()
+        self.assertTrue(envy.observation_vector(envy.observation).dtype == np.float64)
+        envy.OBSERVATION_DTYPE = np.float32
+        self.assertTrue(np.shares_memory(envy.observation_vector(envy.observation), envy.state))
+        self.assertTrue(np.shares_memory(envy.observation_vector(None), envy.state))
+
+    def test_snapshot(self):
+
+        for et in (CartPoleEnvy, AcrobotEnvy):
+
+            envy = et()
+            envy.reset_with_seed(seed=121)
+            for _ in range(5):
+                envy.run(1)
+            snapshot = envy.snapshot()
+
+            # branch twice from the same snapshot
+            branches = []
+            for _ in range(2):
+                envy.restore(snapshot)
+                rewards = []
+                while not envy.is_terminal():
+                    rewards.append(envy.run(0))
+                branches.append((rewards, envy.observation, envy.step, envy.is_over))
+            print(f'Envy: {et} branch: {len(branches[0][0])} steps')
+            self.assertTrue(branches[0][0] == branches[1][0])
+            self.assertTrue(np.allclose(branches[0][1], branches[1][1]))
+            self.assertTrue(branches[0][2:] == branches[1][2:])
+
+        self.assertTrue(LunarLanderEnvy.SNAPSHOT_ATTRS is None)
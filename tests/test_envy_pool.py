@@ -0,0 +1,42 @@
+import unittest
+
+from envies import SimpleBoardGame, CartPoleEnvy
+from envy_pool import EnvyPool
+
+
+class TestEnvyPool(unittest.TestCase):
+
+    def test_base(self):
+        pool = EnvyPool()
+        envy = pool.acquire(SimpleBoardGame, seed=121, board_size=5)
+        envy.run(0)
+        envy.run(0)
+        print(envy.observation, envy.is_terminal())
+        pool.release(envy)
+        self.assertTrue(len(pool) == 1)
+
+        # other kwargs -> new envy
+        other = pool.acquire('SimpleBoardGame', seed=121, board_size=4)
+        self.assertTrue(other is not envy)
+
+        reused = pool.acquire('SimpleBoardGame', seed=122, board_size=5)
+        print(reused.observation, reused.seed)
+        self.assertTrue(reused is envy)
+        self.assertTrue(reused.observation == [0] * 5 and reused.seed == 122)
+        self.assertTrue(pool.n_built == 2 and pool.n_reused == 1)
+
+    def test_reseed(self):
+        """ reused envy plays as new one with the same seed """
+        pool = EnvyPool()
+        with pool.envy(CartPoleEnvy, seed=7) as envy:
+            for _ in range(5):
+                envy.run(envy.sample_action())
+
+        fresh = CartPoleEnvy(seed=7)
+        fresh.reset_with_seed(seed=7)
+        with pool.envy(CartPoleEnvy, seed=7) as reused:
+            self.assertTrue(reused is envy)
+            for action in [0,1,1,0,1,0,0,1,1,1]:
+                self.assertTrue(fresh.run(action) == reused.run(action))
+                self.assertTrue((fresh.observation == reused.observation).all())
+        print(pool.n_built, pool.n_reused)
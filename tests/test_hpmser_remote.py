@@ -0,0 +1,108 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+import socket
+import threading
+import time
+import unittest
+
+from hpmser_remote import TrialCoordinator, run_remote_trial, run_worker
+
+
+def square(device=None, x:float=0.0, fail:bool=False) -> float:
+    if fail:
+        raise ValueError('failed trial')
+    time.sleep(0.1)
+    return x * x
+
+
+def start_workers(address, n:int, **kwargs):
+    workers = [
+        threading.Thread(
+            target= run_worker,
+            kwargs= {'coordinator_host':address[0], 'coordinator_port':address[1], 'name':f'w{ix}', 'func':square, **kwargs},
+            daemon= True)
+        for ix in range(n)]
+    for w in workers:
+        w.start()
+    return workers
+
+
+# connects as worker, pulls a trial and returns socket without running it
+def bad_worker(address) -> socket.socket:
+    sock = socket.create_connection(address)
+    sock.sendall(b'{"type": "hello", "name": "bad"}\n{"type": "pull"}\n')
+    message = json.loads(sock.makefile('rb').readline())
+    print('bad worker got trial', message)
+    return sock
+
+
+class TestHPMSerRemote(unittest.TestCase):
+
+    def test_base(self):
+        coordinator = TrialCoordinator(port=0)
+        address = coordinator.address
+        workers = start_workers(address, n=3, heartbeat_interval=0.05)
+        with ThreadPoolExecutor(6) as executor:
+            scores = list(executor.map(lambda x: run_remote_trial(*address, x=x), range(6)))
+        print(scores)
+        self.assertTrue(scores == [x * x for x in range(6)])
+        with self.assertRaises(RuntimeError):
+            run_remote_trial(*address, fail=True)
+        coordinator.close()
+        for w in workers:
+            w.join(timeout=5)
+            self.assertFalse(w.is_alive())
+
+    def test_reassign(self):
+        """ trial pulled by a worker that disconnects or goes silent is run by another worker """
+        for disconnect in (True, False):
+            coordinator = TrialCoordinator(port=0, heartbeat_timeout=0.5)
+            address = coordinator.address
+            with ThreadPoolExecutor(2) as executor:
+                bad = executor.submit(bad_worker, address)
+                future = executor.submit(run_remote_trial, *address, x=3)
+                sock = bad.result(timeout=5)
+                if disconnect:
+                    sock.close()
+                start_workers(address, n=1)
+                self.assertTrue(future.result(timeout=10) == 9)
+            print(f'disconnect: {disconnect}, reassigned: {coordinator.n_reassigned}')
+            self.assertTrue(coordinator.n_reassigned == 1)
+            sock.close()
+            coordinator.close()
+
+    def test_max_attempts(self):
+        coordinator = TrialCoordinator(port=0, max_attempts=1)
+        address = coordinator.address
+        with ThreadPoolExecutor(2) as executor:
+            bad = executor.submit(bad_worker, address)
+            future = executor.submit(run_remote_trial, *address, x=3)
+            bad.result(timeout=5).close()
+            with self.assertRaises(RuntimeError):
+                future.result(timeout=5)
+        coordinator.close()
+
+    def test_bad_message(self):
+        """ worker sending malformed message is disconnected, its trial is given to other worker """
+        coordinator = TrialCoordinator(port=0)
+        address = coordinator.address
+        with ThreadPoolExecutor(2) as executor:
+            bad = executor.submit(bad_worker, address)
+            future = executor.submit(run_remote_trial, *address, x=3)
+            sock = bad.result(timeout=5)
+            sock.sendall(b'{"type": "heartbeat"}\n')
+            self.assertTrue(sock.makefile('rb').readline() == b'')
+            start_workers(address, n=1)
+            self.assertTrue(future.result(timeout=5) == 9)
+            self.assertTrue(coordinator.n_reassigned == 1)
+            sock.close()
+        coordinator.close()
+
+    def test_connect_host(self):
+        for host, connect_host in (('127.0.0.1', '127.0.0.1'), ('0.0.0.0', 'localhost')):
+            coordinator = TrialCoordinator(host=host, port=0)
+            print(coordinator.address, coordinator.connect_host)
+            self.assertTrue(coordinator.connect_host == connect_host)
+            start_workers((coordinator.connect_host, coordinator.address[1]), n=1)
+            self.assertTrue(run_remote_trial(coordinator.connect_host, coordinator.address[1], x=2) == 4)
+            coordinator.close()
@@ -0,0 +1,129 @@
+import logging
+import threading
+import time
+import unittest
+
+from log_sink import AsyncSink
+
+
+class ListTBwr:
+    """ records what TBwr would write, add() may be slow """
+
+    def __init__(self, delay:float=0.0):
+        self.delay = delay
+        self.scalars = []
+        self.histograms = []
+        self.threads = set()
+
+    def add(self, value, tag:str, step=None):
+        time.sleep(self.delay)
+        self.threads.add(threading.get_ident())
+        self.scalars.append((tag, value, step))
+
+    def add_histogram(self, values, tag:str, step=None):
+        self.histograms.append((tag, step))
+
+    def flush(self):
+        pass
+
+
+class ListHandler(logging.Handler):
+
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+class TestAsyncSink(unittest.TestCase):
+
+    def test_base(self):
+        tbwr = ListTBwr()
+        logger = logging.getLogger('test_async_sink')
+        logger.setLevel(logging.INFO)
+        handler = ListHandler()
+        logger.addHandler(handler)
+
+        sink = AsyncSink()
+        sink.attach_tbwr(tbwr)
+        sink.attach_tbwr(tbwr)
+        sink.attach_logger(logger)
+        for step in range(100):
+            tbwr.add(value=step, tag='loss', step=step)
+            logger.info('step %d', step)
+        tbwr.add_histogram([1,2,3], tag='h', step=0)
+        sink.close()
+
+        print(len(tbwr.scalars), len(handler.messages), sink.n_written)
+        self.assertTrue(tbwr.scalars == [('loss', step, step) for step in range(100)])
+        self.assertTrue(handler.messages == [f'step {step}' for step in range(100)])
+        self.assertTrue(tbwr.histograms == [('h', 0)])
+        self.assertTrue(threading.get_ident() not in tbwr.threads)
+        self.assertTrue(logger.handlers == [handler])
+        self.assertTrue('add' not in vars(tbwr))
+        logger.removeHandler(handler)
+
+    def test_policies(self):
+        for policy in ('aggregate', 'drop'):
+            tbwr = ListTBwr(delay=0.01)
+            sink = AsyncSink(max_queue=5, policy=policy)
+            sink.attach_tbwr(tbwr)
+            stime = time.time()
+            for step in range(200):
+                tbwr.add(value=1.0, tag='loss', step=step)
+            add_time = time.time() - stime
+            sink.close()
+            print(f'{policy}: written {len(tbwr.scalars)}, aggregated {sink.n_aggregated}, dropped {sink.n_dropped}, add time {add_time:.3f}s')
+            self.assertTrue(add_time < 1.0)
+            self.assertTrue(all(value == 1.0 for _, value, _ in tbwr.scalars))
+            if policy == 'aggregate':
+                self.assertTrue(sink.n_aggregated > 0 and sink.n_dropped == 0)
+                self.assertTrue(tbwr.scalars[-1][2] == 199)
+            else:
+                self.assertTrue(sink.n_dropped > 0 and sink.n_aggregated == 0)
+                self.assertTrue(len(tbwr.scalars) == 200 - sink.n_dropped)
+
+    def test_warning_not_dropped(self):
+        logger = logging.getLogger('test_async_sink_warning')
+        handler = ListHandler()
+        logger.addHandler(handler)
+        sink = AsyncSink(max_queue=2)
+        sink.attach_logger(logger)
+        for ix in range(50):
+            logger.warning(f'warning {ix}')
+        sink.close()
+        self.assertTrue(len(handler.messages) == 50)
+        logger.removeHandler(handler)
+
+    def test_write_errors(self):
+        """ failing writes are counted, next items are written, warnings and close() do not hang """
+        tbwr = ListTBwr()
+        add = tbwr.add
+        def failing_add(value, tag:str, step=None):
+            if step % 10 == 0:
+                raise RuntimeError('TB write failed')
+            add(value=value, tag=tag, step=step)
+        tbwr.add = failing_add
+        logger = logging.getLogger('test_async_sink_errors')
+        handler = ListHandler()
+        handler.handle = lambda record: 1 / 0
+        logger.addHandler(handler)
+
+        sink = AsyncSink(max_queue=2)
+        sink.attach_tbwr(tbwr)
+        sink.attach_logger(logger)
+        for step in range(50):
+            tbwr.add(value=step, tag='loss', step=step)
+            logger.warning(f'warning {step}')
+        sink.close()
+        print(len(tbwr.scalars), sink.n_aggregated, sink.n_errors)
+        self.assertTrue(sink.n_errors >= 50) # all warnings fail
+        self.assertTrue(all(step % 10 for _, _, step in tbwr.scalars))
+        self.assertTrue(tbwr.scalars[-1][2] == 49)
+        logger.removeHandler(handler)
+
+    def test_policy_error(self):
+        with self.assertRaises(ValueError):
+            AsyncSink(policy='block')
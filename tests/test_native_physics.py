@@ -0,0 +1,51 @@
+import numpy as np
+import unittest
+
+from envies import CartPoleEnvy, AcrobotEnvy, NativeCartPoleEnvy, NativeAcrobotEnvy
+from envies import VectorCartPoleEnvy, VectorAcrobotEnvy, NativeVectorCartPoleEnvy, NativeVectorAcrobotEnvy
+
+
+class TestNativePhysics(unittest.TestCase):
+
+    def test_single(self):
+        """ plays the same actions on gym and native envies seeded the same """
+        for envy_type, native_type in [(CartPoleEnvy, NativeCartPoleEnvy), (AcrobotEnvy, NativeAcrobotEnvy)]:
+            envy = envy_type(max_steps=100)
+            native = native_type(max_steps=100)
+            rng = np.random.default_rng(0)
+            for seed in range(5):
+                envy.reset_with_seed(seed)
+                native.reset_with_seed(seed)
+                self.assertTrue(np.array_equal(envy.observation, native.observation))
+                while not envy.is_terminal():
+                    action = int(rng.integers(len(envy.get_valid_actions())))
+                    self.assertTrue(envy.run(action) == native.run(action))
+                    self.assertTrue(np.array_equal(envy.observation, native.observation))
+                    self.assertTrue(envy.is_terminal() == native.is_terminal())
+                    self.assertTrue(envy.has_won() == native.has_won())
+                print(f'{native_type.__name__} seed {seed}: {native.step} steps, won: {native.has_won()}')
+
+    def test_snapshot(self):
+        native = NativeAcrobotEnvy(seed=3)
+        snapshot = native.snapshot()
+        rewards = [native.run(1) for _ in range(5)]
+        observation = native.observation
+        native.restore(snapshot)
+        self.assertTrue(rewards == [native.run(1) for _ in range(5)])
+        self.assertTrue(np.array_equal(observation, native.observation))
+
+    def test_vector(self):
+        for envy_type, native_type in [(VectorCartPoleEnvy, NativeVectorCartPoleEnvy), (VectorAcrobotEnvy, NativeVectorAcrobotEnvy)]:
+            venvy = envy_type(num_envs=4, max_steps=50, seed=7)
+            native = native_type(num_envs=4, max_steps=50, seed=7)
+            self.assertTrue(venvy.get_valid_actions() == native.get_valid_actions())
+            self.assertTrue(np.array_equal(venvy.observation, native.observation))
+            rng = np.random.default_rng(0)
+            for _ in range(200):
+                actions = rng.integers(len(venvy.get_valid_actions()), size=4)
+                for a, b in zip(venvy.run(actions), native.run(actions)):
+                    self.assertTrue(np.allclose(a, b, atol=1e-5))
+                self.assertTrue(np.allclose(venvy.observation, native.observation, atol=1e-5))
+            print(f'{native_type.__name__} steps: {native.step}')
+            venvy.close()
+            native.close()
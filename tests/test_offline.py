@@ -0,0 +1,90 @@
+import numpy as np
+import shutil
+import tempfile
+import unittest
+
+from offline import run_offline_train
+from rollouts import RolloutRecorder, RolloutReader
+
+
+class StubEnvy:
+
+    observation = None
+
+    def observation_vector(self, observation):
+        return np.zeros(4)
+
+
+class StubActor:
+    """ records batches it is updated with, every test is won """
+
+    def __init__(self, batch_size:int, sample_memory:bool):
+        self.envy = StubEnvy()
+        self.batch_size = batch_size
+        self._sample_memory = sample_memory
+        self._upd_step = 0
+        self.batches = []
+        self.n_tests = 0
+
+    def _build_training_data(self, batch):
+        return batch
+
+    def _update(self, training_data):
+        self.batches.append(training_data)
+        return {'loss': 0.0}
+
+    def _publish(self, **kwargs):
+        pass
+
+    def test_on_episodes(self, n_episodes:int, max_steps=None):
+        self.n_tests += 1
+        return 1.0, 1.0
+
+
+class TestOfflineTrain(unittest.TestCase):
+
+    def setUp(self):
+        """ records 210 rows in chunks [50,50,50,50,10], observations[:,0] is a row index """
+        self.folder = tempfile.mkdtemp()
+        recorder = RolloutRecorder(folder=self.folder, observation_width=4, chunk_size=50)
+        for s in range(0, 210, 30):
+            ixs = np.arange(s, s+30)
+            recorder.add({
+                'observations':         [[ix, 0, 0, 0] for ix in ixs],
+                'actions':              [ix % 2 for ix in ixs],
+                'rewards':              [1.0] * 30,
+                'next_observations':    [[ix+1, 0, 0, 0] for ix in ixs],
+                'terminals':            [ix % 10 == 9 for ix in ixs],
+                'wons':                 [ix % 20 == 19 for ix in ixs]})
+        recorder.close()
+        self.reader = RolloutReader(self.folder)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_consecutive(self):
+        """ actor not sampling memory gets consecutive rows, batches do not cross chunks """
+        actor = StubActor(batch_size=20, sample_memory=False)
+        res = run_offline_train(actor=actor, reader=self.reader, num_batches=15, test_freq=4, test_episodes=2)
+        print(res, [len(b['rewards']) for b in actor.batches])
+        self.assertTrue([len(b['rewards']) for b in actor.batches] == [20, 20, 10] * 4 + [10] + [20, 20])
+        rows = np.concatenate([b['observations'][:,0] for b in actor.batches]).astype(int)
+        self.assertTrue(rows.tolist() == list(range(210)) + list(range(40)))
+        self.assertTrue(actor._upd_step == 15 and res['n_updates_done'] == 15)
+        self.assertTrue(actor.n_tests == 3 and res['succeeded_row_max'] == 3)
+        self.assertTrue(res['n_action'] == 250 and res['n_terminal'] == 25 and res['n_won'] == 12)
+
+    def test_shuffled(self):
+        """ actor sampling memory gets every row once per epoch """
+        actor = StubActor(batch_size=20, sample_memory=True)
+        res = run_offline_train(actor=actor, reader=self.reader, num_batches=13, test_freq=None, test_episodes=2)
+        rows = np.concatenate([b['observations'][:,0] for b in actor.batches]).astype(int)
+        print(rows[:20])
+        self.assertTrue(rows.tolist() != list(range(210)) and sorted(rows.tolist()) == list(range(210)))
+        self.assertTrue(actor.n_tests == 0 and res['n_updates_done'] == 13)
+
+    def test_break(self):
+        actor = StubActor(batch_size=20, sample_memory=False)
+        res = run_offline_train(actor=actor, reader=self.reader, num_batches=15, test_freq=4, test_episodes=2, break_ntests=2)
+        print(res)
+        self.assertTrue(actor._upd_step == 8 and res['n_updates_done'] == 8 and actor.n_tests == 2)
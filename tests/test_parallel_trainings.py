@@ -0,0 +1,37 @@
+import tempfile
+import unittest
+
+from run_training import run_parallel_trainings, trainings_summary
+
+
+class TestParallelTrainings(unittest.TestCase):
+
+    def test_summary(self):
+        results = [
+            {'run_config_name':'QTable_SBG', 'seed':121, 'time':1.5, 'tr_res':{'n_action':100, 'n_terminal':5, 'n_won':2, 'succeeded_row_max':1, 'n_updates_done':10}},
+            {'run_config_name':'QTable_SBG', 'seed':122, 'time':None, 'tr_res':None, 'error':"ValueError('x')"}]
+        summary = trainings_summary(results)
+        print(summary)
+        lines = summary.split('\n')
+        self.assertTrue(len(lines) == 3)
+        self.assertTrue(lines[0].split() == ['config', 'seed', 'n_action', 'n_terminal', 'n_won', 'succeeded_row_max', 'n_updates_done', 'time(s)'])
+        self.assertTrue(lines[1].split() == ['QTable_SBG', '121', '100', '5', '2', '1', '10', '1.5'])
+        self.assertTrue(lines[2].split()[:3] == ['QTable_SBG', '122', "ERROR:"])
+
+    def test_run(self):
+        """ kwargs override config keys (num_batches, test_freq) """
+        with tempfile.TemporaryDirectory() as save_topdir:
+            results = run_parallel_trainings(
+                run_config_names=   ['QTable_SBG'],
+                seeds=              (122, 121),
+                n_workers=          2,
+                cpus_per_worker=    None,
+                num_batches=        20,
+                test_freq=          5,
+                num_TS_ep=          0,
+                hpmser_mode=        True,
+                save_topdir=        save_topdir)
+        print(trainings_summary(results))
+        self.assertTrue([(r['run_config_name'], r['seed']) for r in results] == [('QTable_SBG', 121), ('QTable_SBG', 122)])
+        self.assertTrue(all('error' not in r for r in results))
+        self.assertTrue(all(r['tr_res']['n_updates_done'] == 20 and len(r['tr_res']['test_results']) == 4 for r in results))
@@ -0,0 +1,48 @@
+import cProfile
+import unittest
+
+from profiling import instrument_training, profiler_report
+
+
+class CountingActor:
+    """ stub with _update() and test_on_episodes() only """
+
+    def __init__(self):
+        self.n_updates = 0
+
+    def _update(self):
+        self.n_updates += 1
+        return {}
+
+    def test_on_episodes(self):
+        return 0.0, 0.0
+
+
+class TestProfiling(unittest.TestCase):
+
+    def test_window(self):
+        actor = CountingActor()
+        timer, profiler = instrument_training(envy=object(), actor=actor, profile_batches=(2,4))
+        for _ in range(5):
+            actor._update()
+        profiler.disable()
+        report = profiler_report(profiler)
+        print(report)
+        self.assertTrue(actor.n_updates == 5 and timer.calls['update'] == 5)
+        self.assertTrue('_update' in report)
+
+    def test_window_not_reached(self):
+        # profile_batches beyond the number of batches run (short run, broken training, resume ..)
+        actor = CountingActor()
+        timer, profiler = instrument_training(envy=object(), actor=actor, profile_batches=(10,20))
+        for _ in range(5):
+            actor._update()
+        profiler.disable()
+        report = profiler_report(profiler)
+        print(report)
+        self.assertTrue('not reached' in report)
+
+    def test_never_enabled(self):
+        report = profiler_report(cProfile.Profile())
+        print(report)
+        self.assertTrue('not reached' in report)
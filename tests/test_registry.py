@@ -0,0 +1,47 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from registry import ENVY_TYPES, ACTOR_TYPES, get_envy_type, get_actor_type, register_envy_type, type_name
+from run_training import RUN_CONFIGS
+
+
+class TestRegistry(unittest.TestCase):
+
+    def test_unknown(self):
+        for get_type in (get_envy_type, get_actor_type):
+            with self.assertRaises(ValueError) as cm:
+                get_type('NotRegistered')
+            print(cm.exception)
+            self.assertTrue('NotRegistered' in str(cm.exception) and 'registered:' in str(cm.exception))
+
+    def test_lazy_import(self):
+        """ module of registered type is imported with the first lookup """
+        folder = tempfile.mkdtemp()
+        with open(os.path.join(folder, 'lazy_envy_module.py'), 'w') as file:
+            file.write('class LazyEnvy:\n    pass\n')
+        sys.path.insert(0, folder)
+        try:
+            register_envy_type('LazyEnvy', 'lazy_envy_module')
+            self.assertTrue('lazy_envy_module' not in sys.modules)
+            envy_type = get_envy_type('LazyEnvy')
+            self.assertTrue('lazy_envy_module' in sys.modules)
+            self.assertTrue(envy_type is sys.modules['lazy_envy_module'].LazyEnvy)
+            self.assertTrue(get_envy_type(envy_type) is envy_type and type_name(envy_type) == 'LazyEnvy')
+        finally:
+            ENVY_TYPES.pop('LazyEnvy')
+            sys.modules.pop('lazy_envy_module', None)
+            sys.path.remove(folder)
+            shutil.rmtree(folder)
+
+    def test_names(self):
+        """ registered names are names of types, RUN_CONFIGS use registered names """
+        for name in ENVY_TYPES:
+            self.assertTrue(get_envy_type(name).__name__ == name)
+        for name in ACTOR_TYPES:
+            self.assertTrue(get_actor_type(name).__name__ == name)
+        for rcn, config in RUN_CONFIGS.items():
+            self.assertTrue(config['envy_type'] in ENVY_TYPES, rcn)
+            self.assertTrue(config['actor_type'] in ACTOR_TYPES, rcn)
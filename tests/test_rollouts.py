@@ -0,0 +1,46 @@
+import numpy as np
+import tempfile
+import unittest
+
+from envies import CartPoleEnvy
+from rollouts import RolloutRecorder, RolloutReader
+
+
+class TestRollouts(unittest.TestCase):
+
+    def test_record_read(self):
+        folder = tempfile.mkdtemp()
+        envy = CartPoleEnvy(seed=121)
+        recorder = RolloutRecorder(folder=folder, observation_width=4, chunk_size=50)
+        n_terminals = 0
+        for _ in range(7):
+            exp = {k: [] for k in ['observations','actions','rewards','next_observations','terminals','wons']}
+            for _ in range(30):
+                action = envy.sample_action()
+                exp['observations'].append(envy.observation_vector(envy.observation))
+                exp['rewards'].append(envy.run(action))
+                exp['actions'].append(action)
+                exp['next_observations'].append(envy.observation_vector(envy.observation))
+                exp['terminals'].append(envy.is_terminal())
+                exp['wons'].append(envy.has_won())
+                if envy.is_terminal():
+                    n_terminals += 1
+                    envy.reset()
+            recorder.add(exp)
+        recorder.close()
+
+        reader = RolloutReader(folder)
+        print(len(reader), reader.chunks)
+        self.assertTrue(len(reader) == 7 * 30)
+        self.assertTrue(reader.chunks == [50, 50, 50, 50, 10])
+
+        trajectories = list(reader.trajectories())
+        print(len(trajectories), n_terminals)
+        self.assertTrue(sum(len(t['rewards']) for t in trajectories) == len(reader))
+        self.assertTrue(all(t['terminals'][-1] for t in trajectories[:-1]))
+        self.assertTrue(len(trajectories) == n_terminals + (0 if trajectories[-1]['terminals'][-1] else 1))
+
+        rows = reader[45:160:3]
+        actions = np.concatenate([c['actions'] for c in reader.iter_chunks()])
+        self.assertTrue(np.array_equal(rows['actions'], actions[45:160:3]))
+        self.assertTrue(sum(len(b['actions']) for b in reader.iter_batches(batch_size=16)) == len(reader))
@@ -1,3 +1,4 @@
+import numpy as np
 import unittest
 
 from envies import SimpleBoardGame
@@ -45,3 +46,53 @@ class TestSimpleBoardGame(unittest.TestCase):
         print(game.observation)
         self.assertTrue(game.has_won())
         self.assertTrue(game.is_terminal())
+
+    def test_state_key(self):
+        game = SimpleBoardGame(board_size=5)
+        self.assertTrue(game.state_key() == 0)
+        game.run(1)
+        game.run(3)
+        game.run(3)
+        key = game.state_key()
+        print(game.observation, key)
+        self.assertTrue(key == 3 + 2*27)
+        self.assertTrue(game.decode_state_key(key) == game.observation)
+        self.assertTrue(game.state_key([2,2,2,2,2]) == 3**5 - 1)
+
+    def test_batched_actions(self):
+        game = SimpleBoardGame(board_size=5)
+        mask = game.valid_actions_mask()
+        print(mask)
+        self.assertTrue(mask.tolist() == [True]*5)
+        self.assertTrue(game.valid_actions_mask() is mask)
+        actions = game.sample_actions(100)
+        self.assertTrue(actions.shape == (100,) and actions.min() >= 0 and actions.max() < 5)
+
+        q_values = np.zeros((4,5))
+        q_values[np.arange(4),[0,1,2,3]] = 1
+        self.assertTrue(game.epsilon_greedy(q_values, exploration=0.0).tolist() == [0,1,2,3])
+        self.assertTrue(game.epsilon_greedy(np.zeros((1000,5)), exploration=1.0).std() > 0)
+
+    def test_snapshot(self):
+        game = SimpleBoardGame(board_size=4)
+        game.run(1)
+        snapshot = game.snapshot()
+        game.run(2)
+        game.run(2)
+        self.assertTrue(game.is_terminal())
+        game.restore(snapshot)
+        print(game.observation)
+        self.assertTrue(game.observation == [0,1,0,0] and not game.is_terminal())
+        game.run(0)
+        game.restore(snapshot)
+        self.assertTrue(game.observation == [0,1,0,0])
+
+    def test_observation_vector_state(self):
+        """ observation None is written to out from the state """
+        game = SimpleBoardGame(board_size=5)
+        game.run(2)
+        out = np.zeros((2, 5), dtype=int)
+        game.observation_vector(None, out=out[1])
+        print(out)
+        self.assertTrue(out[1].tolist() == [0, 0, 1, 0, 0] and not out[0].any())
+        self.assertTrue(game.observation_vector(None).tolist() == game.observation_vector(game.observation).tolist())
@@ -0,0 +1,48 @@
+import numpy as np
+import unittest
+
+from envies import SimpleBoardGame
+from sbg_solver import SimpleBoardGameSolver
+
+
+class TestSimpleBoardGameSolver(unittest.TestCase):
+
+    def test_base(self):
+        solver = SimpleBoardGameSolver(board_size=3, discount=0.5)
+        print(solver.q_values([0,0,0]), solver.value([0,0,0]))
+        self.assertTrue(np.isclose(solver.value([0,0,0]), 1 + 0.5 + 0.25))
+        self.assertTrue(np.allclose(solver.q_values([1,0,1]), [-1, 1, -1]))
+        self.assertTrue(solver.optimal_actions([1,0,1]) == [1])
+        self.assertTrue(solver.optimal_actions([0,0,0]) == [0,1,2])
+        self.assertTrue(solver.value([1,1,1]) == 0)
+        self.assertTrue(solver.rows([[1,0,1],[2,0,0]]).tolist() == [5, -1] and solver.encode([2,0,0]) is None)
+        self.assertTrue(len(list(solver.states())) == 2**3 - 1)
+
+        with self.assertRaises(ValueError):
+            SimpleBoardGameSolver(board_size=3, max_iters=0)
+        solver = SimpleBoardGameSolver(board_size=3, discount=0.5, max_iters=1)
+        self.assertTrue(np.allclose(solver.q_values([0,0,0]), [1, 1, 1]))
+
+    def test_optimal_play(self):
+        """ plays SimpleBoardGame with solver optimal actions """
+        game = SimpleBoardGame(board_size=6)
+        solver = SimpleBoardGameSolver(board_size=6)
+        while not game.is_terminal():
+            game.run(solver.optimal_actions(game.observation)[0])
+        print(game.observation)
+        self.assertTrue(game.has_won())
+
+    def test_is_optimal_policy(self):
+        solver = SimpleBoardGameSolver(board_size=5)
+        self.assertTrue(solver.is_optimal_policy(lambda obs: obs.index(0)))
+        self.assertFalse(solver.is_optimal_policy(lambda obs: 0))
+
+    def test_large_board(self):
+        """ tables have rows of reachable states only """
+        solver = SimpleBoardGameSolver(board_size=16)
+        print(solver.q.shape, solver.q.nbytes)
+        self.assertTrue(solver.q.shape == (2**16, 16))
+        self.assertTrue(solver.optimal_actions([1]*15 + [0]) == [15])
+        self.assertTrue(np.all(solver.q_values([2] + [0]*15) == 0) and solver.value([2] + [0]*15) == 0)
+        observations = np.asarray([[1]*15 + [0], [2] + [0]*15])
+        self.assertTrue(np.allclose(solver.q_values_batch(observations), [solver.q_values(o) for o in observations.tolist()]))
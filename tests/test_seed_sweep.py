@@ -0,0 +1,39 @@
+import numpy as np
+import unittest
+
+from run_training import seed_sweep_stats
+
+
+def result(seed:int, n_won:int, test_results) -> dict:
+    return {
+        'run_config_name':  'QTable_SBG',
+        'seed':             seed,
+        'tr_res':           {'n_action':100, 'n_terminal':10, 'n_won':n_won, 'succeeded_row_max':1, 'n_updates_done':10, 'test_results':test_results}}
+
+
+class TestSeedSweep(unittest.TestCase):
+
+    def test_one_seed(self):
+        sweep = seed_sweep_stats([result(121, n_won=4, test_results=[(10, 0.5, 2.0)])])
+        print(sweep['n_won_mean'], sweep['n_won_std'], sweep['n_won_ci'])
+        self.assertTrue(sweep['n_won_mean'] == 4 and sweep['n_won_std'] == 0 and sweep['n_won_ci'] == 0)
+        self.assertTrue(sweep['curve_won_mean'].tolist() == [0.5])
+
+    def test_two_seeds(self):
+        results = [
+            result(121, n_won=2, test_results=[(10, 0.0, 1.0), (20, 0.5, 2.0), (30, 1.0, 3.0)]),
+            # stopped earlier (break_ntests)
+            result(122, n_won=6, test_results=[(10, 1.0, 3.0)])]
+        sweep = seed_sweep_stats(results, ci_z=2.0)
+        std = np.std([2, 6], ddof=1)
+        print(sweep['n_won_mean'], sweep['n_won_std'], sweep['n_won_ci'])
+        self.assertTrue(sweep['seeds'].tolist() == [121, 122])
+        self.assertTrue(sweep['n_won_mean'] == 4 and np.isclose(sweep['n_won_std'], std))
+        self.assertTrue(np.isclose(sweep['n_won_ci'], 2.0 * std / np.sqrt(2)))
+        self.assertTrue(sweep['n_action_std'] == 0)
+
+        print(sweep['curve_won'])
+        self.assertTrue(sweep['curve_n_action'].tolist() == [10, 20, 30])
+        self.assertTrue(np.isnan(sweep['curve_won'][1,1:]).all())
+        self.assertTrue(sweep['curve_won_mean'].tolist() == [0.5, 0.5, 1.0])
+        self.assertTrue(sweep['curve_reward_std'].tolist() == [1.0, 0.0, 0.0])
@@ -0,0 +1,66 @@
+import multiprocessing
+import numpy as np
+import unittest
+
+from envies import CartPoleEnvy
+from shared_replay import SharedReplayMemory
+
+
+# adds n_adds experiences of n_steps random CartPole steps to memory
+def _add_experience(memory:SharedReplayMemory, seed:int, n_adds:int=10, n_steps:int=5):
+    envy = CartPoleEnvy(seed=seed)
+    for _ in range(n_adds):
+        exp = {k: [] for k in ['observations','actions','rewards','next_observations','terminals','wons']}
+        for _ in range(n_steps):
+            action = envy.sample_action()
+            exp['observations'].append(envy.observation_vector(envy.observation))
+            reward = envy.run(action)
+            exp['actions'].append(action)
+            exp['rewards'].append(reward)
+            exp['next_observations'].append(envy.observation_vector(envy.observation))
+            exp['terminals'].append(envy.is_terminal())
+            exp['wons'].append(envy.has_won())
+            if envy.is_terminal():
+                envy.reset()
+        memory.add(exp)
+    memory.close()
+
+
+class TestSharedReplayMemory(unittest.TestCase):
+
+    def test_base(self):
+        memory = SharedReplayMemory(max_size=8, observation_width=3)
+        memory.add({
+            'observations':         [[i,i,i] for i in range(5)],
+            'actions':              list(range(5)),
+            'rewards':              [1.0] * 5,
+            'next_observations':    [[i+1,i+1,i+1] for i in range(5)],
+            'terminals':            [False] * 4 + [True],
+            'wons':                 [False] * 5})
+        print(len(memory), memory.columns['actions'])
+        self.assertTrue(len(memory) == 5)
+
+        sample = memory.get_sample(3)
+        print(sample)
+        self.assertTrue(sample['observations'].shape == (3,3))
+        self.assertTrue(np.allclose(sample['observations'][:,0], sample['actions']))
+
+        memory.add({k: v[:4] for k, v in memory.get_all(reset=False).items()})
+        self.assertTrue(len(memory) == 8)
+        self.assertTrue(memory.get_all()['actions'].tolist() == [1,2,3,4,0,1,2,3])
+        self.assertTrue(len(memory) == 0)
+        memory.close()
+
+    def test_processes(self):
+        """ many processes add experience to the same memory """
+        memory = SharedReplayMemory(max_size=1000, observation_width=4)
+        mp_context = multiprocessing.get_context('spawn')
+        processes = [mp_context.Process(target=_add_experience, args=(memory, seed)) for seed in range(3)]
+        for p in processes:
+            p.start()
+        for p in processes:
+            p.join()
+        print(len(memory), memory.get_sample(5))
+        self.assertTrue(len(memory) == 3 * 10 * 5)
+        self.assertTrue(np.all(np.any(memory.get_all()['observations'] != 0, axis=-1)))
+        memory.close()
@@ -0,0 +1,37 @@
+import shutil
+import tempfile
+import unittest
+
+from run_hpmser import SuccessiveHalving
+from run_training import TrainingBreak
+
+
+class TestSuccessiveHalving(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_rung(self):
+        asha = SuccessiveHalving(folder=self.folder, eta=3, min_tests=2)
+        rungs = {n: asha.rung(n) for n in range(1, 20) if asha.rung(n) is not None}
+        print(rungs)
+        self.assertTrue(rungs == {2:0, 6:1, 18:2})
+
+    def test_callback(self):
+        # trials run one after another, every test of a trial gives the same (won, reward)
+        trials = {'A':1.0, 'B':2.0, 'C':3.0, 'D':0.5, 'E':5.0, 'F':2.5, 'G':4.0}
+        stopped = {}
+        for trial, reward in trials.items():
+            asha = SuccessiveHalving(folder=self.folder, eta=3, min_tests=1)
+            for n_tests in range(1, 11):
+                try:
+                    asha.test_callback(n_tests, 0.0, reward)
+                except TrainingBreak:
+                    stopped[trial] = n_tests
+                    break
+        print(stopped)
+        # first eta-1 trials reaching a rung continue, then only those in top 1/eta of its records
+        self.assertTrue(stopped == {'D':1, 'F':1, 'G':3})
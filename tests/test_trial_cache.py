@@ -0,0 +1,75 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from envies import CartPoleEnvy, SimpleBoardGame
+from run_hpmser import TrialCache
+
+
+class TestTrialCache(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.file_path = os.path.join(self.folder, 'cache.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_config_hash(self):
+        config = {
+            'envy_type':    SimpleBoardGame,
+            'envy_point':   {'board_size': 4, 'loglevel': 20},
+            'actor_point':  {'lr': 0.1, 'layers': [32, 32], 'opt': {'name': 'adam', 'device': 'cpu'}},
+            'seed':         121,
+            'device':       'cpu'}
+        key = TrialCache.config_hash(config)
+
+        # ignored keys (at any nesting level) do not change the key
+        same = {
+            'envy_type':    SimpleBoardGame,
+            'envy_point':   {'board_size': 4, 'loglevel': 10},
+            'actor_point':  {'lr': 0.1, 'layers': [32, 32], 'opt': {'name': 'adam', 'device': 'cuda:0'}},
+            'seed':         121,
+            'device':       'cuda:1',
+            'reuse_envy':   True}
+        self.assertTrue(TrialCache.config_hash(same) == key)
+        # key order does not matter
+        self.assertTrue(TrialCache.config_hash(dict(reversed(list(config.items())))) == key)
+
+        # nested differences give other keys
+        differing = [
+            {'envy_type': CartPoleEnvy},
+            {'envy_point': {'board_size': 5, 'loglevel': 20}},
+            {'actor_point': {'lr': 0.1, 'layers': [32, 64], 'opt': {'name': 'adam', 'device': 'cpu'}}},
+            {'actor_point': {'lr': 0.1, 'layers': [32, 32], 'opt': {'name': 'sgd', 'device': 'cpu'}}},
+            {'seed': 122}]
+        keys = {TrialCache.config_hash({**config, **diff}) for diff in differing}
+        print(keys)
+        self.assertTrue(len(keys) == len(differing) and key not in keys)
+
+    def test_get_put(self):
+        cache = TrialCache(file_path=self.file_path)
+        self.assertTrue(cache.get('a') is None)
+        tr_res = {'n_tests': 3, 'test_results': [(0.5, 1.0), (0.7, 2.0)]}
+        cache.put('a', tr_res)
+
+        # reopened cache reads the same file
+        cache = TrialCache(file_path=self.file_path)
+        self.assertTrue(len(cache) == 1)
+        self.assertTrue(cache.get('a') == tr_res)
+
+    def test_lru(self):
+        cache = TrialCache(file_path=self.file_path, max_size=2)
+        cache.put('a', {'v': 0})
+        time.sleep(0.01)
+        cache.put('b', {'v': 1})
+        time.sleep(0.01)
+        self.assertTrue(cache.get('a') == {'v': 0}) # touches 'a', 'b' is the least recently used
+        time.sleep(0.01)
+        cache.put('c', {'v': 2})
+        print(len(cache), cache.get('a'), cache.get('b'), cache.get('c'))
+        self.assertTrue(len(cache) == 2)
+        self.assertTrue(cache.get('b') is None)
+        self.assertTrue(cache.get('a') == {'v': 0} and cache.get('c') == {'v': 2})
@@ -0,0 +1,58 @@
+import numpy as np
+import unittest
+
+from envies import CartPoleEnvy, VectorCartPoleEnvy, VectorAcrobotEnvy
+
+
+class TestVectorGymBasedEnvy(unittest.TestCase):
+
+    def test_base(self):
+        venvy = VectorCartPoleEnvy(num_envs=3)
+        obs_vec = venvy.observation_vector(venvy.observation)
+        print(obs_vec, obs_vec.dtype)
+        self.assertTrue(obs_vec.shape == (3,4))
+        self.assertTrue(obs_vec.dtype == np.float32)
+        self.assertTrue(venvy.get_valid_actions() == [0,1])
+        venvy.close()
+
+    def test_vs_single(self):
+        """ compares first episode of every sub-envy with CartPoleEnvy seeded the same """
+        num_envs = 4
+        venvy = VectorCartPoleEnvy(num_envs=num_envs, max_steps=50, seed=7)
+        envies = [CartPoleEnvy(max_steps=50, seed=7+ix) for ix in range(num_envs)]
+        active = np.ones(num_envs, dtype=bool)
+        while active.any():
+            actions = venvy.sample_actions()
+            next_obs, rewards, terminal, won = venvy.run(actions)
+            for ix, envy in enumerate(envies):
+                if active[ix]:
+                    reward = envy.run(int(actions[ix]))
+                    self.assertTrue(np.allclose(next_obs[ix], envy.observation))
+                    self.assertTrue(rewards[ix] == reward)
+                    self.assertTrue(terminal[ix] == envy.is_terminal())
+                    self.assertTrue(won[ix] == envy.has_won())
+                    if envy.is_terminal():
+                        active[ix] = False
+        venvy.close()
+
+    def test_won(self):
+        venvy = VectorAcrobotEnvy(num_envs=2, max_steps=20)
+        for _ in range(19):
+            _, rewards, terminal, _ = venvy.run(venvy.sample_actions())
+            self.assertFalse(terminal.any())
+        _, rewards, terminal, won = venvy.run(venvy.sample_actions())
+        print(rewards, terminal, won)
+        self.assertTrue(won.all())
+        self.assertTrue((rewards == venvy.end_game_reward).all())
+        self.assertTrue((venvy.step == 20).all())
+        venvy.run(venvy.sample_actions())
+        self.assertTrue((venvy.step == 1).all())
+        venvy.close()
+
+    def test_batched_actions(self):
+        venvy = VectorCartPoleEnvy(num_envs=3)
+        self.assertTrue(venvy.valid_actions_mask().tolist() == [True, True])
+        self.assertTrue(venvy.sample_actions().shape == (3,))
+        actions = venvy.epsilon_greedy(np.asarray([[0.0,1.0],[1.0,0.0],[0.0,1.0]]), exploration=0.0)
+        self.assertTrue(actions.tolist() == [1,0,1])
+        venvy.close()
@@ -0,0 +1,66 @@
+import numpy as np
+import unittest
+
+from envies import SimpleBoardGame, VectorSimpleBoardGame
+
+
+class TestVectorSimpleBoardGame(unittest.TestCase):
+
+    def test_base(self):
+        vgame = VectorSimpleBoardGame(num_envs=3, board_size=5)
+        obs = vgame.observation
+        print(obs, obs.dtype)
+        self.assertTrue(obs.shape == (3,5))
+        self.assertTrue(obs.dtype == np.int8)
+        self.assertTrue(vgame.sample_actions().shape == (3,))
+
+    def test_run(self):
+        vgame = VectorSimpleBoardGame(num_envs=3, board_size=5)
+        next_obs, rewards, terminal, won = vgame.run(np.asarray([0,1,1]))
+        vgame.run(np.asarray([1,2,1]))
+        print(next_obs, rewards, terminal, won)
+        self.assertTrue(next_obs[0].tolist() == [1, 0, 0, 0, 0])
+        self.assertTrue(rewards.tolist() == [1, 1, 1])
+        self.assertFalse(terminal.any())
+
+        # third board was lost and got reset
+        print(vgame.observation)
+        self.assertTrue(vgame.observation[2].tolist() == [0, 0, 0, 0, 0])
+
+    def test_won(self):
+        vgame = VectorSimpleBoardGame(num_envs=2, board_size=3)
+        vgame.run(np.asarray([0,0]))
+        vgame.run(np.asarray([1,1]))
+        next_obs, rewards, terminal, won = vgame.run(np.asarray([2,1]))
+        print(next_obs, rewards, terminal, won)
+        self.assertTrue(terminal.tolist() == [True, True])
+        self.assertTrue(won.tolist() == [True, False])
+        self.assertTrue(rewards.tolist() == [1, -1])
+        self.assertTrue((vgame.observation == 0).all())
+
+    def test_vs_single(self):
+        """ compares N boards with N SimpleBoardGame instances """
+        num_envs = 8
+        vgame = VectorSimpleBoardGame(num_envs=num_envs, board_size=6, seed=11)
+        games = [SimpleBoardGame(board_size=6) for _ in range(num_envs)]
+        for _ in range(100):
+            actions = vgame.sample_actions()
+            next_obs, rewards, terminal, won = vgame.run(actions)
+            for ix, game in enumerate(games):
+                reward = game.run(int(actions[ix]))
+                self.assertTrue(next_obs[ix].tolist() == game.observation)
+                self.assertTrue(rewards[ix] == reward)
+                self.assertTrue(terminal[ix] == game.is_terminal())
+                self.assertTrue(won[ix] == game.has_won())
+                if game.is_terminal():
+                    game.reset()
+
+    def test_state_keys(self):
+        vgame = VectorSimpleBoardGame(num_envs=50, board_size=7, seed=3)
+        game = SimpleBoardGame(board_size=7)
+        for _ in range(10):
+            next_obs, _, _, _ = vgame.run(vgame.sample_actions())
+            keys = vgame.state_keys(next_obs)
+            self.assertTrue(keys.dtype == np.uint64)
+            self.assertTrue(keys.tolist() == [game.state_key(obs) for obs in next_obs.tolist()])
+            self.assertTrue((vgame.decode_state_keys(keys) == next_obs).all())